@@ -0,0 +1,71 @@
+import argparse
+import json
+import os
+import platform
+import sys
+
+from adversarial_music_generator.benchmark.suite import run_suite, compare_with_baseline, BenchmarkResult
+from adversarial_music_generator.cpus import get_num_available_cpus
+
+DEFAULT_BASELINE_PATH = os.path.join(os.path.dirname(os.path.realpath(__file__)), 'baseline.json')
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(prog='python -m adversarial_music_generator.benchmark',
+                                     description='measures throughput of the library components')
+    parser.add_argument('--output', help='where to write results as json')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE_PATH, help='results to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.3,
+                        help='allowed relative drop of throughput before it counts as a regression')
+    parser.add_argument('--scale', type=float, default=1.0, help='multiplies the amount of work')
+    parser.add_argument('--repeat', type=int, default=3, help='runs of every benchmark, the best one counts')
+    parser.add_argument('--max-workers', type=int,
+                        help='the most worker processes to run searches with, defaults to the number of CPUs available')
+    parser.add_argument('--update-baseline', action='store_true', help='store results as the new baseline')
+    args = parser.parse_args()
+
+    def report(result: BenchmarkResult):
+        print(f'{result.name:<55} {result.items_per_second:>14.1f}/s', flush=True)
+
+    results = run_suite(args.scale, args.repeat, report, args.max_workers)
+
+    document = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': get_num_available_cpus(),
+        'scale': args.scale,
+        'results': {r.name: {'items': r.items, 'seconds': r.seconds, 'items_per_second': r.items_per_second}
+                    for r in results}
+    }
+
+    if args.output is not None:
+        with open(args.output, 'w') as f:
+            json.dump(document, f, indent=2)
+            f.write('\n')
+
+    if args.update_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(document, f, indent=2)
+            f.write('\n')
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f'no baseline at {args.baseline}, nothing to compare with')
+        return 0
+
+    with open(args.baseline) as f:
+        baseline = {name: r['items_per_second'] for name, r in json.load(f)['results'].items()}
+
+    regressions = compare_with_baseline(results, baseline, args.tolerance)
+    if regressions:
+        print(f'{len(regressions)} regression(s) against {args.baseline}:')
+        for regression in regressions:
+            print('  ' + regression)
+        return 1
+
+    print('no regressions')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,269 @@
+import contextlib
+import functools
+import io
+import tempfile
+import time
+from array import array
+from dataclasses import dataclass
+from random import Random
+from typing import Callable, Dict, List, Optional
+
+from pyximport import pyximport
+
+from adversarial_music_generator.cpus import get_num_available_cpus
+from adversarial_music_generator.demo.naive_random.donothing_postprocessor import DoNothingPostprocessor
+from adversarial_music_generator.demo.naive_random.naive_random_evaluator import NaiveRandomEvaluator
+from adversarial_music_generator.demo.naive_random.naive_random_generator import NaiveRandomGenerator
+from adversarial_music_generator.demo.naive_random.naive_random_mutator import NaiveRandomMutator
+from adversarial_music_generator.demo.naive_random.naive_random_reducer import NaiveRandomReducer
+from adversarial_music_generator.find_tunes_task import FindTunesTask
+from adversarial_music_generator.midi_export import BatchMidiExporter
+from adversarial_music_generator.models.tune_blueprint import TuneBlueprint
+from adversarial_music_generator.tune_corpus import TuneCorpus, write_tune_corpus
+from adversarial_music_generator.tune_finder import TuneFinder, _generate_raw_tune_by_blueprint
+from adversarial_music_generator.tune_to_midi_converter import TuneToMidiConverter
+
+pyximport.install()
+from adversarial_music_generator.evaluation_lib.harmony import calculate_disharmony, calculate_disharmony_sweep  # noqa: E402
+
+BASE_SEED = 'benchmark'
+
+
+@dataclass
+class BenchmarkResult:
+    name: str
+    # how many things (tunes, mutations, iterations) a single run processes
+    items: int
+    # the best of the repeated runs
+    seconds: float
+
+    @property
+    def items_per_second(self) -> float:
+        return self.items / self.seconds if self.seconds > 0 else float('inf')
+
+
+def measure(name: str, items: int, function: Callable[[], None], repeat: int) -> BenchmarkResult:
+    """
+    runs the function `repeat` times and keeps the fastest run, which is the least noisy one
+    """
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+
+    return BenchmarkResult(name=name, items=items, seconds=best)
+
+
+def run_suite(scale: float = 1.0, repeat: int = 3,
+              report: Optional[Callable[[BenchmarkResult], None]] = None,
+              max_workers: Optional[int] = None) -> List[BenchmarkResult]:
+    """
+    runs all benchmarks, scale multiplies the amount of work of each of them
+    (names stay the same, throughputs are comparable across scales only roughly)
+
+    :param max_workers: the most worker processes to measure searches with, by default as many
+                        as there are CPUs available (more than that measures nothing but contention),
+                        0 measures searches running in this very process only
+    """
+    if max_workers is None:
+        max_workers = get_num_available_cpus()
+
+    results = []
+    for benchmark in [_benchmark_generator, _benchmark_mutator, _benchmark_evaluator, _benchmark_kernels,
+                      _benchmark_blueprint_replay, _benchmark_midi_export, _benchmark_corpus,
+                      functools.partial(_benchmark_find_tunes, max_workers=max_workers)]:
+        for result in benchmark(scale, repeat):
+            results.append(result)
+            if report is not None:
+                report(result)
+
+    return results
+
+
+def compare_with_baseline(results: List[BenchmarkResult], baseline: Dict[str, float],
+                          tolerance: float) -> List[str]:
+    """
+    returns descriptions of benchmarks whose throughput fell below baseline by more than the tolerance,
+    and of those missing from the baseline (e.g. searches with more workers than the machine
+    the baseline was recorded on had CPUs), which would otherwise never be compared
+    """
+    regressions = []
+    for result in results:
+        if result.name not in baseline:
+            regressions.append(f'{result.name}: {result.items_per_second:.1f}/s, missing from baseline')
+            continue
+
+        expected = baseline[result.name]
+        if result.items_per_second < expected * (1.0 - tolerance):
+            regressions.append(f'{result.name}: {result.items_per_second:.1f}/s, '
+                               f'baseline {expected:.1f}/s ({result.items_per_second / expected - 1.0:+.0%})')
+
+    return regressions
+
+
+def _scaled(n: int, scale: float) -> int:
+    return max(1, int(n * scale))
+
+
+def _benchmark_generator(scale: float, repeat: int) -> List[BenchmarkResult]:
+    generator = NaiveRandomGenerator()
+    seeds = [str(i) for i in range(_scaled(500, scale))]
+
+    return [measure('generator.generate_tunes', len(seeds),
+                    lambda: generator.generate_tunes(BASE_SEED, seeds), repeat)]
+
+
+def _benchmark_mutator(scale: float, repeat: int) -> List[BenchmarkResult]:
+    mutator = NaiveRandomMutator()
+    tunes = NaiveRandomGenerator().generate_tunes(BASE_SEED, [str(i) for i in range(_scaled(500, scale))])
+
+    best = float('inf')
+    for _ in range(repeat):
+        # mutations are applied in place, so every run gets fresh clones made outside of the timed part
+        clones = [t.clone() for t in tunes]
+        start = time.perf_counter()
+        for i, clone in enumerate(clones):
+            mutator.mutate_tune(clone, str(i))
+        best = min(best, time.perf_counter() - start)
+
+    return [BenchmarkResult(name='mutator.mutate_tune', items=len(tunes), seconds=best)]
+
+
+def _benchmark_evaluator(scale: float, repeat: int) -> List[BenchmarkResult]:
+    generator = NaiveRandomGenerator()
+    evaluator = NaiveRandomEvaluator(generator, BASE_SEED, num_calibration_iterations=20)
+    evaluator.calibrate()
+    tunes = generator.generate_tunes(BASE_SEED, [str(i) for i in range(_scaled(500, scale))])
+
+    return [measure('evaluator.evaluate_tunes', len(tunes), lambda: evaluator.evaluate_tunes(tunes), repeat)]
+
+
+def _benchmark_kernels(scale: float, repeat: int) -> List[BenchmarkResult]:
+    results = []
+    rnd = Random(0)
+
+    for num_notes in [100, 1000, 5000]:
+        # about 10 notes a second, which is what the naive generator produces too
+        starts = [rnd.uniform(0.0, num_notes / 10.0) for _ in range(num_notes)]
+        ends = [start + rnd.uniform(0.1, 1.0) for start in starts]
+        pitches = array('i', [rnd.randint(40, 90) for _ in range(num_notes)])
+        starts_f, ends_f = array('f', starts), array('f', ends)
+        starts_d, ends_d = array('d', starts), array('d', ends)
+        num_calls = _scaled(200000 // num_notes, scale)
+
+        def run_quadratic():
+            for _ in range(num_calls):
+                calculate_disharmony(starts_f, ends_f, pitches)
+
+        def run_sweep():
+            for _ in range(num_calls):
+                calculate_disharmony_sweep(starts_d, ends_d, pitches)
+
+        results.append(measure(f'kernel.calculate_disharmony[notes={num_notes}]', num_calls, run_quadratic, repeat))
+        results.append(measure(f'kernel.calculate_disharmony_sweep[notes={num_notes}]', num_calls, run_sweep,
+                               repeat))
+
+    return results
+
+
+def _benchmark_blueprint_replay(scale: float, repeat: int) -> List[BenchmarkResult]:
+    generator = NaiveRandomGenerator()
+    mutator = NaiveRandomMutator()
+    results = []
+
+    for depth in [0, 10, 50]:
+        blueprints = [TuneBlueprint(base_seed=BASE_SEED, tune_seed=str(i),
+                                    mutation_seeds=[f'm{i}_{j}' for j in range(depth)])
+                      for i in range(_scaled(100, scale))]
+
+        def replay():
+            for blueprint in blueprints:
+                _generate_raw_tune_by_blueprint(blueprint, generator, mutator)
+
+        results.append(measure(f'blueprint_replay[depth={depth}]', len(blueprints), replay, repeat))
+
+    return results
+
+
+def _benchmark_midi_export(scale: float, repeat: int) -> List[BenchmarkResult]:
+    tunes = NaiveRandomGenerator().generate_tunes(BASE_SEED, [str(i) for i in range(_scaled(200, scale))])
+    converter = TuneToMidiConverter(use_direct_encoder=True)
+    results = [measure('midi.to_bytes[direct]', len(tunes), lambda: [converter.to_bytes(t) for t in tunes], repeat)]
+
+    with tempfile.TemporaryDirectory() as dir_path:
+        exporter = BatchMidiExporter(converter, parallelize=False)
+        results.append(measure('midi.export_to_archive[zip]', len(tunes),
+                               lambda: exporter.export_to_archive(tunes, dir_path + '/tunes.zip'), repeat))
+
+    return results
+
+
+def _benchmark_corpus(scale: float, repeat: int) -> List[BenchmarkResult]:
+    tunes = NaiveRandomGenerator().generate_tunes(BASE_SEED, [str(i) for i in range(_scaled(500, scale))])
+
+    with tempfile.TemporaryDirectory() as dir_path:
+        path = dir_path + '/tunes.corpus'
+        results = [measure('corpus.write', len(tunes), lambda: write_tune_corpus(path, tunes), repeat)]
+
+        with TuneCorpus(path) as corpus:
+            results.append(measure('corpus.get_tunes', len(tunes), corpus.get_tunes, repeat))
+
+    try:
+        from adversarial_music_generator.shared_tunes import SharedTunes
+    except ImportError:
+        # no shared memory before python 3.8
+        return results
+
+    results.append(measure('shared_tunes.create', len(tunes), lambda: SharedTunes.create(tunes).close(), repeat))
+
+    return results
+
+
+def _benchmark_find_tunes(scale: float, repeat: int, max_workers: int) -> List[BenchmarkResult]:
+    results = []
+
+    with tempfile.TemporaryDirectory() as calibration_cache_dir:
+        # no workers stands for a search running in this process
+        for pool_size in [x for x in [0, 1, 2, 4] if x <= max_workers]:
+            for chunk_size in [100, 1000]:
+                def find():
+                    generator = NaiveRandomGenerator()
+                    evaluator = NaiveRandomEvaluator(generator, BASE_SEED, num_calibration_iterations=20,
+                                                     calibration_cache_dir=calibration_cache_dir)
+                    task = FindTunesTask(
+                        generator=generator,
+                        evaluator=evaluator,
+                        reducer=NaiveRandomReducer(),
+                        mutator=NaiveRandomMutator(),
+                        postprocessor=DoNothingPostprocessor(),
+                        num_generation_iterations=num_generation_iterations,
+                        num_mutation_iterations_in_epoch=num_mutation_iterations_in_epoch,
+                        num_mutation_epochs=num_mutation_epochs,
+                        num_tunes_to_keep_from_generation=10,
+                        num_tunes_to_keep_after_mutation_epoch=10,
+                        base_seed=BASE_SEED,
+                        num_tunes_to_find=3,
+                        parallelize=pool_size > 0,
+                        chunk_size=chunk_size,
+                        pool_size=pool_size or None
+                    )
+                    _run_silently(lambda: TuneFinder().find_tunes(task))
+
+                num_generation_iterations = _scaled(1000, scale)
+                num_mutation_iterations_in_epoch = _scaled(1000, scale)
+                num_mutation_epochs = 2
+                num_iterations = num_generation_iterations + num_mutation_iterations_in_epoch * num_mutation_epochs
+
+                results.append(measure(f'find_tunes[workers={pool_size},chunk={chunk_size}]', num_iterations,
+                                       find, repeat))
+
+    return results
+
+
+def _run_silently(function: Callable[[], None]):
+    """
+    the finder prints its progress, which would drown the report
+    """
+    with contextlib.redirect_stdout(io.StringIO()):
+        function()
@@ -1,51 +1,171 @@
+import hashlib
+import json
+import os
+import tempfile
 from abc import ABC, abstractmethod
-from typing import List, Dict
+from typing import List, Dict, Optional, Callable, Tuple, Iterable
 
 from adversarial_music_generator.interfaces import TuneEvaluatorInterface, TuneGeneratorInterface
 from adversarial_music_generator.models.tune import Tune
 from adversarial_music_generator.models.tune_evaluation_result import TuneEvaluationResult
 
+# changes whenever cached calibrations become stale for all evaluators
+CALIBRATION_CACHE_VERSION = 2
+
+CalibrationValues = Tuple[Dict[str, float], Dict[str, float]]
+MapFunction = Callable[[Callable, Iterable], Iterable]
+
 
 class CalibratingTuneEvaluator(TuneEvaluatorInterface, ABC):
 
-    def __init__(self, generator_for_calibration: TuneGeneratorInterface, generator_seed_for_calibration: str, num_calibration_iterations: int = 100):
+    def __init__(self, generator_for_calibration: TuneGeneratorInterface, generator_seed_for_calibration: str,
+                 num_calibration_iterations: int = 100, calibration_cache_dir: Optional[str] = None):
+        """
+        :param calibration_cache_dir: if given, calibration values are stored there
+                                      and reused by evaluators calibrating the same way
+        """
         self._calibrated: bool = False
         self._generator_for_calibration: TuneGeneratorInterface = generator_for_calibration
         self._generator_seed_for_calibration: str = generator_seed_for_calibration
         self._min_calibration_values: Dict[str, float] = {}
         self._max_calibration_values: Dict[str, float] = {}
         self._num_calibration_iterations: int = num_calibration_iterations
+        self._calibration_cache_dir: Optional[str] = calibration_cache_dir
 
     def evaluate_tunes(self, tunes: List[Tune]) -> List[TuneEvaluationResult]:
         if not self._calibrated:
-            self._calibrate(self._generator_for_calibration)
-            self._calibrated = True
+            self.calibrate()
 
-        evaluations = [self._evaluate_one_tune_without_normalization(tune) for tune in tunes]
+        evaluations = self._evaluate_tunes_without_normalization(tunes)
         [self._normalize_evaluation(x) for x in evaluations]
 
         return evaluations
 
-    def _calibrate(self, generator: TuneGeneratorInterface) -> None:
+    def calibrate(self, map_function: MapFunction = map, chunk_size: int = 100):
+        """
+        calibrates the evaluator unless it is calibrated already.
+
+        Calibration values are taken from the cache directory if possible,
+        otherwise calibration tunes are evaluated in chunks using map_function,
+        which can be something like Pool.map to calibrate in parallel.
+        """
+        if self._calibrated:
+            return
+
+        calibration = self._load_cached_calibration()
+
+        if calibration is None:
+            seeds = ['calibrate' + str(i) for i in range(self._num_calibration_iterations)]
+            chunks = [seeds[i:i + chunk_size] for i in range(0, len(seeds), chunk_size)]
+            calibration = self._merge_calibrations(map_function(self._calculate_calibration, chunks))
+            self._store_cached_calibration(calibration)
+
+        self.set_calibration(calibration)
+
+    def is_calibrated(self) -> bool:
+        return self._calibrated
 
-        seeds = ['calibrate' + str(i) for i in range(self._num_calibration_iterations)]
-        tunes = generator.generate_tunes(self._generator_seed_for_calibration, seeds)
+    def get_calibration(self) -> CalibrationValues:
+        return dict(self._min_calibration_values), dict(self._max_calibration_values)
 
-        not_normalized_evaluations = [self._evaluate_one_tune_without_normalization(x) for x in tunes]
+    def set_calibration(self, calibration: CalibrationValues):
+        min_values, max_values = calibration
+        self._min_calibration_values = dict(min_values)
+        self._max_calibration_values = dict(max_values)
+        self._calibrated = True
+
+    def get_num_calibration_iterations(self) -> int:
+        return self._num_calibration_iterations
+
+    def get_calibration_cache_key(self) -> str:
+        """
+        tells this evaluator apart in keys of cached calibrations, override it to include
+        configuration affecting raw aspect values, and a version to change along with the way they are calculated
+        """
+        return type(self).__module__ + '.' + type(self).__qualname__
+
+    def _calculate_calibration(self, seeds: List[str]) -> CalibrationValues:
+        tunes = self._generator_for_calibration.generate_tunes(self._generator_seed_for_calibration, seeds)
+
+        not_normalized_evaluations = self._evaluate_tunes_without_normalization(tunes)
+
+        min_values: Dict[str, float] = {}
+        max_values: Dict[str, float] = {}
 
         for evaluation in not_normalized_evaluations:
             for aspect in self.get_aspects():
 
                 value = evaluation.get_aspect_value(aspect)
 
-                if aspect not in self._min_calibration_values:
-                    self._min_calibration_values[aspect] = value
+                if aspect not in min_values:
+                    min_values[aspect] = value
+
+                if aspect not in max_values:
+                    max_values[aspect] = value
+
+                min_values[aspect] = min(value, min_values[aspect])
+                max_values[aspect] = max(value, max_values[aspect])
+
+        return min_values, max_values
+
+    def _merge_calibrations(self, calibrations: Iterable[CalibrationValues]) -> CalibrationValues:
+        min_values: Dict[str, float] = {}
+        max_values: Dict[str, float] = {}
+
+        for chunk_min_values, chunk_max_values in calibrations:
+            for aspect, value in chunk_min_values.items():
+                min_values[aspect] = min(value, min_values.get(aspect, value))
+            for aspect, value in chunk_max_values.items():
+                max_values[aspect] = max(value, max_values.get(aspect, value))
+
+        return min_values, max_values
+
+    def _get_calibration_cache_path(self) -> Optional[str]:
+        if self._calibration_cache_dir is None:
+            return None
+
+        key = json.dumps([
+            CALIBRATION_CACHE_VERSION,
+            self.get_calibration_cache_key(),
+            self._generator_for_calibration.get_calibration_cache_key(),
+            self._generator_seed_for_calibration,
+            self._num_calibration_iterations,
+            self.get_aspects()
+        ])
+
+        file_name = 'calibration_' + hashlib.sha256(key.encode()).hexdigest() + '.json'
+        return os.path.join(self._calibration_cache_dir, file_name)
+
+    def _load_cached_calibration(self) -> Optional[CalibrationValues]:
+        path = self._get_calibration_cache_path()
+        if path is None or not os.path.exists(path):
+            return None
+
+        with open(path) as f:
+            data = json.load(f)
+
+        return data['min'], data['max']
+
+    def _store_cached_calibration(self, calibration: CalibrationValues):
+        path = self._get_calibration_cache_path()
+        if path is None:
+            return
+
+        os.makedirs(self._calibration_cache_dir, exist_ok=True)
+        min_values, max_values = calibration
 
-                if aspect not in self._max_calibration_values:
-                    self._max_calibration_values[aspect] = value
+        # written to a temp file first so that a concurrent reader never sees half of it
+        fd, tmp_path = tempfile.mkstemp(dir=self._calibration_cache_dir, suffix='.tmp')
+        with os.fdopen(fd, 'w') as f:
+            json.dump({'min': min_values, 'max': max_values}, f)
+        os.replace(tmp_path, path)
 
-                self._min_calibration_values[aspect] = min(value, self._min_calibration_values[aspect])
-                self._max_calibration_values[aspect] = max(value, self._max_calibration_values[aspect])
+    def _evaluate_tunes_without_normalization(self, tunes: List[Tune]) -> List[TuneEvaluationResult]:
+        """
+        evaluates a whole batch of tunes,
+        override it when there is a cheaper way than one tune at a time
+        """
+        return [self._evaluate_one_tune_without_normalization(tune) for tune in tunes]
 
     @abstractmethod
     def _evaluate_one_tune_without_normalization(self, tune: Tune) -> TuneEvaluationResult:
@@ -0,0 +1,101 @@
+import math
+from abc import ABC, abstractmethod
+from typing import Callable, Any, Optional
+
+TaskFactory = Callable[[int, int], Any]
+
+
+class ChunkSchedulerInterface(ABC):
+    """
+    cuts iterations of a search phase into tasks covering ranges [start_idx, end_idx)
+    """
+
+    @abstractmethod
+    def next_task(self) -> Optional[Any]:
+        """
+        returns None once all iterations have been handed out
+        """
+        pass
+
+    @abstractmethod
+    def register_completion(self, task: Any, seconds: float):
+        """
+        seconds is how long a worker has been busy with the task
+        """
+        pass
+
+
+class FixedChunkScheduler(ChunkSchedulerInterface):
+    def __init__(self, create_task: TaskFactory, num_iterations: int, chunk_size: int):
+        self._create_task: TaskFactory = create_task
+        self._num_iterations: int = num_iterations
+        self._chunk_size: int = chunk_size
+        self._cursor: int = 0
+
+    def next_task(self) -> Optional[Any]:
+        if self._cursor >= self._num_iterations:
+            return None
+
+        start_idx = self._cursor
+        self._cursor = min(start_idx + self._chunk_size, self._num_iterations)
+        return self._create_task(start_idx, self._cursor)
+
+    def register_completion(self, task: Any, seconds: float):
+        pass
+
+
+class AdaptiveChunkScheduler(ChunkSchedulerInterface):
+    """
+    sizes chunks so that a worker spends about target_chunk_seconds on each of them.
+
+    It starts with the smallest chunks and then relies on a moving average of the
+    cost of one iteration. Towards the end of a phase chunks shrink to a fraction
+    of what is left (guided self-scheduling), so that the tail of the phase is spread
+    over all workers rather than left to a few of them.
+    """
+
+    # weight of the latest observation in the moving average
+    SMOOTHING = 0.3
+
+    def __init__(self, create_task: TaskFactory, num_iterations: int, num_workers: int,
+                 target_chunk_seconds: float, min_chunk_size: int, max_chunk_size: int):
+        self._create_task: TaskFactory = create_task
+        self._num_iterations: int = num_iterations
+        self._num_workers: int = max(1, num_workers)
+        self._target_chunk_seconds: float = target_chunk_seconds
+        self._min_chunk_size: int = max(1, min_chunk_size)
+        self._max_chunk_size: int = max(self._min_chunk_size, max_chunk_size)
+        self._cursor: int = 0
+        self._seconds_per_iteration: Optional[float] = None
+
+    def next_task(self) -> Optional[Any]:
+        if self._cursor >= self._num_iterations:
+            return None
+
+        start_idx = self._cursor
+        self._cursor = min(start_idx + self.get_chunk_size(), self._num_iterations)
+        return self._create_task(start_idx, self._cursor)
+
+    def register_completion(self, task: Any, seconds: float):
+        num_iterations = task.end_idx - task.start_idx
+        if num_iterations <= 0:
+            return
+
+        observed = seconds / num_iterations
+        if self._seconds_per_iteration is None:
+            self._seconds_per_iteration = observed
+        else:
+            self._seconds_per_iteration += self.SMOOTHING * (observed - self._seconds_per_iteration)
+
+    def get_chunk_size(self) -> int:
+        if self._seconds_per_iteration is None:
+            chunk_size = self._min_chunk_size
+        elif self._seconds_per_iteration <= 0.0:
+            chunk_size = self._max_chunk_size
+        else:
+            chunk_size = int(self._target_chunk_seconds / self._seconds_per_iteration)
+
+        num_remaining_iterations = self._num_iterations - self._cursor
+        chunk_size = min(chunk_size, math.ceil(num_remaining_iterations / self._num_workers))
+
+        return max(self._min_chunk_size, min(self._max_chunk_size, chunk_size))
@@ -0,0 +1,12 @@
+import os
+
+
+def get_num_available_cpus() -> int:
+    """
+    number of CPUs this process may run on, which respects CPU restrictions it is started with
+    (unlike os.cpu_count, that counts all CPUs of the machine)
+    """
+    if hasattr(os, 'sched_getaffinity'):
+        return len(os.sched_getaffinity(0))
+
+    return os.cpu_count() or 1
@@ -5,3 +5,6 @@ from adversarial_music_generator.models.tune import Tune
 class DoNothingPostprocessor(TuneProcessorInterface):
     def process(self, tune: Tune, base_seed: str, tune_seed: str):
         pass
+
+    def leaves_tunes_unchanged(self) -> bool:
+        return True
@@ -1,25 +1,35 @@
 from array import array
-from typing import List
+from typing import List, Optional, Dict, Sequence
 
 from pyximport import pyximport
 
 from adversarial_music_generator.calibrating_tune_evaluator import CalibratingTuneEvaluator
-from adversarial_music_generator.interfaces import TuneGeneratorInterface
+from adversarial_music_generator.interfaces import TuneGeneratorInterface, IncrementalTuneEvaluatorInterface, \
+    PackedTuneEvaluatorInterface
+from adversarial_music_generator.models.mutation_delta import MutationDelta
 from adversarial_music_generator.models.note import Note
+from adversarial_music_generator.models.packed_tunes import PackedTunes
 from adversarial_music_generator.models.tune import Tune
 from adversarial_music_generator.models.tune_evaluation_result import TuneEvaluationResult
 
 pyximport.install()
-from adversarial_music_generator.evaluation_lib.harmony import calculate_disharmony  # noqa: E402
+from adversarial_music_generator.evaluation_lib.harmony import calculate_disharmony_sweep, calculate_disharmony_batch, \
+    calculate_disharmony_sweep_fixed, calculate_touched_disharmony_fixed, disharmony_from_fixed  # noqa: E402
 
 
-class NaiveRandomEvaluator(CalibratingTuneEvaluator):
+class NaiveRandomEvaluator(CalibratingTuneEvaluator, IncrementalTuneEvaluatorInterface, PackedTuneEvaluatorInterface):
     ASPECT_RHYTHMICALITY = 'rhythmicality'
     ASPECT_HARMONY = 'harmony'
     ASPECT_CONTENT = 'content'
 
-    def __init__(self, generator_for_calibration: TuneGeneratorInterface, generator_seed_for_calibration: str):
-        super().__init__(generator_for_calibration, generator_seed_for_calibration)
+    def __init__(self, generator_for_calibration: TuneGeneratorInterface, generator_seed_for_calibration: str,
+                 num_calibration_iterations: int = 100, calibration_cache_dir: Optional[str] = None):
+        super().__init__(generator_for_calibration, generator_seed_for_calibration, num_calibration_iterations,
+                         calibration_cache_dir)
+
+    def get_calibration_cache_key(self) -> str:
+        # the version goes up whenever raw aspect values change
+        return super().get_calibration_cache_key() + '/1'
 
     def get_aspects(self) -> List[str]:
         return [
@@ -33,10 +43,72 @@ class NaiveRandomEvaluator(CalibratingTuneEvaluator):
 
         # res.set_aspect_value(self.ASPECT_HARMONY, self._evaluate_harmony(tune))
         res.set_aspect_value(self.ASPECT_HARMONY, self._evaluate_harmony_optimized(tune))
-        res.set_aspect_value(self.ASPECT_RHYTHMICALITY, self._evaluate_rhythmicality(tune))
-        res.set_aspect_value(self.ASPECT_CONTENT, self._evaluate_content(tune))
+        res.set_aspect_value(self.ASPECT_RHYTHMICALITY, self._evaluate_rhythmicality(tune.note_columns()[1]))
+        res.set_aspect_value(self.ASPECT_CONTENT, self._evaluate_content(tune.num_notes))
         return res
 
+    def _evaluate_tunes_without_normalization(self, tunes: List[Tune]) -> List[TuneEvaluationResult]:
+        return self._evaluate_packed_tunes_without_normalization(PackedTunes.from_tunes(tunes))
+
+    def evaluate_packed_tunes(self, packed: PackedTunes) -> List[TuneEvaluationResult]:
+        if not self.is_calibrated():
+            self.calibrate()
+
+        evaluations = self._evaluate_packed_tunes_without_normalization(packed)
+        for evaluation in evaluations:
+            self._normalize_evaluation(evaluation)
+
+        return evaluations
+
+    def _evaluate_packed_tunes_without_normalization(self, packed: PackedTunes) -> List[TuneEvaluationResult]:
+        # harmony of the whole batch is calculated in one native call
+        disharmonies = calculate_disharmony_batch(packed.starts, packed.ends, packed.pitches, packed.offsets)
+
+        evaluations = []
+        for i, disharmony in enumerate(disharmonies):
+            start, end = packed.offsets[i], packed.offsets[i + 1]
+            res = TuneEvaluationResult()
+            res.set_aspect_value(self.ASPECT_HARMONY, 1.0 - disharmony)
+            res.set_aspect_value(self.ASPECT_RHYTHMICALITY, self._evaluate_rhythmicality(packed.starts[start:end]))
+            res.set_aspect_value(self.ASPECT_CONTENT, self._evaluate_content(end - start))
+            evaluations.append(res)
+
+        return evaluations
+
+    def get_evaluation_states(self, tunes: List[Tune]) -> List[int]:
+        # the state is disharmony in fixed point, it can be updated exactly
+        states = []
+        for tune in tunes:
+            pitches, starts, ends, _ = tune.note_columns()
+            states.append(calculate_disharmony_sweep_fixed(starts, ends, pitches))
+        return states
+
+    def evaluate_mutated_tunes(self, parent_tunes: List[Tune], parent_states: List[int], tunes: List[Tune],
+                               deltas: List[MutationDelta]) -> List[TuneEvaluationResult]:
+        # many children share a parent
+        parent_columns: Dict[int, tuple] = {}
+
+        evaluations = []
+        for parent_tune, parent_state, tune, delta in zip(parent_tunes, parent_states, tunes, deltas):
+            if id(parent_tune) not in parent_columns:
+                parent_columns[id(parent_tune)] = parent_tune.note_columns()
+            parent_pitches, parent_starts, parent_ends, _ = parent_columns[id(parent_tune)]
+            pitches, starts, ends, _ = tune.note_columns()
+
+            disharmony = parent_state \
+                - calculate_touched_disharmony_fixed(parent_starts, parent_ends, parent_pitches,
+                                                     array('i', delta.get_touched_notes_before())) \
+                + calculate_touched_disharmony_fixed(starts, ends, pitches, array('i', delta.get_touched_notes_after()))
+
+            res = TuneEvaluationResult()
+            res.set_aspect_value(self.ASPECT_HARMONY, 1.0 - disharmony_from_fixed(disharmony))
+            res.set_aspect_value(self.ASPECT_RHYTHMICALITY, self._evaluate_rhythmicality(starts))
+            res.set_aspect_value(self.ASPECT_CONTENT, self._evaluate_content(len(pitches)))
+            self._normalize_evaluation(res)
+            evaluations.append(res)
+
+        return evaluations
+
     def _evaluate_harmony(self, tune: Tune) -> float:
         res = 1.0
 
@@ -48,20 +120,13 @@ class NaiveRandomEvaluator(CalibratingTuneEvaluator):
         return res
 
     def _evaluate_harmony_optimized(self, tune: Tune) -> float:
-        num_notes = tune.num_notes
-
-        starts = array('f', [0.0] * num_notes)
-        ends = array('f', [0.0] * num_notes)
-        pitches = array('i', [0] * num_notes)
-
-        for i, note in enumerate(tune.all_notes()):
-            starts[i] = note.start_time_seconds
-            ends[i] = note.end_time_seconds
-            pitches[i] = note.note
-
-        return 1.0 - calculate_disharmony(starts, ends, pitches)
+        pitches, starts, ends, _ = tune.note_columns()
+        return 1.0 - calculate_disharmony_sweep(starts, ends, pitches)
 
-    def _evaluate_rhythmicality(self, tune: Tune) -> float:
+    def _evaluate_rhythmicality(self, starts: Sequence[float]) -> float:
+        """
+        :param starts: start times of all notes of a tune
+        """
         res = 1.0
         return res
 
@@ -93,7 +158,7 @@ class NaiveRandomEvaluator(CalibratingTuneEvaluator):
     def _calculate_overlapping_length(self, a: Note, b: Note) -> float:
         return max(0.0, min(a.end_time_seconds, b.end_time_seconds) - max(a.start_time_seconds, b.start_time_seconds))
 
-    def _evaluate_content(self, tune: Tune):
+    def _evaluate_content(self, num_notes: int):
         expected_mean_num_notes = 20
-        diff = tune.num_notes - expected_mean_num_notes
+        diff = num_notes - expected_mean_num_notes
         return 1.0 - abs(diff)
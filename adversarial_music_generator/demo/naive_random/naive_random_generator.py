@@ -1,7 +1,7 @@
-from typing import List
+from array import array
+from typing import List, Type
 
 from adversarial_music_generator.interfaces import TuneGeneratorInterface
-from adversarial_music_generator.models.note import Note
 from adversarial_music_generator.models.timbre_repository import TimbreRepository
 from adversarial_music_generator.models.track import Track
 from adversarial_music_generator.models.tune import Tune
@@ -9,24 +9,37 @@ from adversarial_music_generator.seed import Seed
 
 
 class NaiveRandomGenerator(TuneGeneratorInterface):
+    def __init__(self, seed_class: Type[Seed] = Seed):
+        """
+        :param seed_class: the random engine to use, FastSeed is much faster,
+                           but it generates different tunes for the same seeds
+        """
+        self._seed_class: Type[Seed] = seed_class
+
+    def get_calibration_cache_key(self) -> str:
+        return super().get_calibration_cache_key() + '/' + self._seed_class.__module__ + '.' \
+            + self._seed_class.__qualname__
+
     def generate_tunes(self, generator_seed: str, tune_seeds: List[str]) -> List[Tune]:
         return [self._generate_one_tune(seed) for seed in tune_seeds]
 
     def _generate_one_tune(self, seed: str) -> Tune:
         res = Tune()
-        seed_obj = Seed(seed)
+        seed_obj = self._seed_class(seed)
         res.tracks = [self._generate_one_track(seed_obj, i) for i in range(0, 3)]
         return res
 
     def _generate_one_track(self, seed_obj: Seed, track_number: int) -> Track:
-        notes: List[Note] = []
-        for i in range(0, seed_obj.randint(1, 100, f'number of notes for track {track_number}')):
-            start_time = seed_obj.randfloat(0, 10.0, f'note start for track {track_number} and note {i}')
-            length = seed_obj.randfloat(0.1, 1.0, f'note length for track {track_number} and note {i}')
-            pitch = seed_obj.randint(40, 90, f"pitch for track {track_number} and note {i}")
-            note = Note(start_time_seconds=start_time, end_time_seconds=start_time + length, note=pitch, velocity=100)
-            notes.append(note)
+        note_ids = range(0, seed_obj.randint(1, 100, f'number of notes for track {track_number}'))
+
+        starts = seed_obj.randfloats(0, 10.0, f'note start for track {track_number} and note ', note_ids)
+        lengths = seed_obj.randfloats(0.1, 1.0, f'note length for track {track_number} and note ', note_ids)
+        pitches = seed_obj.randints(40, 90, f"pitch for track {track_number} and note ", note_ids)
 
         track = Track(TimbreRepository.lead)
-        track.notes = notes
+        track.pitches = array('i', pitches)
+        track.starts = array('d', starts)
+        track.ends = array('d', [start + length for start, length in zip(starts, lengths)])
+        track.velocities = array('d', [100]) * len(note_ids)
+
         return track
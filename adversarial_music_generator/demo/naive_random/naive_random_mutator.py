@@ -1,7 +1,7 @@
-from typing import List
+from bisect import bisect_left, bisect_right
 
 from adversarial_music_generator.interfaces import TuneMutatorInterface
-from adversarial_music_generator.models.note import Note
+from adversarial_music_generator.models.mutation_delta import MutationDelta
 from adversarial_music_generator.models.tune import Tune
 from adversarial_music_generator.seed import Seed
 
@@ -9,33 +9,49 @@ from adversarial_music_generator.seed import Seed
 class NaiveRandomMutator(TuneMutatorInterface):
 
     def mutate_tune(self, tune: Tune, seed_str: str):
+        self.mutate_tune_with_delta(tune, seed_str)
+
+    def mutate_tune_with_delta(self, tune: Tune, seed_str: str) -> MutationDelta:
+        if seed_str == self.SPECIAL_SEED_STR_TO_LEAVE_TUNE_UNMUTATED:
+            return MutationDelta()
+
         seed = Seed(seed_str)
 
         num_notes_to_remove = seed.randint(0, 10, 'num notes to remove')
         num_notes_to_change = seed.randint(0, 10, 'num notes to change')
 
-        total_num_notes = 0
-        for track in tune.tracks:
-            total_num_notes += len(track.notes)
-
-        removed_notes_ids = set([seed.randint(0, total_num_notes, 'removed note' + str(i)) for i in
-                                 range(num_notes_to_remove)])
+        total_num_notes = tune.num_notes
 
-        changed_notes_ids = set([seed.randint(0, total_num_notes, 'changed note' + str(i)) for i in
-                                 range(num_notes_to_change)])
-
-        for i, note in enumerate(tune.all_notes()):
-            if i in changed_notes_ids:
-                movement = seed.randint(-6, 5, "note movement" + str(i))
-                note.note += movement
-
-            if i in removed_notes_ids:
-                note.removed = True
+        # ids are global (across all tracks), randint's upper bound is inclusive,
+        # so an id may as well point past the last note, such ids are ignored
+        removed_notes = sorted(i for i in set(seed.randints(0, total_num_notes, 'removed note',
+                                                            range(num_notes_to_remove)))
+                               if i < total_num_notes)
+        changed_notes = sorted(i for i in set(seed.randints(0, total_num_notes, 'changed note',
+                                                            range(num_notes_to_change)))
+                               if i < total_num_notes and i not in removed_notes)
 
+        # global id of the first note of every track
+        track_offsets = []
+        offset = 0
         for track in tune.tracks:
-            new_notes: List[Note] = []
-            for note in track.notes:
-                if not note.removed:
-                    new_notes.append(note)
-
-            track.notes = new_notes
+            track_offsets.append(offset)
+            offset += track.num_notes
+
+        movements = seed.randints(-6, 5, 'note movement', changed_notes)
+        for i, movement in zip(changed_notes, movements):
+            # the last track starting at or before i, empty tracks before it start at the same id
+            track_idx = bisect_right(track_offsets, i) - 1
+            tune.tracks[track_idx].get_writable_columns()[0][i - track_offsets[track_idx]] += movement
+
+        removed_notes_by_track = {}
+        for i in removed_notes:
+            track_idx = bisect_right(track_offsets, i) - 1
+            removed_notes_by_track.setdefault(track_idx, []).append(i - track_offsets[track_idx])
+        for track_idx, indices in removed_notes_by_track.items():
+            tune.tracks[track_idx].remove_notes(indices)
+
+        return MutationDelta(
+            removed_notes=removed_notes,
+            changed_notes=[(i, i - bisect_left(removed_notes, i)) for i in changed_notes]
+        )
@@ -0,0 +1,240 @@
+import logging
+import queue
+import threading
+import traceback
+from multiprocessing.connection import Listener, Client, Connection
+from typing import Tuple, List, Callable, Optional, Any
+
+Address = Tuple[str, int]
+TaskCallback = Callable[[Any, Any], None]
+ErrorCallback = Callable[[Exception], None]
+
+
+class DistributedExecutionError(Exception):
+    pass
+
+
+class _Job:
+    """
+    a set of tasks submitted by a single run_tasks or submit call
+    """
+
+    def __init__(self, num_tasks: int, callback: TaskCallback, error_callback: Optional[ErrorCallback] = None):
+        self.callback: TaskCallback = callback
+        self.error_callback: Optional[ErrorCallback] = error_callback
+        self.num_remaining: int = num_tasks
+        self.error: Optional[DistributedExecutionError] = None
+        self.done: threading.Event = threading.Event()
+        if num_tasks == 0:
+            self.done.set()
+
+
+class DistributedCoordinator:
+    """
+    Hands out search tasks over TCP to worker processes (see distributed.worker),
+    possibly running on other hosts, and gathers their results.
+
+    Workers connect to the coordinator at any time, get the worker context
+    (generator, evaluator, etc.) once per find_tunes run and then take tasks
+    one at a time, so faster workers naturally take more of them. A task of a worker
+    that disconnects is given to another worker, tasks waiting when the last worker
+    disconnects fail.
+
+    Messages are pickled, the authkey is what keeps strangers away,
+    so the coordinator is only meant for trusted networks.
+    """
+
+    def __init__(self, address: Address, authkey: bytes):
+        self._listener: Listener = Listener(address, authkey=authkey)
+        self._authkey: bytes = authkey
+        self._tasks: queue.Queue = queue.Queue()
+        self._lock: threading.Lock = threading.Lock()
+        self._workers_changed: threading.Condition = threading.Condition(self._lock)
+        self._num_workers: int = 0
+        self._context_args: Optional[Tuple] = None
+        self._context_version: int = 0
+        self._closed: bool = False
+        self._accepting_thread: threading.Thread = threading.Thread(target=self._accept_workers, daemon=True)
+        self._accepting_thread.start()
+
+    @property
+    def address(self) -> Address:
+        """
+        the actual address, handy when the port to listen to was 0
+        """
+        return self._listener.address
+
+    @property
+    def num_workers(self) -> int:
+        with self._lock:
+            return self._num_workers
+
+    def wait_for_workers(self, num_workers: int, timeout: Optional[float] = None) -> bool:
+        with self._workers_changed:
+            return self._workers_changed.wait_for(lambda: self._num_workers >= num_workers, timeout)
+
+    def install_worker_context(self, context_args: Tuple):
+        """
+        context args are sent to every worker before its next task
+        """
+        with self._lock:
+            self._context_args = context_args
+            self._context_version += 1
+
+    def run_tasks(self, processing_function: Callable, tasks: List, callback: TaskCallback):
+        """
+        runs processing_function(task) on workers for every task, blocks until all of them are done.
+
+        callback(task, result) is called in a coordinator thread, never concurrently.
+        """
+        job = _Job(len(tasks), callback)
+        for task in tasks:
+            self._tasks.put((job, processing_function, task))
+
+        job.done.wait()
+
+        if job.error is not None:
+            raise job.error
+
+    def submit(self, processing_function: Callable, task: Any, callback: Callable[[Any], None],
+               error_callback: ErrorCallback):
+        """
+        runs processing_function(task) on a worker without waiting for it,
+        callback(result) or error_callback(exception) is called in a coordinator thread later on
+        """
+        job = _Job(1, lambda _, result: callback(result), error_callback)
+        self._tasks.put((job, processing_function, task))
+
+    def shutdown(self):
+        with self._lock:
+            self._closed = True
+            num_workers = self._num_workers
+
+        for _ in range(num_workers):
+            self._tasks.put(None)
+
+        # wakes up the accepting thread blocked in accept()
+        try:
+            Client(self._listener.address, authkey=self._authkey).close()
+        except OSError:
+            pass
+
+        self._accepting_thread.join()
+        self._listener.close()
+
+    def _accept_workers(self):
+        while True:
+            try:
+                connection = self._listener.accept()
+            except (OSError, EOFError) as e:
+                if self._closed:
+                    return
+                logging.warning(f"a worker failed to connect: {e}")
+                continue
+
+            with self._workers_changed:
+                if self._closed:
+                    connection.close()
+                    return
+                self._num_workers += 1
+                self._workers_changed.notify_all()
+
+            threading.Thread(target=self._serve_worker, args=(connection,), daemon=True).start()
+
+    def _serve_worker(self, connection: Connection):
+        installed_context_version = 0
+        item = None
+
+        try:
+            while True:
+                item = self._tasks.get()
+                if item is None:
+                    connection.send(('stop',))
+                    return
+
+                job, processing_function, task = item
+                if job.error is not None:
+                    # the job has failed already, its remaining tasks are skipped
+                    self._finish_task(job)
+                    continue
+
+                with self._lock:
+                    context_version, context_args = self._context_version, self._context_args
+
+                try:
+                    if installed_context_version != context_version:
+                        connection.send(('install', context_args))
+                        installed_context_version = context_version
+
+                    connection.send(('task', processing_function, task))
+                    status, payload = connection.recv()
+                except (OSError, EOFError):
+                    raise
+                except Exception:
+                    # pickling happens before sending and unpickling after receiving,
+                    # so the connection is still fine, it is the task that fails
+                    status, payload = 'error', traceback.format_exc()
+                item = None
+
+                try:
+                    if status == 'result':
+                        with self._lock:
+                            job.callback(task, payload)
+                    else:
+                        self._fail_job(job, _create_task_error(payload))
+                except Exception:
+                    self._fail_job(job, DistributedExecutionError(
+                        f'failed to handle a task result (error: 6d1c4b90):\n{traceback.format_exc()}'))
+
+                self._finish_task(job)
+        except (OSError, EOFError) as e:
+            logging.warning(f"lost a worker: {e}")
+            if item is not None:
+                self._tasks.put(item)
+        finally:
+            connection.close()
+            with self._workers_changed:
+                self._num_workers -= 1
+                self._workers_changed.notify_all()
+                is_last_worker = self._num_workers == 0 and not self._closed
+
+            if is_last_worker:
+                self._fail_waiting_tasks()
+
+    def _fail_waiting_tasks(self):
+        """
+        nobody is going to run tasks already waiting, but then new workers may connect later on
+        and take tasks submitted after this
+        """
+        while True:
+            with self._lock:
+                if self._num_workers > 0:
+                    return
+            try:
+                item = self._tasks.get_nowait()
+            except queue.Empty:
+                return
+
+            if item is None:
+                continue
+
+            job = item[0]
+            if job.error is None:
+                self._fail_job(job, DistributedExecutionError('all workers have disconnected (error: 93e07f25)'))
+            self._finish_task(job)
+
+    def _fail_job(self, job: _Job, error: DistributedExecutionError):
+        with self._lock:
+            job.error = error
+            if job.error_callback is not None:
+                job.error_callback(error)
+
+    def _finish_task(self, job: _Job):
+        with self._lock:
+            job.num_remaining -= 1
+            if job.num_remaining == 0 or job.error is not None:
+                job.done.set()
+
+
+def _create_task_error(remote_traceback: str) -> DistributedExecutionError:
+    return DistributedExecutionError(f'a task failed on a worker (error: 1e8d5a27):\n{remote_traceback}')
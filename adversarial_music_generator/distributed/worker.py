@@ -0,0 +1,56 @@
+import argparse
+import logging
+import os
+import traceback
+from multiprocessing.connection import Client
+
+from adversarial_music_generator.distributed.coordinator import Address
+from adversarial_music_generator.tune_finder import _install_worker_context
+
+AUTHKEY_ENV_VAR = 'AMG_AUTHKEY'
+
+
+def run_worker(address: Address, authkey: bytes):
+    """
+    connects to a DistributedCoordinator and runs tasks it sends
+    until the coordinator stops it or goes away
+    """
+    connection = Client(address, authkey=authkey)
+
+    try:
+        while True:
+            message = connection.recv()
+
+            if message[0] == 'stop':
+                return
+
+            if message[0] == 'install':
+                _install_worker_context(*message[1])
+                continue
+
+            _, processing_function, task = message
+            try:
+                result = processing_function(task)
+            except Exception:
+                connection.send(('error', traceback.format_exc()))
+            else:
+                connection.send(('result', result))
+    except EOFError:
+        logging.info('coordinator has gone away')
+    finally:
+        connection.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='a worker of a distributed tune search')
+    parser.add_argument('--host', required=True, help='host of the coordinator')
+    parser.add_argument('--port', required=True, type=int, help='port of the coordinator')
+    args = parser.parse_args()
+
+    # taken from the environment not to have it in the process list
+    authkey = os.environ[AUTHKEY_ENV_VAR].encode()
+    run_worker((args.host, args.port), authkey)
+
+
+if __name__ == '__main__':
+    main()
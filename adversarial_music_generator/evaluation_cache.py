@@ -0,0 +1,37 @@
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+AspectValues = Tuple[float, ...]
+
+
+class EvaluationCache:
+    """
+    A bounded cache of evaluations keyed by tune content hashes (see Tune.content_hash)
+    with least-recently-used eviction.
+
+    Only aspect values are kept, in the order of the evaluator's get_aspects().
+    """
+
+    def __init__(self, max_size: int):
+        self._max_size: int = max_size
+        self._values: OrderedDict = OrderedDict()
+        self.num_hits: int = 0
+        self.num_misses: int = 0
+
+    def get(self, content_hash: bytes) -> Optional[AspectValues]:
+        values = self._values.get(content_hash)
+        if values is not None:
+            self._values.move_to_end(content_hash)
+            self.num_hits += 1
+        else:
+            self.num_misses += 1
+        return values
+
+    def put(self, content_hash: bytes, values: AspectValues):
+        self._values[content_hash] = values
+        self._values.move_to_end(content_hash)
+        while len(self._values) > self._max_size:
+            self._values.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._values)
@@ -1,4 +1,7 @@
 from ctypes import Array
+from libc.stdlib cimport malloc, calloc, free
+from libc.string cimport memcpy
+from array import array
 
 def calculate_disharmony(starts_py: Array[float], ends_py: Array[float], pitches_py: Array[int])-> float:
     cdef int i, j, num_notes
@@ -80,3 +83,241 @@ cdef inline float _min(float a, float b):
 cdef inline float _calculate_perceived_overlapping_length(float start_a, float end_a, float start_b, float end_b):
     cdef inline float hearing_inertia = 1.5
     return _max(0.0, _min(end_a + hearing_inertia, end_b + hearing_inertia) - _max(start_a, start_b))
+
+
+ctypedef fused time_t:
+    float
+    double
+
+cdef struct _IndexedNote:
+    float start
+    float end
+    int pitch
+    int idx
+
+# pair terms are summed up in 32.32 fixed point, this makes the sum
+# independent of the order in which pairs are visited
+cdef double _FIXED_POINT_SCALE = 4294967296.0
+cdef float _HEARING_INERTIA = 1.5
+
+
+def calculate_disharmony_sweep(time_t[:] starts, time_t[:] ends, int[:] pitches) -> float:
+    """
+    an equivalent of calculate_disharmony that only visits pairs of notes
+    whose perceived intervals overlap.
+
+    Notes are sorted by start and, for every note, only the notes starting
+    before its end (plus hearing inertia) are looked at, so the cost is
+    O(n log n + number of overlapping pairs) rather than O(n^2).
+
+    Both float and double buffers are accepted, times are converted
+    to float before any math to give exactly the same pair terms
+    as calculate_disharmony does.
+    """
+    return disharmony_from_fixed(calculate_disharmony_sweep_fixed(starts, ends, pitches))
+
+
+def calculate_disharmony_sweep_fixed(time_t[:] starts, time_t[:] ends, int[:] pitches) -> int:
+    """
+    calculate_disharmony_sweep before conversion from fixed point,
+    fixed point sums can be added and subtracted exactly (see calculate_touched_disharmony_fixed)
+    """
+    cdef int num_notes = len(starts)
+    if num_notes == 0:
+        return 0
+
+    cdef _IndexedNote* notes = <_IndexedNote*> malloc(2 * num_notes * sizeof(_IndexedNote))
+    if notes == NULL:
+        raise MemoryError()
+
+    cdef long long res
+    try:
+        _fill_indexed_notes(notes, starts, ends, pitches, 0, num_notes)
+        _sort_by_start(notes, notes + num_notes, num_notes)
+        res = _sweep_disharmony_fixed(notes, num_notes)
+    finally:
+        free(notes)
+
+    return res
+
+
+def calculate_touched_disharmony_fixed(time_t[:] starts, time_t[:] ends, int[:] pitches, int[:] touched) -> int:
+    """
+    sums up (in fixed point) pair terms of the pairs of notes where
+    at least one note is among `touched` (positions of notes, repeated ones count once), every pair once.
+
+    If a change of a tune only touches some notes, its disharmony changes by
+    the touched sum after the change minus the touched sum before it,
+    which costs O(len(touched) * n) rather than a full recalculation.
+    """
+    cdef int num_notes = len(starts)
+    cdef int num_touched = len(touched)
+    cdef int t, i, j
+    for t in range(num_touched):
+        if touched[t] < 0 or touched[t] >= num_notes:
+            raise IndexError(f'touched note {touched[t]} is not among {num_notes} notes (error: 3f9a61d7)')
+
+    if num_touched == 0:
+        return 0
+
+    cdef char* is_touched = <char*> calloc(num_notes, sizeof(char))
+    if is_touched == NULL:
+        raise MemoryError()
+
+    cdef _IndexedNote a, b
+    cdef long long res = 0
+    try:
+        for t in range(num_touched):
+            is_touched[touched[t]] = 1
+
+        for t in range(num_touched):
+            i = touched[t]
+            if is_touched[i] == 2:
+                # a repeated position, its pairs are counted already
+                continue
+            is_touched[i] = 2
+            a.start, a.end, a.pitch, a.idx = <float> starts[i], <float> ends[i], pitches[i], i
+            for j in range(num_notes):
+                # a pair of two touched notes is only counted when visiting the first of them
+                if j == i or (is_touched[j] and j < i):
+                    continue
+                b.start, b.end, b.pitch, b.idx = <float> starts[j], <float> ends[j], pitches[j], j
+                if i < j:
+                    res += _pair_disharmony_fixed(&a, &b)
+                else:
+                    res += _pair_disharmony_fixed(&b, &a)
+    finally:
+        free(is_touched)
+
+    return res
+
+
+def disharmony_from_fixed(long long value) -> float:
+    return value / _FIXED_POINT_SCALE
+
+
+def calculate_disharmony_batch(time_t[:] starts, time_t[:] ends, int[:] pitches, long long[:] offsets):
+    """
+    calculates disharmony (the same way calculate_disharmony_sweep does)
+    of many tunes in one call.
+
+    Notes of all tunes are concatenated in the buffers, notes of i-th tune
+    are found at positions offsets[i] (inclusive) to offsets[i+1] (exclusive),
+    so offsets has one element more than there are tunes.
+
+    Returns an array('d') of disharmony values, one per tune.
+    """
+    cdef Py_ssize_t num_tunes = len(offsets) - 1 if len(offsets) > 0 else 0
+    cdef Py_ssize_t i
+    cdef int num_notes, max_num_notes = 0
+
+    for i in range(num_tunes):
+        num_notes = <int> (offsets[i + 1] - offsets[i])
+        if num_notes > max_num_notes:
+            max_num_notes = num_notes
+
+    res = array('d', [0.0]) * num_tunes
+    if num_tunes == 0 or max_num_notes == 0:
+        return res
+
+    cdef double[:] res_view = res
+    cdef _IndexedNote* notes = <_IndexedNote*> malloc(2 * max_num_notes * sizeof(_IndexedNote))
+    if notes == NULL:
+        raise MemoryError()
+
+    try:
+        for i in range(num_tunes):
+            num_notes = <int> (offsets[i + 1] - offsets[i])
+            _fill_indexed_notes(notes, starts, ends, pitches, offsets[i], num_notes)
+            _sort_by_start(notes, notes + num_notes, num_notes)
+            res_view[i] = _sweep_disharmony_fixed(notes, num_notes) / _FIXED_POINT_SCALE
+    finally:
+        free(notes)
+
+    return res
+
+
+cdef void _fill_indexed_notes(_IndexedNote* notes, time_t[:] starts, time_t[:] ends, int[:] pitches, Py_ssize_t first, int num_notes):
+    cdef int i
+    for i in range(num_notes):
+        notes[i].start = <float> starts[first + i]
+        notes[i].end = <float> ends[first + i]
+        notes[i].pitch = pitches[first + i]
+        notes[i].idx = i
+
+
+cdef void _sort_by_start(_IndexedNote* notes, _IndexedNote* buffer, int num_notes):
+    # bottom-up merge sort; it is stable, so notes starting
+    # at the same time keep their original order
+    cdef int width = 1
+    cdef int lo, mid, hi, i, j, k
+    cdef _IndexedNote* src = notes
+    cdef _IndexedNote* dst = buffer
+    cdef _IndexedNote* tmp
+
+    while width < num_notes:
+        lo = 0
+        while lo < num_notes:
+            mid = lo + width if lo + width < num_notes else num_notes
+            hi = lo + 2 * width if lo + 2 * width < num_notes else num_notes
+            i, j, k = lo, mid, lo
+            while i < mid and j < hi:
+                if src[j].start < src[i].start:
+                    dst[k] = src[j]
+                    j += 1
+                else:
+                    dst[k] = src[i]
+                    i += 1
+                k += 1
+            while i < mid:
+                dst[k] = src[i]
+                i += 1
+                k += 1
+            while j < hi:
+                dst[k] = src[j]
+                j += 1
+                k += 1
+            lo += 2 * width
+        tmp = src
+        src = dst
+        dst = tmp
+        width *= 2
+
+    if src != notes:
+        memcpy(notes, src, num_notes * sizeof(_IndexedNote))
+
+
+cdef long long _sweep_disharmony_fixed(_IndexedNote* notes, int num_notes):
+    cdef int p, q
+    cdef float reach
+    cdef long long res = 0
+
+    for p in range(num_notes):
+        # any note starting at or after `reach` can not overlap with the note p,
+        # and neither can the following ones as they start even later
+        reach = notes[p].end + _HEARING_INERTIA
+        q = p + 1
+        while q < num_notes and notes[q].start < reach:
+            # the pair term is not symmetric in pitches,
+            # the note coming first in the input goes first
+            if notes[p].idx < notes[q].idx:
+                res += _pair_disharmony_fixed(&notes[p], &notes[q])
+            else:
+                res += _pair_disharmony_fixed(&notes[q], &notes[p])
+            q += 1
+
+    return res
+
+
+cdef inline long long _pair_disharmony_fixed(_IndexedNote* a, _IndexedNote* b):
+    cdef float overlapping_length = _calculate_perceived_overlapping_length(a.start, a.end, b.start, b.end)
+
+    if overlapping_length == 0.0:
+        return 0
+
+    cdef int interval = (a.pitch - b.pitch) % 12
+    if interval < 0:
+        interval = -1 * interval
+
+    cdef float disharmony = _get_disharmony_map_value(interval) * overlapping_length
+    return <long long> (<double> disharmony * _FIXED_POINT_SCALE + 0.5)
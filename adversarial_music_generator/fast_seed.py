@@ -0,0 +1,56 @@
+from hashlib import blake2b
+from typing import Iterable, List
+
+from adversarial_music_generator.seed import Seed
+
+
+class FastSeed(Seed):
+    """
+    A faster drop-in alternative to Seed
+
+    It keeps the contract (the same seed and sub_seed always give the same value),
+    but instead of setting up a Mersenne Twister for every value, a value is
+    derived from a keyed hash of the sub_seed. The hash state of the seed itself
+    (and of a sub_seed prefix in bulk draws) is computed only once.
+
+    Values are NOT the same as the ones given by Seed for the same sub_seeds.
+    """
+
+    _DIGEST_SIZE = 8
+    _FLOAT_SCALE = 2.0 ** -53
+
+    def __init__(self, seed: str = None):
+        super().__init__(seed)
+        self._hash = blake2b(self._seed.encode(), digest_size=self._DIGEST_SIZE)
+
+    def randint(self, min_val: int, max_val: int, sub_seed: str):
+        return self._int_from_value(min_val, max_val, self._value(self._hash, sub_seed))
+
+    def randfloat(self, min_val: float, max_val: float, sub_seed: str) -> float:
+        return self._float_from_value(min_val, max_val, self._value(self._hash, sub_seed))
+
+    def randints(self, min_val: int, max_val: int, sub_seed_prefix: str, indices: Iterable[int]) -> List[int]:
+        prefix_hash = self._get_prefix_hash(sub_seed_prefix)
+        return [self._int_from_value(min_val, max_val, self._value(prefix_hash, str(i))) for i in indices]
+
+    def randfloats(self, min_val: float, max_val: float, sub_seed_prefix: str, indices: Iterable[int]) -> List[float]:
+        prefix_hash = self._get_prefix_hash(sub_seed_prefix)
+        return [self._float_from_value(min_val, max_val, self._value(prefix_hash, str(i))) for i in indices]
+
+    def _get_prefix_hash(self, sub_seed_prefix: str):
+        prefix_hash = self._hash.copy()
+        prefix_hash.update(sub_seed_prefix.encode())
+        return prefix_hash
+
+    def _value(self, base_hash, suffix: str) -> int:
+        h = base_hash.copy()
+        h.update(suffix.encode())
+        return int.from_bytes(h.digest(), 'little')
+
+    def _int_from_value(self, min_val: int, max_val: int, value: int) -> int:
+        # multiply-shift maps a 64 bit value onto the range
+        return min_val + ((value * (max_val - min_val + 1)) >> 64)
+
+    def _float_from_value(self, min_val: float, max_val: float, value: int) -> float:
+        rnd = (value >> 11) * self._FLOAT_SCALE
+        return min_val + rnd * (max_val - min_val)
@@ -1,6 +1,8 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from typing import Optional, List
+
 from adversarial_music_generator.interfaces import TuneGeneratorInterface, TuneEvaluatorInterface, \
-    EvaluationReducerInterface, TuneMutatorInterface, TuneProcessorInterface
+    EvaluationReducerInterface, TuneMutatorInterface, TuneProcessorInterface, StoppingPolicyInterface
 
 
 @dataclass
@@ -18,4 +20,35 @@ class FindTunesTask:
     num_tunes_to_find: int
     base_seed: str
     parallelize: bool = True
+    # iterations per task, with adaptive chunking it is the max chunk size
     chunk_size: int = 1000
+    # size tasks by how long the previous ones took, aiming at target_chunk_seconds of worker time per task
+    adaptive_chunking: bool = False
+    target_chunk_seconds: float = 1.0
+    min_chunk_size: int = 20
+    # cut mutation epochs into tasks by parent rather than by iteration: a task mutates a few parents
+    # many times instead of all the parents a few times, so it materializes only the parents it needs
+    partition_mutations_by_parent: bool = False
+    # max number of materialized tunes kept by every worker to replay blueprints
+    # from their cached parents rather than from scratch, 0 disables the cache
+    tune_cache_size: int = 2048
+    # max number of evaluations every worker remembers by tune content, so that
+    # surviving and duplicate tunes are not evaluated again, 0 disables the cache
+    evaluation_cache_size: int = 16384
+    # evaluate mutated tunes from their parents and mutation deltas, if the evaluator, the mutator
+    # and the postprocessor support that (see IncrementalTuneEvaluatorInterface)
+    incremental_evaluation: bool = True
+    # number of worker processes, defaults to the number of CPU cores available
+    pool_size: Optional[int] = None
+    # a file to keep the search state in after every phase, if it exists
+    # when the search starts, the search resumes from where it stopped
+    checkpoint_path: Optional[str] = None
+    # files to write metrics of the search to after every phase, as json and in Prometheus text format
+    metrics_path: Optional[str] = None
+    prometheus_metrics_path: Optional[str] = None
+    # if set, every worker collects a cProfile profile of its tasks into a worker_<pid>.prof file there
+    profile_dir: Optional[str] = None
+    # if set, workers trace memory allocations and report peak traced memory of their tasks
+    trace_memory: bool = False
+    # checked after every phase, the first one to fire ends the search (see stopping_policies)
+    stopping_policies: List[StoppingPolicyInterface] = field(default_factory=list)
@@ -1,6 +1,9 @@
 from abc import ABC, abstractmethod
-from typing import List
+from typing import List, Optional, Any
 
+from adversarial_music_generator.models.mutation_delta import MutationDelta
+from adversarial_music_generator.models.packed_tunes import PackedTunes
+from adversarial_music_generator.models.search_snapshot import SearchSnapshot
 from adversarial_music_generator.models.tune import Tune
 from adversarial_music_generator.models.tune_evaluation_result import TuneEvaluationResult
 
@@ -10,6 +13,13 @@ class TuneGeneratorInterface(ABC):
     def generate_tunes(self, generator_seed: str, tune_seeds: List[str]) -> List[Tune]:
         pass
 
+    def get_calibration_cache_key(self) -> str:
+        """
+        tells this generator apart in keys of cached calibrations,
+        generators making different tunes for the same seeds must have different keys
+        """
+        return type(self).__module__ + '.' + type(self).__qualname__
+
 
 class TuneEvaluatorInterface(ABC):
 
@@ -29,6 +39,16 @@ class TuneMutatorInterface(ABC):
     def mutate_tune(self, tune: Tune, seed: str):
         pass
 
+    def mutate_tune_with_delta(self, tune: Tune, seed: str) -> Optional[MutationDelta]:
+        """
+        same as mutate_tune, but also tells which notes have been touched, so that the mutated
+        tune can be evaluated incrementally (see IncrementalTuneEvaluatorInterface).
+
+        None means the mutator does not know, that is what mutators not overriding this method return.
+        """
+        self.mutate_tune(tune, seed)
+        return None
+
 
 class EvaluationReducerInterface(ABC):
     @abstractmethod
@@ -41,3 +61,64 @@ class TuneProcessorInterface(ABC):
     @abstractmethod
     def process(self, tune: Tune, base_seed: str, tune_seed: str):
         pass
+
+    def leaves_tunes_unchanged(self) -> bool:
+        """
+        postprocessors doing nothing to tunes say so here, which lets the finder
+        evaluate mutated tunes incrementally from their (postprocessed) parents
+        """
+        return False
+
+
+class IncrementalTuneEvaluatorInterface(TuneEvaluatorInterface):
+    """
+    an evaluator able to evaluate a mutated tune from an evaluation state of its parent
+    and the delta of the mutation, much cheaper than from scratch.
+
+    Results must be the same as those of evaluate_tunes.
+    """
+
+    @abstractmethod
+    def get_evaluation_states(self, tunes: List[Tune]) -> List[Any]:
+        """
+        whatever the evaluator needs to remember about a tune to evaluate its mutations later
+        """
+        pass
+
+    @abstractmethod
+    def evaluate_mutated_tunes(self, parent_tunes: List[Tune], parent_states: List[Any], tunes: List[Tune],
+                               deltas: List[MutationDelta]) -> List[TuneEvaluationResult]:
+        """
+        i-th tune is the i-th parent tune mutated as described by the i-th delta
+        """
+        pass
+
+
+class PackedTuneEvaluatorInterface(TuneEvaluatorInterface):
+    """
+    an evaluator that only looks at notes and can evaluate tunes given as PackedTunes,
+    so that shared or memory-mapped tunes are evaluated in place, without materializing them.
+
+    Results must be the same as those of evaluate_tunes.
+    """
+
+    @abstractmethod
+    def evaluate_packed_tunes(self, packed: PackedTunes) -> List[TuneEvaluationResult]:
+        pass
+
+
+class StoppingPolicyInterface(ABC):
+    """
+    decides whether a search should stop instead of running its next mutation epoch,
+    the best tunes found so far are returned then
+    """
+
+    @abstractmethod
+    def should_stop(self, snapshots: List[SearchSnapshot], num_evaluations_in_next_epoch: int) -> bool:
+        """
+        :param snapshots: all snapshots of the search so far, the latest one goes last
+                          (those from before a resumed checkpoint only have their best score)
+        :param num_evaluations_in_next_epoch: number of tunes the next epoch would evaluate
+        :return: True to end the search before that epoch
+        """
+        pass
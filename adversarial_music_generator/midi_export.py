@@ -0,0 +1,127 @@
+import io
+import os
+import tarfile
+import time
+import zipfile
+from multiprocessing.pool import Pool
+from typing import List, Optional, Iterator, Tuple
+
+from adversarial_music_generator.cpus import get_num_available_cpus
+from adversarial_music_generator.models.tune import Tune
+from adversarial_music_generator.tune_to_midi_converter import TuneToMidiConverter
+
+# archive extensions and the tarfile modes to write them with, zip is handled separately
+_TAR_MODES = {
+    '.tar': 'w',
+    '.tar.gz': 'w:gz',
+    '.tgz': 'w:gz',
+    '.tar.bz2': 'w:bz2',
+    '.tar.xz': 'w:xz',
+}
+
+# the converter of this process, set up by the pool initializer
+_converter: Optional[TuneToMidiConverter] = None
+
+
+class MidiExportError(Exception):
+    pass
+
+
+def _install_converter(converter: TuneToMidiConverter):
+    global _converter
+    _converter = converter
+
+
+def _convert_to_bytes(tune: Tune) -> bytes:
+    return _converter.to_bytes(tune)
+
+
+def _convert_to_file(tune_and_path: Tuple[Tune, str]) -> str:
+    tune, path = tune_and_path
+    _converter.convert(tune, path)
+    return path
+
+
+class BatchMidiExporter:
+    """
+    exports many tunes at once, in parallel worker processes if asked to,
+    either as separate files in a directory or into a single zip or tar archive
+    """
+
+    def __init__(self, converter: Optional[TuneToMidiConverter] = None, parallelize: bool = True,
+                 pool_size: Optional[int] = None, chunk_size: int = 16):
+        """
+        :param converter: the converter to use, a direct encoding one by default
+        :param pool_size: number of worker processes, defaults to the number of CPU cores available
+        :param chunk_size: number of tunes sent to a worker at once
+        """
+        self._converter: TuneToMidiConverter = converter or TuneToMidiConverter(use_direct_encoder=True)
+        self._parallelize: bool = parallelize
+        self._pool_size: Optional[int] = pool_size
+        self._chunk_size: int = chunk_size
+
+    def export_to_dir(self, tunes: List[Tune], dir_path: str, file_names: Optional[List[str]] = None) -> List[str]:
+        """
+        writes a file per tune into the directory (created if missing), returns paths of the files
+        """
+        os.makedirs(dir_path, exist_ok=True)
+        paths = [os.path.join(dir_path, file_name) for file_name in self._get_file_names(tunes, file_names)]
+
+        # workers write the files themselves, so no midi data goes back to this process
+        return list(self._map(_convert_to_file, list(zip(tunes, paths))))
+
+    def export_to_archive(self, tunes: List[Tune], archive_path: str, file_names: Optional[List[str]] = None):
+        """
+        writes tunes into a zip or a (possibly compressed) tar archive, the format is chosen
+        by the extension of the path. Files are added as soon as they are converted, in order.
+        """
+        file_names = self._get_file_names(tunes, file_names)
+        midi_files = self._map(_convert_to_bytes, tunes)
+
+        if archive_path.endswith('.zip'):
+            with zipfile.ZipFile(archive_path, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+                for file_name, data in zip(file_names, midi_files):
+                    archive.writestr(file_name, data)
+            return
+
+        with tarfile.open(archive_path, self._get_tar_mode(archive_path)) as archive:
+            now = time.time()
+            for file_name, data in zip(file_names, midi_files):
+                info = tarfile.TarInfo(file_name)
+                info.size = len(data)
+                info.mtime = now
+                archive.addfile(info, io.BytesIO(data))
+
+    def _map(self, function, items: List) -> Iterator:
+        if not self._parallelize or len(items) <= self._chunk_size:
+            _install_converter(self._converter)
+            yield from map(function, items)
+            return
+
+        with Pool(self._get_pool_size(), initializer=_install_converter, initargs=(self._converter,)) as pool:
+            yield from pool.imap(function, items, self._chunk_size)
+
+    def _get_pool_size(self) -> int:
+        if self._pool_size is not None:
+            return self._pool_size
+
+        return get_num_available_cpus()
+
+    @staticmethod
+    def _get_file_names(tunes: List[Tune], file_names: Optional[List[str]]) -> List[str]:
+        if file_names is None:
+            return [f'tune_{i}.mid' for i in range(len(tunes))]
+
+        if len(file_names) != len(tunes):
+            raise MidiExportError(f'got {len(file_names)} file names for {len(tunes)} tunes (error: 3e8a61c7)')
+
+        return file_names
+
+    @staticmethod
+    def _get_tar_mode(archive_path: str) -> str:
+        for extension, mode in _TAR_MODES.items():
+            if archive_path.endswith(extension):
+                return mode
+
+        raise MidiExportError(f'cannot tell the archive format of {archive_path}, '
+                              f'expected .zip or one of {", ".join(_TAR_MODES)} (error: a41f07d2)')
@@ -0,0 +1,247 @@
+from array import array
+from dataclasses import dataclass
+from typing import List, Dict, Optional, Tuple, Any
+
+from adversarial_music_generator.interfaces import TuneMutatorInterface
+from adversarial_music_generator.models.tune_blueprint import TuneBlueprint
+
+# mutations of a compact blueprint as a linked list, the latest one first:
+# (earlier mutations, epoch, index, hash of all of them), None if there are no mutations.
+# Children share the mutations of their parent rather than copy them.
+MutationSteps = Optional[Tuple[Any, int, int, int]]
+
+MUTATION_EPOCH_INFIX = '_mutation_epoch_'
+
+
+class BlueprintError(Exception):
+    pass
+
+
+def create_tune_seed(base_seed: str, tune_idx: int) -> str:
+    return base_seed + str(tune_idx)
+
+
+def create_mutation_seed(base_seed: str, epoch: int, index: int) -> str:
+    if index == CompactBlueprint.TRANSPARENT_INDEX:
+        return TuneMutatorInterface.SPECIAL_SEED_STR_TO_LEAVE_TUNE_UNMUTATED
+    return base_seed + MUTATION_EPOCH_INFIX + str(epoch) + '_' + str(index)
+
+
+class BaseSeedTable:
+    """
+    interned base seeds, compact blueprints refer to them by index
+    """
+
+    def __init__(self, base_seeds: Optional[List[str]] = None):
+        self._base_seeds: List[str] = []
+        self._indices: Dict[str, int] = {}
+        for base_seed in base_seeds or []:
+            self.intern(base_seed)
+
+    def intern(self, base_seed: str) -> int:
+        idx = self._indices.get(base_seed)
+        if idx is None:
+            idx = len(self._base_seeds)
+            self._base_seeds.append(base_seed)
+            self._indices[base_seed] = idx
+        return idx
+
+    def __getitem__(self, idx: int) -> str:
+        return self._base_seeds[idx]
+
+    def __len__(self) -> int:
+        return len(self._base_seeds)
+
+    def __getstate__(self):
+        return self._base_seeds
+
+    def __setstate__(self, state):
+        self.__init__(state)
+
+
+@dataclass(frozen=True, eq=False)
+class CompactBlueprint:
+    """
+    a TuneBlueprint of a tune found by a search, made of integers rather than seed strings:
+
+    - the base seed is an index in a BaseSeedTable
+    - the tune seed is base seed + tune_idx
+    - every mutation seed is made of the base seed, an epoch and an index within the epoch
+
+    Blueprints are immutable, so that a mutated child just links to the mutations of its parent.
+    expand() gives the very seeds the search has used, so tunes are reproduced exactly.
+
+    Nothing here recurses over the mutations: the hash is kept along with every step, comparing
+    walks both lists in a loop (and stops where they start being shared), pickling flattens them.
+    """
+    # an index standing for the seed leaving a tune unmutated
+    TRANSPARENT_INDEX = -1
+
+    base_seed_idx: int
+    tune_idx: int
+    steps: MutationSteps = None
+    num_mutations: int = 0
+
+    def mutate(self, epoch: int, index: int) -> 'CompactBlueprint':
+        if index == self.TRANSPARENT_INDEX:
+            # the seed does not depend on the epoch then, so neither does the blueprint
+            epoch = 0
+        steps = (self.steps, epoch, index, hash((_get_steps_hash(self.steps), epoch, index)))
+        return CompactBlueprint(self.base_seed_idx, self.tune_idx, steps, self.num_mutations + 1)
+
+    def get_steps(self) -> List[Tuple[int, int]]:
+        """
+        (epoch, index) of every mutation, the earliest one first
+        """
+        res = []
+        steps = self.steps
+        while steps is not None:
+            steps, epoch, index, _ = steps
+            res.append((epoch, index))
+        res.reverse()
+        return res
+
+    def get_prefix(self, num_mutations: int) -> 'CompactBlueprint':
+        """
+        the blueprint of the ancestor having the first num_mutations mutations
+        """
+        if not 0 <= num_mutations <= self.num_mutations:
+            raise BlueprintError(f'blueprint has no prefix of {num_mutations} mutations (error: 5b90c3e1)')
+
+        steps = self.steps
+        for _ in range(self.num_mutations - num_mutations):
+            steps = steps[0]
+        return CompactBlueprint(self.base_seed_idx, self.tune_idx, steps, num_mutations)
+
+    def expand(self, base_seeds: BaseSeedTable) -> TuneBlueprint:
+        base_seed = base_seeds[self.base_seed_idx]
+        return TuneBlueprint(
+            base_seed=base_seed,
+            tune_seed=create_tune_seed(base_seed, self.tune_idx),
+            mutation_seeds=[create_mutation_seed(base_seed, epoch, index) for epoch, index in self.get_steps()]
+        )
+
+    @classmethod
+    def from_blueprint(cls, blueprint: TuneBlueprint, base_seeds: BaseSeedTable) -> 'CompactBlueprint':
+        """
+        the opposite of expand, only works for seeds made the way expand makes them
+        """
+        base_seed = blueprint.base_seed
+        mutation_seed_prefix = base_seed + MUTATION_EPOCH_INFIX
+        res = cls(base_seeds.intern(base_seed), cls._parse_int(blueprint.tune_seed, base_seed))
+
+        for mutation_seed in blueprint.mutation_seeds:
+            if mutation_seed == TuneMutatorInterface.SPECIAL_SEED_STR_TO_LEAVE_TUNE_UNMUTATED:
+                res = res.mutate(0, cls.TRANSPARENT_INDEX)
+                continue
+
+            epoch, _, index = mutation_seed[len(mutation_seed_prefix):].partition('_')
+            res = res.mutate(cls._parse_int(mutation_seed, mutation_seed_prefix, epoch),
+                             cls._parse_int(mutation_seed, mutation_seed_prefix, index))
+
+        return res
+
+    @staticmethod
+    def _parse_int(seed: str, prefix: str, text: Optional[str] = None) -> int:
+        """
+        parses text (by default, what follows the prefix in the seed), making sure
+        that formatting the number gives the same text back
+        """
+        if text is None:
+            text = seed[len(prefix):]
+        if not seed.startswith(prefix) or not (text.isascii() and text.isdigit()) or str(int(text)) != text:
+            raise BlueprintError(f'seed {seed} cannot be made compact (error: 0d6e2f4a)')
+        return int(text)
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, CompactBlueprint):
+            return NotImplemented
+
+        if (self.base_seed_idx, self.tune_idx, self.num_mutations) != \
+                (other.base_seed_idx, other.tune_idx, other.num_mutations):
+            return False
+
+        steps, other_steps = self.steps, other.steps
+        while steps is not other_steps:
+            # both have the same number of mutations, so neither runs out before the other
+            if steps[1:] != other_steps[1:]:
+                return False
+            steps, other_steps = steps[0], other_steps[0]
+        return True
+
+    def __hash__(self) -> int:
+        return hash((self.base_seed_idx, self.tune_idx, _get_steps_hash(self.steps)))
+
+    def __reduce__(self):
+        # mutations go flat, as epoch, index, epoch, index... pickling the linked list
+        # would take a level of recursion per mutation
+        flat_steps = tuple(number for step in self.get_steps() for number in step)
+        return _restore_compact_blueprint, (self.base_seed_idx, self.tune_idx, flat_steps)
+
+
+def _get_steps_hash(steps: MutationSteps) -> int:
+    return 0 if steps is None else steps[3]
+
+
+def pack_blueprints(blueprints: List[Optional[CompactBlueprint]]) -> Tuple[array, array]:
+    """
+    compact blueprints (or Nones) in two flat arrays, mutations shared by blueprints
+    (those of a common ancestor) are stored once:
+
+    - steps: (earlier step, epoch, index) triples, an earlier step is referred to by its position, -1 for none
+    - rows: (base seed idx, tune idx, latest step) triples, base seed idx is -1 for None
+    """
+    steps, rows = array('i'), array('i')
+    step_positions: Dict[int, int] = {}
+
+    for blueprint in blueprints:
+        if blueprint is None:
+            rows.extend((-1, 0, -1))
+            continue
+
+        # steps not stored yet, the latest one first
+        new_steps = []
+        node = blueprint.steps
+        while node is not None and id(node) not in step_positions:
+            new_steps.append(node)
+            node = node[0]
+
+        earlier_position = step_positions[id(node)] if node is not None else -1
+        for node in reversed(new_steps):
+            steps.extend((earlier_position, node[1], node[2]))
+            earlier_position = step_positions[id(node)] = len(steps) // 3 - 1
+
+        rows.extend((blueprint.base_seed_idx, blueprint.tune_idx, earlier_position))
+
+    return steps, rows
+
+
+def unpack_blueprints(packed: Tuple[array, array]) -> List[Optional[CompactBlueprint]]:
+    steps, rows = packed
+    nodes: List[MutationSteps] = []
+    depths: List[int] = []
+
+    for i in range(0, len(steps), 3):
+        earlier_position, epoch, index = steps[i], steps[i + 1], steps[i + 2]
+        earlier = nodes[earlier_position] if earlier_position >= 0 else None
+        nodes.append((earlier, epoch, index, hash((_get_steps_hash(earlier), epoch, index))))
+        depths.append(depths[earlier_position] + 1 if earlier_position >= 0 else 1)
+
+    res: List[Optional[CompactBlueprint]] = []
+    for i in range(0, len(rows), 3):
+        base_seed_idx, tune_idx, position = rows[i], rows[i + 1], rows[i + 2]
+        if base_seed_idx < 0:
+            res.append(None)
+        elif position < 0:
+            res.append(CompactBlueprint(base_seed_idx, tune_idx))
+        else:
+            res.append(CompactBlueprint(base_seed_idx, tune_idx, nodes[position], depths[position]))
+
+    return res
+
+
+def _restore_compact_blueprint(base_seed_idx: int, tune_idx: int, flat_steps: Tuple[int, ...]) -> CompactBlueprint:
+    res = CompactBlueprint(base_seed_idx, tune_idx)
+    for i in range(0, len(flat_steps), 2):
+        res = res.mutate(flat_steps[i], flat_steps[i + 1])
+    return res
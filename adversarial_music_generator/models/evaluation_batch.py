@@ -0,0 +1,109 @@
+from array import array
+from typing import List, Dict, Iterator, Optional
+
+from adversarial_music_generator.models.compact_blueprint import CompactBlueprint, pack_blueprints, unpack_blueprints
+from adversarial_music_generator.models.tune_blueprint import TuneBlueprint
+from adversarial_music_generator.models.tune_evaluation_result import TuneEvaluationResult, TuneEvaluationError
+
+
+class EvaluationBatch:
+    """
+    evaluations of many tunes in a compact form:
+
+    - an aspect schema shared by all the evaluations (normally evaluator.get_aspects())
+    - a row-major matrix of aspect values, a row per tune, a column per aspect
+    - a column of blueprints, one per tune (TuneBlueprint or CompactBlueprint)
+
+    Compared to a list of TuneEvaluationResult's, there are no per-tune dicts
+    repeating aspect names, which makes batches cheap to keep and to pickle.
+    """
+
+    def __init__(self, aspects: List[str], values: array, blueprints: List[Optional[TuneBlueprint]]):
+        if len(values) != len(aspects) * len(blueprints):
+            raise TuneEvaluationError('evaluation matrix does not match its schema (error: 2c5a0f8e)')
+
+        self.aspects: List[str] = aspects
+        self.values: array = values
+        self.blueprints: List[Optional[TuneBlueprint]] = blueprints
+        self._aspect_indices: Dict[str, int] = {aspect: i for i, aspect in enumerate(aspects)}
+
+    @classmethod
+    def from_results(cls, aspects: List[str], results: List[TuneEvaluationResult]) -> 'EvaluationBatch':
+        values = array('d', [result.get_aspect_value(aspect) for result in results for aspect in aspects])
+        return cls(aspects, values, [result.blueprint for result in results])
+
+    def __len__(self) -> int:
+        return len(self.blueprints)
+
+    def __iter__(self) -> Iterator['EvaluationBatchRow']:
+        for row in range(len(self)):
+            yield EvaluationBatchRow(self, row)
+
+    def __getstate__(self):
+        # blueprints of a search are compact, mutations of their common ancestors are packed once
+        if all(blueprint is None or isinstance(blueprint, CompactBlueprint) for blueprint in self.blueprints):
+            return self.aspects, self.values, pack_blueprints(self.blueprints)
+        return self.aspects, self.values, self.blueprints
+
+    def __setstate__(self, state):
+        aspects, values, blueprints = state
+        if isinstance(blueprints, tuple):
+            blueprints = unpack_blueprints(blueprints)
+        self.__init__(aspects, values, blueprints)
+
+    def get_aspect_value(self, row: int, aspect: str) -> float:
+        return self.values[row * len(self.aspects) + self._get_aspect_index(aspect)]
+
+    def set_aspect_value(self, row: int, aspect: str, value: float):
+        self.values[row * len(self.aspects) + self._get_aspect_index(aspect)] = value
+
+    def get_view(self, row: int) -> 'EvaluationBatchRow':
+        """
+        a cheap single-result view of the row, it reads and writes the batch itself
+        """
+        return EvaluationBatchRow(self, row)
+
+    def get_result(self, row: int) -> TuneEvaluationResult:
+        """
+        a standalone copy of the row, it does not keep the batch alive
+        """
+        res = TuneEvaluationResult()
+        for aspect in self.aspects:
+            res.set_aspect_value(aspect, self.get_aspect_value(row, aspect))
+        res.blueprint = self.blueprints[row]
+        return res
+
+    def _get_aspect_index(self, aspect: str) -> int:
+        if aspect not in self._aspect_indices:
+            raise TuneEvaluationError(f"aspect named {aspect} is not a part of this batch (error: 4e1d7b93)")
+        return self._aspect_indices[aspect]
+
+
+class EvaluationBatchRow(TuneEvaluationResult):
+    """
+    a TuneEvaluationResult backed by a row of an EvaluationBatch,
+    so that reducers can be used on batches as they are
+    """
+    __slots__ = ('_batch', '_row')
+
+    # noinspection PyMissingConstructor
+    def __init__(self, batch: EvaluationBatch, row: int):
+        self._batch: EvaluationBatch = batch
+        self._row: int = row
+
+    @property
+    def blueprint(self) -> Optional[TuneBlueprint]:
+        return self._batch.blueprints[self._row]
+
+    @blueprint.setter
+    def blueprint(self, blueprint: Optional[TuneBlueprint]):
+        self._batch.blueprints[self._row] = blueprint
+
+    def set_aspect_value(self, aspect: str, value: float):
+        self._batch.set_aspect_value(self._row, aspect, value)
+
+    def get_aspect_value(self, aspect: str) -> float:
+        return self._batch.get_aspect_value(self._row, aspect)
+
+    def __iter__(self):
+        return iter(self._batch.aspects)
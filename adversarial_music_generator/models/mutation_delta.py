@@ -0,0 +1,23 @@
+from dataclasses import dataclass, field
+from typing import List, Tuple
+
+
+@dataclass
+class MutationDelta:
+    """
+    notes touched by a mutation, positions are global across tracks (see Tune.note_columns):
+    - removed_notes: positions in the tune before the mutation
+    - changed_notes: (position before, position after) of notes that stayed but may have been changed
+    - added_notes: positions in the tune after the mutation
+
+    Notes not mentioned here are expected to be left intact (and in the same relative order).
+    """
+    removed_notes: List[int] = field(default_factory=list)
+    changed_notes: List[Tuple[int, int]] = field(default_factory=list)
+    added_notes: List[int] = field(default_factory=list)
+
+    def get_touched_notes_before(self) -> List[int]:
+        return sorted(set(self.removed_notes).union(before for before, _ in self.changed_notes))
+
+    def get_touched_notes_after(self) -> List[int]:
+        return sorted(set(self.added_notes).union(after for _, after in self.changed_notes))
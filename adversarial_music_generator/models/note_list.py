@@ -0,0 +1,67 @@
+from collections.abc import MutableSequence
+from typing import Union, List
+
+from adversarial_music_generator.models.note import Note
+from adversarial_music_generator.models.note_view import NoteView
+
+NoteLike = Union[Note, NoteView]
+
+
+class NoteList(MutableSequence):
+    """
+    A list-like facade over the note columns of a Track.
+
+    It keeps the good old `track.notes` usage working (iteration, indexing,
+    append, del etc.) while the actual data lives in the track's arrays.
+    """
+
+    def __init__(self, track):
+        self._track = track
+
+    def __len__(self) -> int:
+        return self._track.num_notes
+
+    def __getitem__(self, idx: Union[int, slice]) -> Union[NoteView, List[NoteView]]:
+        if isinstance(idx, slice):
+            return [NoteView(self._track, i) for i in range(*idx.indices(len(self)))]
+        return NoteView(self._track, self._normalize_index(idx))
+
+    def __setitem__(self, idx: int, note: NoteLike):
+        if isinstance(idx, slice):
+            raise TypeError('slice assignment is not supported for track notes (error: 0f3b6a1e)')
+        idx = self._normalize_index(idx)
+        pitches, starts, ends, velocities = self._track.get_writable_columns()
+        pitches[idx] = note.note
+        starts[idx] = note.start_time_seconds
+        ends[idx] = note.end_time_seconds
+        velocities[idx] = note.velocity
+
+    def __delitem__(self, idx: Union[int, slice]):
+        pitches, starts, ends, velocities = self._track.get_writable_columns()
+        del pitches[idx]
+        del starts[idx]
+        del ends[idx]
+        del velocities[idx]
+
+    def __iter__(self):
+        track = self._track
+        for i in range(track.num_notes):
+            yield NoteView(track, i)
+
+    def insert(self, idx: int, note: NoteLike):
+        pitches, starts, ends, velocities = self._track.get_writable_columns()
+        pitches.insert(idx, note.note)
+        starts.insert(idx, note.start_time_seconds)
+        ends.insert(idx, note.end_time_seconds)
+        velocities.insert(idx, note.velocity)
+
+    def append(self, note: NoteLike):
+        self._track.add_note(note.note, note.start_time_seconds, note.end_time_seconds, note.velocity)
+
+    def _normalize_index(self, idx: int) -> int:
+        length = len(self)
+        if idx < 0:
+            idx += length
+        if not 0 <= idx < length:
+            raise IndexError('note index out of range')
+        return idx
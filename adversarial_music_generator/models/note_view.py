@@ -0,0 +1,67 @@
+from adversarial_music_generator.models.note import Note
+
+
+class NoteView:
+    """
+    A Note-like accessor to a single note stored in the columns of a Track.
+
+    Reading and writing attributes of a view goes straight to the
+    underlying arrays, so no per-note object is kept around. Views
+    are positional: once notes are inserted or removed before this one,
+    the view points to a different note.
+
+    Reading does not make the track copy arrays it shares with its clones, writing does.
+    """
+    __slots__ = ('_track', '_idx')
+
+    def __init__(self, track, idx: int):
+        self._track = track
+        self._idx: int = idx
+
+    @property
+    def note(self) -> int:
+        return self._track.get_columns()[0][self._idx]
+
+    @note.setter
+    def note(self, value: int):
+        self._track.get_writable_columns()[0][self._idx] = value
+
+    @property
+    def start_time_seconds(self) -> float:
+        return self._track.get_columns()[1][self._idx]
+
+    @start_time_seconds.setter
+    def start_time_seconds(self, value: float):
+        self._track.get_writable_columns()[1][self._idx] = value
+
+    @property
+    def end_time_seconds(self) -> float:
+        return self._track.get_columns()[2][self._idx]
+
+    @end_time_seconds.setter
+    def end_time_seconds(self, value: float):
+        self._track.get_writable_columns()[2][self._idx] = value
+
+    @property
+    def velocity(self) -> float:
+        return self._track.get_columns()[3][self._idx]
+
+    @velocity.setter
+    def velocity(self, value: float):
+        self._track.get_writable_columns()[3][self._idx] = value
+
+    def to_note(self) -> Note:
+        return Note(note=self.note, start_time_seconds=self.start_time_seconds,
+                    end_time_seconds=self.end_time_seconds, velocity=self.velocity)
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, (Note, NoteView)):
+            return NotImplemented
+        return (self.note == other.note
+                and self.start_time_seconds == other.start_time_seconds
+                and self.end_time_seconds == other.end_time_seconds
+                and self.velocity == other.velocity)
+
+    def __repr__(self) -> str:
+        return f"NoteView(note={self.note}, start_time_seconds={self.start_time_seconds}, " \
+               f"end_time_seconds={self.end_time_seconds}, velocity={self.velocity})"
@@ -0,0 +1,42 @@
+from array import array
+from typing import List
+
+from adversarial_music_generator.models.tune import Tune
+
+
+class PackedTunes:
+    """
+    note columns of many tunes concatenated into contiguous buffers
+
+    notes of i-th tune occupy positions offsets[i] (inclusive)
+    to offsets[i+1] (exclusive) of every column, within a tune
+    notes go in the same order as Tune.all_notes() yields them.
+    """
+
+    def __init__(self, pitches: array, starts: array, ends: array, velocities: array, offsets: array):
+        self.pitches: array = pitches
+        self.starts: array = starts
+        self.ends: array = ends
+        self.velocities: array = velocities
+        self.offsets: array = offsets
+
+    @classmethod
+    def from_tunes(cls, tunes: List[Tune]) -> 'PackedTunes':
+        pitches, starts, ends, velocities = array('i'), array('d'), array('d'), array('d')
+        offsets = array('q', [0])
+        for tune in tunes:
+            for track in tune.tracks:
+                track_pitches, track_starts, track_ends, track_velocities = track.get_columns()
+                pitches += track_pitches
+                starts += track_starts
+                ends += track_ends
+                velocities += track_velocities
+            offsets.append(len(pitches))
+
+        return cls(pitches, starts, ends, velocities, offsets)
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def get_num_notes(self, tune_idx: int) -> int:
+        return self.offsets[tune_idx + 1] - self.offsets[tune_idx]
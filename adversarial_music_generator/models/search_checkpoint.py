@@ -0,0 +1,51 @@
+from dataclasses import dataclass, field
+from typing import List, Dict, Any, Optional
+
+from adversarial_music_generator.models.tune_blueprint import TuneBlueprint
+
+
+@dataclass
+class SearchCheckpoint:
+    """
+    a state of a search taken after its random phase (next_epoch == 0)
+    or after a mutation epoch, blueprints go best first
+    """
+    task_parameters: Dict[str, Any]
+    next_epoch: int
+    blueprints: List[TuneBlueprint]
+    scores: List[float]
+    # evaluations of the blueprints, as values of the evaluator's aspects in get_aspects() order
+    aspect_values: Optional[List[List[float]]] = None
+    # name of the stopping policy which has ended the search here, resuming it then runs no more epochs
+    stopped_by: Optional[str] = None
+    # tunes evaluated by the search so far
+    num_evaluations: int = 0
+    # best scores of the phases before this one (None for a phase which has found nothing), oldest first,
+    # resuming the search gives them back to stopping policies
+    previous_best_scores: List[Optional[float]] = field(default_factory=list)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'task_parameters': self.task_parameters,
+            'next_epoch': self.next_epoch,
+            'blueprints': [[bp.base_seed, bp.tune_seed, bp.mutation_seeds] for bp in self.blueprints],
+            'scores': self.scores,
+            'aspect_values': self.aspect_values,
+            'stopped_by': self.stopped_by,
+            'num_evaluations': self.num_evaluations,
+            'previous_best_scores': self.previous_best_scores
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'SearchCheckpoint':
+        return cls(
+            task_parameters=data['task_parameters'],
+            next_epoch=data['next_epoch'],
+            blueprints=[TuneBlueprint(base_seed=base_seed, tune_seed=tune_seed, mutation_seeds=mutation_seeds)
+                        for base_seed, tune_seed, mutation_seeds in data['blueprints']],
+            scores=data['scores'],
+            aspect_values=data.get('aspect_values'),
+            stopped_by=data.get('stopped_by'),
+            num_evaluations=data.get('num_evaluations', 0),
+            previous_best_scores=data.get('previous_best_scores', [])
+        )
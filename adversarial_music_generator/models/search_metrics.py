@@ -0,0 +1,123 @@
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Any, Iterator
+
+
+@dataclass
+class StageMetrics:
+    """
+    time spent in named stages, counters and peak values (e.g. of memory),
+    metrics of many tasks are merged by summing up times and counters and taking max of peaks
+    """
+    seconds: Dict[str, float] = field(default_factory=dict)
+    counts: Dict[str, int] = field(default_factory=dict)
+    peaks: Dict[str, int] = field(default_factory=dict)
+
+    @contextmanager
+    def measure(self, stage: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(stage, time.perf_counter() - start)
+
+    def add_time(self, stage: str, seconds: float):
+        self.seconds[stage] = self.seconds.get(stage, 0.0) + seconds
+
+    def count(self, name: str, amount: int = 1):
+        self.counts[name] = self.counts.get(name, 0) + amount
+
+    def record_peak(self, name: str, value: int):
+        self.peaks[name] = max(self.peaks.get(name, value), value)
+
+    def merge(self, other: 'StageMetrics'):
+        for stage, seconds in other.seconds.items():
+            self.add_time(stage, seconds)
+        for name, amount in other.counts.items():
+            self.count(name, amount)
+        for name, value in other.peaks.items():
+            self.record_peak(name, value)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'seconds': dict(self.seconds), 'counts': dict(self.counts), 'peaks': dict(self.peaks)}
+
+
+@dataclass
+class PhaseMetrics:
+    """
+    metrics of the random search phase (epoch is None) or of a mutation epoch.
+
+    worker metrics are summed up over all tasks of the phase, so their times may well exceed
+    the wall time of the phase when there are many workers. Parent metrics are about
+    the process running the search, their "waiting" stage is the time spent waiting for workers.
+    """
+    phase: str
+    epoch: Optional[int]
+    num_tasks: int = 0
+    wall_seconds: float = 0.0
+    worker: StageMetrics = field(default_factory=StageMetrics)
+    parent: StageMetrics = field(default_factory=StageMetrics)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'phase': self.phase,
+            'epoch': self.epoch,
+            'num_tasks': self.num_tasks,
+            'wall_seconds': self.wall_seconds,
+            'worker': self.worker.to_dict(),
+            'parent': self.parent.to_dict()
+        }
+
+
+@dataclass
+class SearchMetrics:
+    phases: List[PhaseMetrics] = field(default_factory=list)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'phases': [p.to_dict() for p in self.phases]}
+
+    def to_prometheus(self, prefix: str = 'amg') -> str:
+        """
+        renders metrics in the Prometheus text exposition format
+        """
+        families: Dict[str, List[str]] = {}
+        descriptions = {
+            f'{prefix}_phase_wall_seconds': ('gauge', 'wall time of a search phase'),
+            f'{prefix}_phase_tasks': ('gauge', 'number of tasks of a search phase'),
+            f'{prefix}_stage_seconds_total': ('counter', 'time spent in a stage, summed up over tasks'),
+            f'{prefix}_stage_events_total': ('counter', 'number of things counted in a stage'),
+            f'{prefix}_stage_peak': ('gauge', 'max value observed in any task'),
+        }
+
+        def add(name: str, labels: Dict[str, str], value: float):
+            rendered_labels = ','.join(f'{k}="{_escape_label_value(v)}"' for k, v in labels.items())
+            families.setdefault(name, []).append(f'{name}{{{rendered_labels}}} {value!r}')
+
+        for phase in self.phases:
+            phase_labels = {'phase': phase.phase, 'epoch': '' if phase.epoch is None else str(phase.epoch)}
+            add(f'{prefix}_phase_wall_seconds', phase_labels, float(phase.wall_seconds))
+            add(f'{prefix}_phase_tasks', phase_labels, float(phase.num_tasks))
+
+            for side, metrics in [('worker', phase.worker), ('parent', phase.parent)]:
+                for stage, seconds in sorted(metrics.seconds.items()):
+                    add(f'{prefix}_stage_seconds_total', {**phase_labels, 'side': side, 'stage': stage},
+                        float(seconds))
+                for name, amount in sorted(metrics.counts.items()):
+                    add(f'{prefix}_stage_events_total', {**phase_labels, 'side': side, 'name': name},
+                        float(amount))
+                for name, value in sorted(metrics.peaks.items()):
+                    add(f'{prefix}_stage_peak', {**phase_labels, 'side': side, 'name': name}, float(value))
+
+        lines = []
+        for name, samples in families.items():
+            metric_type, description = descriptions[name]
+            lines.append(f'# HELP {name} {description}')
+            lines.append(f'# TYPE {name} {metric_type}')
+            lines.extend(samples)
+
+        return '\n'.join(lines) + '\n'
+
+
+def _escape_label_value(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
@@ -0,0 +1,29 @@
+from dataclasses import dataclass
+from typing import List, Optional
+
+from adversarial_music_generator.models.search_metrics import PhaseMetrics
+from adversarial_music_generator.models.tune_blueprint import TuneBlueprint
+
+
+@dataclass
+class SearchSnapshot:
+    """
+    best results of a search right after its random phase (epoch is None)
+    or after a mutation epoch, blueprints go best first
+    """
+    phase: str
+    epoch: Optional[int]
+    blueprints: List[TuneBlueprint]
+    scores: List[float]
+    # time the phase took, zero if it has been restored from a checkpoint
+    phase_seconds: float
+    # time since the search started
+    elapsed_seconds: float
+    # tunes evaluated since the search started, a resumed search counts those before the interruption too
+    num_evaluations: int
+    # no more snapshots are coming, blueprints are those of the tunes found
+    is_final: bool
+    # None if the phase has been restored from a checkpoint
+    metrics: Optional[PhaseMetrics] = None
+    # name of the stopping policy which has ended the search early, if any
+    stopped_by: Optional[str] = None
@@ -1,13 +1,67 @@
-from typing import List, Dict, Any
+from array import array
+from typing import Dict, Any, Iterable, Tuple
 
 from adversarial_music_generator.models.note import Note
+from adversarial_music_generator.models.note_list import NoteList
 from adversarial_music_generator.models.timbre import Timbre
 
 
+class _CopyOnWriteColumn:
+    """
+    a note column of a track, the arrays of a track may be shared with its clones,
+    in which case they are copied the first time the column is accessed through this attribute,
+    since the caller may be going to change it.
+
+    The caller may as well keep the array and change it later on, so clones made after
+    an array has been handed out (or set) this way get copies rather than share it.
+
+    Reading without copying goes through Track.get_columns(),
+    changing in place without keeping arrays through Track.get_writable_columns().
+    """
+
+    def __set_name__(self, owner, name: str):
+        self._attribute: str = '_' + name
+
+    def __get__(self, track: 'Track', owner=None) -> array:
+        if track is None:
+            return self
+        if track._shared:
+            track._unshare()
+        track._exposed = True
+        return getattr(track, self._attribute)
+
+    def __set__(self, track: 'Track', column: array):
+        if track._shared:
+            track._unshare()
+        track._exposed = True
+        setattr(track, self._attribute, column)
+
+
 class Track:
+    pitches = _CopyOnWriteColumn()
+    starts = _CopyOnWriteColumn()
+    ends = _CopyOnWriteColumn()
+    velocities = _CopyOnWriteColumn()
+
     def __init__(self, timbre: Timbre):
         self.timbre: Timbre = timbre
-        self.notes: List[Note] = []
+
+        """
+        notes are stored column-wise: the i-th note of the track
+        is made of the i-th elements of the arrays below.
+
+        Per-note objects are only created on demand by `notes`,
+        hot paths are expected to work with the arrays directly.
+        """
+        self._pitches: array = array('i')
+        self._starts: array = array('d')
+        self._ends: array = array('d')
+        self._velocities: array = array('d')
+
+        # set when the arrays above may be shared with clones of the track
+        self._shared: bool = False
+        # set when the arrays above may be held (and changed) by someone outside of the track
+        self._exposed: bool = False
 
         """
         a general purpose piece of info to allow generators put something
@@ -18,3 +72,93 @@ class Track:
             ...
         """
         self.tags: Dict[str, Any] = {}
+
+    @property
+    def notes(self) -> NoteList:
+        return NoteList(self)
+
+    @notes.setter
+    def notes(self, notes: Iterable[Note]):
+        # materializing first makes `track.notes = track.notes[::-1]` and alike safe
+        notes = [(n.note, n.start_time_seconds, n.end_time_seconds, n.velocity) for n in notes]
+        # all arrays are replaced with new ones nobody else has, so shared ones need no copying
+        self._pitches = array('i', [n[0] for n in notes])
+        self._starts = array('d', [n[1] for n in notes])
+        self._ends = array('d', [n[2] for n in notes])
+        self._velocities = array('d', [n[3] for n in notes])
+        self._shared = False
+        self._exposed = False
+
+    @property
+    def num_notes(self) -> int:
+        return len(self._pitches)
+
+    def get_columns(self) -> Tuple[array, array, array, array]:
+        """
+        (pitches, starts, ends, velocities) for reading only,
+        they may be shared with clones of the track, so must not be changed
+        """
+        return self._pitches, self._starts, self._ends, self._velocities
+
+    def get_writable_columns(self) -> Tuple[array, array, array, array]:
+        """
+        (pitches, starts, ends, velocities) to be changed right away, copied first if shared with clones.
+
+        Unlike arrays taken from the attributes, these must not be kept: clones of the track made
+        afterwards share them.
+        """
+        if self._shared:
+            self._unshare()
+        return self._pitches, self._starts, self._ends, self._velocities
+
+    def add_note(self, note: int, start_time_seconds: float, end_time_seconds: float, velocity: float):
+        pitches, starts, ends, velocities = self.get_writable_columns()
+        pitches.append(note)
+        starts.append(start_time_seconds)
+        ends.append(end_time_seconds)
+        velocities.append(velocity)
+
+    def clone(self) -> 'Track':
+        """
+        the clone shares note arrays with the original one,
+        whichever of them is changed first gets its own copy then.
+
+        Arrays handed out through attributes (track.pitches etc.) are not shared though,
+        since they can be changed through whatever holds them, the clone gets copies of them.
+        """
+        # bypassing __init__ saves creating arrays only to throw them away
+        res = Track.__new__(Track)
+        res.timbre = self.timbre
+        if self._exposed:
+            res._pitches, res._starts, res._ends, res._velocities = (column[:] for column in self.get_columns())
+            res._shared = False
+        else:
+            res._pitches, res._starts, res._ends, res._velocities = self.get_columns()
+            res._shared = self._shared = True
+        res._exposed = False
+        res.tags = dict(self.tags)
+        return res
+
+    def remove_notes(self, indices: Iterable[int]):
+        """
+        removes notes at given positions (positions are interpreted before any removal)
+        """
+        indices = sorted(set(indices), reverse=True)
+        if not indices:
+            return
+
+        pitches, starts, ends, velocities = self.get_writable_columns()
+        for idx in indices:
+            del pitches[idx]
+            del starts[idx]
+            del ends[idx]
+            del velocities[idx]
+
+    def _unshare(self):
+        # the copies are not held by anyone else yet
+        self._shared = False
+        self._exposed = False
+        self._pitches = self._pitches[:]
+        self._starts = self._starts[:]
+        self._ends = self._ends[:]
+        self._velocities = self._velocities[:]
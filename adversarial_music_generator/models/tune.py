@@ -1,8 +1,12 @@
-from typing import List, Iterator
+import hashlib
+from array import array
+from typing import List, Iterator, Tuple
 
-from adversarial_music_generator.models.note import Note
+from adversarial_music_generator.models.note_view import NoteView
 from adversarial_music_generator.models.track import Track
 
+NoteColumns = Tuple[array, array, array, array]
+
 
 class Tune:
     def __init__(self):
@@ -11,15 +15,60 @@ class Tune:
         self.start_time: float = 0.0
         self.end_time: float = 10.0
 
-    def all_notes(self) -> Iterator[Note]:
+    def clone(self) -> 'Tune':
+        """
+        a copy of the tune that can be changed independently of the original one
+        (tags of tracks are copied shallowly though).
+
+        It is cheap: tracks share their note arrays with the original ones until either of them is changed.
+        """
+        res = Tune()
+        res.tracks = [track.clone() for track in self.tracks]
+        res.bpm = self.bpm
+        res.start_time = self.start_time
+        res.end_time = self.end_time
+        return res
+
+    def all_notes(self) -> Iterator[NoteView]:
         for track in self.tracks:
             for note in track.notes:
                 yield note
 
+    def note_columns(self) -> NoteColumns:
+        """
+        returns (pitches, starts, ends, velocities) of all notes of the tune,
+        in the same order as all_notes() visits them
+        """
+        pitches, starts, ends, velocities = array('i'), array('d'), array('d'), array('d')
+        for track in self.tracks:
+            track_pitches, track_starts, track_ends, track_velocities = track.get_columns()
+            pitches += track_pitches
+            starts += track_starts
+            ends += track_ends
+            velocities += track_velocities
+
+        return pitches, starts, ends, velocities
+
     @property
     def num_notes(self) -> int:
         res = 0
         for track in self.tracks:
-            res += len(track.notes)
+            res += track.num_notes
 
         return res
+
+    def content_hash(self) -> bytes:
+        """
+        a digest of everything an evaluator can see in the tune,
+        tunes with equal digests are expected to get equal evaluations
+        """
+        h = hashlib.blake2b(digest_size=16)
+        h.update(repr((self.bpm, self.start_time, self.end_time, len(self.tracks))).encode())
+        for track in self.tracks:
+            timbre = track.timbre
+            h.update(repr((timbre.frequency_character, timbre.dynamics, sorted(track.tags.items()),
+                           track.num_notes)).encode())
+            for column in track.get_columns():
+                h.update(column.tobytes())
+
+        return h.digest()
@@ -16,6 +16,8 @@ class TuneEvaluationResult:
     """
     UNDEFINED_SEED = 'undefined'
 
+    __slots__ = ('_aspects', 'blueprint')
+
     def __init__(self):
         self._aspects: Dict[str, float] = {}
         self.blueprint: Optional[TuneBlueprint] = None
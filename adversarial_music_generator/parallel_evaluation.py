@@ -0,0 +1,127 @@
+import os
+import tempfile
+from array import array
+from multiprocessing.pool import Pool
+from typing import List, Optional, Tuple, Union, TYPE_CHECKING
+
+from adversarial_music_generator.calibrating_tune_evaluator import CalibratingTuneEvaluator
+from adversarial_music_generator.cpus import get_num_available_cpus
+from adversarial_music_generator.interfaces import TuneEvaluatorInterface, PackedTuneEvaluatorInterface
+from adversarial_music_generator.models.evaluation_batch import EvaluationBatch
+from adversarial_music_generator.models.tune import Tune
+from adversarial_music_generator.tune_corpus import TuneCorpus, write_tune_corpus
+
+if TYPE_CHECKING:
+    # imported only where needed, shared memory is there since python 3.8
+    from adversarial_music_generator.shared_tunes import SharedTunes
+
+TuneSource = Union[TuneCorpus, 'SharedTunes']
+
+# the evaluator and the tunes of this process, set up by the pool initializer
+_evaluator: Optional[TuneEvaluatorInterface] = None
+_corpus: Optional[TuneCorpus] = None
+
+
+def _install_evaluation_context(evaluator: TuneEvaluatorInterface, source: TuneSource):
+    global _evaluator, _corpus
+    _evaluator = evaluator
+    # a shared batch attaches to its segment as it is unpickled, a corpus maps its file
+    _corpus = source if isinstance(source, TuneCorpus) else source.corpus
+
+
+def _uninstall_evaluation_context():
+    global _evaluator, _corpus
+    _evaluator = None
+    _corpus = None
+
+
+def _evaluate_range(bounds: Tuple[int, int]) -> array:
+    """
+    evaluates tunes from start to end of the corpus, returns their aspect values only, row by row
+    """
+    start, end = bounds
+    if isinstance(_evaluator, PackedTuneEvaluatorInterface):
+        evaluations = _evaluator.evaluate_packed_tunes(_corpus.get_packed_tunes(start, end))
+    else:
+        evaluations = _evaluator.evaluate_tunes(_corpus.get_tunes(start, end))
+
+    aspects = _evaluator.get_aspects()
+    return array('d', [evaluation.get_aspect_value(aspect) for evaluation in evaluations for aspect in aspects])
+
+
+class ParallelTuneEvaluator:
+    """
+    evaluates a lot of tunes in worker processes: a stored corpus, or tunes of this process,
+    which are put into shared memory for the workers to read them in place.
+
+    Workers send back aspect values only, results come as an EvaluationBatch in the order
+    of the tunes (without blueprints, those of a corpus are at corpus.get_blueprint).
+
+    Evaluators implementing PackedTuneEvaluatorInterface evaluate the tunes without
+    materializing them, others get Tune objects made in the workers.
+    """
+
+    def __init__(self, evaluator: TuneEvaluatorInterface, parallelize: bool = True, pool_size: Optional[int] = None,
+                 chunk_size: int = 1000):
+        """
+        :param pool_size: number of worker processes, defaults to the number of CPU cores available
+        :param chunk_size: number of tunes evaluated by a worker at once
+        """
+        self._evaluator: TuneEvaluatorInterface = evaluator
+        self._parallelize: bool = parallelize
+        self._pool_size: Optional[int] = pool_size
+        self._chunk_size: int = chunk_size
+
+    def evaluate_tunes(self, tunes: List[Tune]) -> EvaluationBatch:
+        if not self._is_worth_parallelizing(len(tunes)):
+            return EvaluationBatch.from_results(self._evaluator.get_aspects(), self._evaluator.evaluate_tunes(tunes))
+
+        try:
+            from adversarial_music_generator.shared_tunes import SharedTunes, prepare_to_share_with_workers
+        except ImportError:
+            # no shared memory, the tunes go to workers in a temporary corpus file
+            with tempfile.TemporaryDirectory() as dir_path:
+                path = os.path.join(dir_path, 'tunes.corpus')
+                write_tune_corpus(path, tunes)
+                with TuneCorpus(path) as corpus:
+                    return self._evaluate(corpus, len(tunes))
+
+        prepare_to_share_with_workers()
+        with SharedTunes.create(tunes) as shared_tunes:
+            return self._evaluate(shared_tunes, len(tunes))
+
+    def evaluate_corpus(self, corpus: TuneCorpus) -> EvaluationBatch:
+        return self._evaluate(corpus, len(corpus))
+
+    def _evaluate(self, source: TuneSource, num_tunes: int) -> EvaluationBatch:
+        # calibration happens once, here, so that workers get a calibrated evaluator
+        if isinstance(self._evaluator, CalibratingTuneEvaluator):
+            self._evaluator.calibrate()
+
+        chunks = [(start, min(start + self._chunk_size, num_tunes)) for start in range(0, num_tunes, self._chunk_size)]
+        values = array('d')
+
+        if not self._is_worth_parallelizing(num_tunes):
+            _install_evaluation_context(self._evaluator, source)
+            try:
+                for chunk_values in map(_evaluate_range, chunks):
+                    values += chunk_values
+            finally:
+                # not to keep the tunes of the caller around
+                _uninstall_evaluation_context()
+        else:
+            with Pool(self._get_pool_size(), initializer=_install_evaluation_context,
+                      initargs=(self._evaluator, source)) as pool:
+                for chunk_values in pool.imap(_evaluate_range, chunks):
+                    values += chunk_values
+
+        return EvaluationBatch(self._evaluator.get_aspects(), values, [None] * num_tunes)
+
+    def _is_worth_parallelizing(self, num_tunes: int) -> bool:
+        return self._parallelize and num_tunes > self._chunk_size
+
+    def _get_pool_size(self) -> int:
+        if self._pool_size is not None:
+            return self._pool_size
+
+        return get_num_available_cpus()
@@ -1,5 +1,5 @@
 from random import Random
-from typing import Dict, TypeVar
+from typing import Dict, TypeVar, Iterable, List, Iterator
 
 T = TypeVar('T')
 RandomChoiceOptions = Dict[T, int]
@@ -19,7 +19,6 @@ class Seed:
         self._seed: str = 'default tune_seed'
         if seed is not None:
             self._seed = seed
-        self._generator: Random = Random(seed)
 
     def randint(self, min_val: int, max_val: int, sub_seed: str):
         local_generator = Random(self._seed + sub_seed)
@@ -30,6 +29,35 @@ class Seed:
         rnd = local_generator.random()
         return min_val + rnd * (max_val - min_val)
 
+    def randints(self, min_val: int, max_val: int, sub_seed_prefix: str, indices: Iterable[int]) -> List[int]:
+        """
+        bulk version of randint, i-th value is what randint
+        would give for sub_seed_prefix + str(indices[i])
+        """
+        return [local_generator.randint(min_val, max_val)
+                for local_generator in self._local_generators(sub_seed_prefix, indices)]
+
+    def randfloats(self, min_val: float, max_val: float, sub_seed_prefix: str, indices: Iterable[int]) -> List[float]:
+        """
+        bulk version of randfloat, i-th value is what randfloat
+        would give for sub_seed_prefix + str(indices[i])
+        """
+        return [min_val + local_generator.random() * (max_val - min_val)
+                for local_generator in self._local_generators(sub_seed_prefix, indices)]
+
+    def _local_generators(self, sub_seed_prefix: str, indices: Iterable[int]) -> Iterator[Random]:
+        """
+        yields a generator seeded with sub_seed_prefix + str(i) for every i,
+        it is the same generator reseeded each time, which is the same as a new one, only cheaper
+        """
+        local_generator = None
+        for i in indices:
+            if local_generator is None:
+                local_generator = Random(self._seed + sub_seed_prefix + str(i))
+            else:
+                local_generator.seed(self._seed + sub_seed_prefix + str(i))
+            yield local_generator
+
     def choose_one(self, probabilities: RandomChoiceOptions[T], sub_seed: str) -> T:
         sum_of_probabilities: int = 0
 
@@ -49,4 +77,4 @@ class Seed:
         raise ValueError('unable to generate a random choice (error: 8256cd68)')
 
     def create_subseed(self, subseed_str):  # type: (str)->Seed
-        return Seed(self._seed + "/" + subseed_str)
+        return type(self)(self._seed + "/" + subseed_str)
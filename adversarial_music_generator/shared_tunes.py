@@ -0,0 +1,129 @@
+import os
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+from typing import List, Optional
+
+from adversarial_music_generator.models.tune import Tune
+from adversarial_music_generator.models.tune_blueprint import TuneBlueprint
+from adversarial_music_generator.tune_corpus import TuneCorpus, TuneCorpusWriter
+
+
+def prepare_to_share_with_workers():
+    """
+    to be called before starting worker processes that are going to create or attach to shared tunes.
+
+    Every process attached to a segment registers it with a resource tracker, which removes the segment
+    when it shuts down. Workers started afterwards share the tracker of this process, so a segment stays
+    there until it is closed by its owner, rather than until the first worker that has seen it exits.
+    """
+    if os.name == 'posix':
+        resource_tracker.ensure_running()
+
+
+class _BufferFile:
+    """
+    just enough of a file to write a corpus into a buffer
+    """
+
+    def __init__(self, buffer: memoryview):
+        self._buffer: memoryview = buffer
+        self._position: int = 0
+
+    def write(self, data) -> int:
+        data = memoryview(data).cast('B')
+        self._buffer[self._position:self._position + len(data)] = data
+        self._position += len(data)
+        return len(data)
+
+
+class SharedTunes:
+    """
+    a batch of tunes in a shared memory segment, laid out the same way as a tune corpus file,
+    so that other processes read them in place rather than unpickling Tune objects.
+
+    It pickles as the name of the segment: a process unpickling it attaches to the segment,
+    self.corpus then reads the very memory the creating process has written.
+
+    The segment is removed by whoever owns it (the creating process, unless it says otherwise)
+    when closing it. Processes passing shared tunes to each other have to share a resource tracker,
+    see prepare_to_share_with_workers.
+    """
+
+    def __init__(self, shared_memory: SharedMemory, owner: bool):
+        # goes first, so that its views of the segment are gone by the time the segment is garbage collected
+        self.corpus: TuneCorpus = TuneCorpus.from_buffer(shared_memory.buf, shared_memory.name)
+        self._shared_memory: SharedMemory = shared_memory
+        self._owner: bool = owner
+
+    @classmethod
+    def create(cls, tunes: List[Tune], blueprints: Optional[List[TuneBlueprint]] = None) -> 'SharedTunes':
+        writer = TuneCorpusWriter()
+        try:
+            for i, tune in enumerate(tunes):
+                writer.add(tune, blueprints[i] if blueprints is not None else None)
+
+            shared_memory = SharedMemory(create=True, size=writer.get_size())
+            try:
+                writer.write_to(_BufferFile(shared_memory.buf))
+            except BaseException:
+                shared_memory.close()
+                shared_memory.unlink()
+                raise
+        finally:
+            writer.close()
+
+        return cls(shared_memory, owner=True)
+
+    @classmethod
+    def attach(cls, name: str, owner: bool = False) -> 'SharedTunes':
+        """
+        :param owner: take over the segment, so that closing removes it
+        """
+        return cls(SharedMemory(name=name), owner)
+
+    @staticmethod
+    def remove(name: str):
+        """
+        removes a segment nobody owns (see release) without reading it
+        """
+        shared_memory = SharedMemory(name=name)
+        shared_memory.close()
+        shared_memory.unlink()
+
+    @property
+    def name(self) -> str:
+        return self._shared_memory.name
+
+    def __len__(self) -> int:
+        return len(self.corpus)
+
+    def get_tunes(self) -> List[Tune]:
+        return self.corpus.get_tunes()
+
+    def close(self):
+        """
+        detaches from the segment, the owner removes it too
+        """
+        self.corpus.close()
+        self._shared_memory.close()
+        if self._owner:
+            self._shared_memory.unlink()
+            self._owner = False
+
+    def release(self) -> str:
+        """
+        detaches from the segment leaving it in place for another process to take over
+        (see attach), returns its name
+        """
+        self._owner = False
+        self.close()
+        return self.name
+
+    def __enter__(self) -> 'SharedTunes':
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def __reduce__(self):
+        return SharedTunes.attach, (self.name,)
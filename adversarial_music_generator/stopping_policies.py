@@ -0,0 +1,52 @@
+from typing import List
+
+from adversarial_music_generator.interfaces import StoppingPolicyInterface
+from adversarial_music_generator.models.search_snapshot import SearchSnapshot
+
+
+class PlateauStoppingPolicy(StoppingPolicyInterface):
+    """
+    stops once the best score has improved by no more than epsilon over the last num_epochs epochs
+    """
+
+    def __init__(self, num_epochs: int, epsilon: float = 0.0):
+        self._num_epochs: int = num_epochs
+        self._epsilon: float = epsilon
+
+    def should_stop(self, snapshots: List[SearchSnapshot], num_evaluations_in_next_epoch: int) -> bool:
+        if len(snapshots) <= self._num_epochs:
+            return False
+
+        if not snapshots[-1].scores or not snapshots[-1 - self._num_epochs].scores:
+            # nothing has been found to compare
+            return False
+
+        best_score = snapshots[-1].scores[0]
+        previous_best_score = snapshots[-1 - self._num_epochs].scores[0]
+        return best_score - previous_best_score <= self._epsilon
+
+
+class WallClockStoppingPolicy(StoppingPolicyInterface):
+    """
+    stops if the next epoch, expected to take as long as the latest phase,
+    would not finish within max_seconds since the search started
+    """
+
+    def __init__(self, max_seconds: float):
+        self._max_seconds: float = max_seconds
+
+    def should_stop(self, snapshots: List[SearchSnapshot], num_evaluations_in_next_epoch: int) -> bool:
+        latest = snapshots[-1]
+        return latest.elapsed_seconds + latest.phase_seconds > self._max_seconds
+
+
+class EvaluationBudgetStoppingPolicy(StoppingPolicyInterface):
+    """
+    stops if the next epoch would take the number of evaluated tunes beyond max_evaluations
+    """
+
+    def __init__(self, max_evaluations: int):
+        self._max_evaluations: int = max_evaluations
+
+    def should_stop(self, snapshots: List[SearchSnapshot], num_evaluations_in_next_epoch: int) -> bool:
+        return snapshots[-1].num_evaluations + num_evaluations_in_next_epoch > self._max_evaluations
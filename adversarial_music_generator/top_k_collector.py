@@ -0,0 +1,89 @@
+import heapq
+from typing import List, Tuple, Optional, Sequence
+
+from adversarial_music_generator.interfaces import EvaluationReducerInterface
+from adversarial_music_generator.models.evaluation_batch import EvaluationBatch
+from adversarial_music_generator.models.tune_evaluation_result import TuneEvaluationResult
+
+
+class TopKCollector:
+    """
+    Keeps the K best evaluations out of a stream of them.
+
+    Every evaluation is reduced exactly once, and only K of them are kept (in a heap),
+    so memory does not depend on how many evaluations go through the collector.
+
+    Evaluations with equal scores are ordered by their order keys (lower goes first),
+    order keys are expected to be unique, e.g. iteration numbers within a search phase.
+    This makes the outcome independent of the order evaluations arrive in.
+    """
+
+    def __init__(self, k: int, reducer: EvaluationReducerInterface):
+        self._k: int = k
+        self._reducer: EvaluationReducerInterface = reducer
+        # a min-heap, the root being the worst of the kept evaluations
+        self._heap: List[Tuple[float, int, TuneEvaluationResult]] = []
+        self._num_seen: int = 0
+        self._best_score: Optional[float] = None
+
+    def add(self, evaluation: TuneEvaluationResult, order_key: int):
+        score = self._reducer.reduce(evaluation)
+        if self._register_score(score, order_key):
+            self._keep(score, order_key, evaluation)
+
+    def add_many(self, evaluations: List[TuneEvaluationResult], first_order_key: int):
+        for i, evaluation in enumerate(evaluations):
+            self.add(evaluation, first_order_key + i)
+
+    def add_batch(self, batch: EvaluationBatch, first_order_key: int = 0, order_keys: Optional[Sequence[int]] = None):
+        """
+        rows are reduced through lightweight views, and only rows making it
+        to the top are copied out of the batch
+
+        :param order_keys: order keys of the rows, if they are not consecutive numbers starting with first_order_key
+        """
+        if order_keys is None:
+            order_keys = range(first_order_key, first_order_key + len(batch))
+
+        for row, order_key in zip(range(len(batch)), order_keys):
+            score = self._reducer.reduce(batch.get_view(row))
+            if self._register_score(score, order_key):
+                self._keep(score, order_key, batch.get_result(row))
+
+    def _register_score(self, score: float, order_key: int) -> bool:
+        """
+        accounts for the score and tells whether an evaluation with it should be kept
+        """
+        self._num_seen += 1
+
+        if self._best_score is None or score > self._best_score:
+            self._best_score = score
+
+        if self._k <= 0:
+            return False
+
+        return len(self._heap) < self._k or (score, -order_key) > self._heap[0][0:2]
+
+    def _keep(self, score: float, order_key: int, evaluation: TuneEvaluationResult):
+        entry = (score, -order_key, evaluation)
+        if len(self._heap) < self._k:
+            heapq.heappush(self._heap, entry)
+        else:
+            heapq.heapreplace(self._heap, entry)
+
+    def get_best(self) -> List[TuneEvaluationResult]:
+        """
+        kept evaluations, the best one first
+        """
+        return [evaluation for _, evaluation in self.get_best_with_scores()]
+
+    def get_best_with_scores(self) -> List[Tuple[float, TuneEvaluationResult]]:
+        return [(score, evaluation) for score, _, evaluation in sorted(self._heap, key=lambda x: x[0:2], reverse=True)]
+
+    @property
+    def best_score(self) -> Optional[float]:
+        return self._best_score
+
+    @property
+    def num_seen(self) -> int:
+        return self._num_seen
@@ -0,0 +1,37 @@
+from collections import OrderedDict
+from typing import Hashable, Optional
+
+from adversarial_music_generator.models.tune import Tune
+
+
+class TuneCache:
+    """
+    A bounded cache of materialized tunes with least-recently-used eviction.
+
+    The cache owns the tunes put into it, so callers are expected to
+    put/take clones if they are going to change them afterwards.
+    """
+
+    def __init__(self, max_size: int):
+        self._max_size: int = max_size
+        self._tunes: OrderedDict = OrderedDict()
+        self.num_hits: int = 0
+        self.num_misses: int = 0
+
+    def get(self, key: Hashable) -> Optional[Tune]:
+        tune = self._tunes.get(key)
+        if tune is not None:
+            self._tunes.move_to_end(key)
+            self.num_hits += 1
+        else:
+            self.num_misses += 1
+        return tune
+
+    def put(self, key: Hashable, tune: Tune):
+        self._tunes[key] = tune
+        self._tunes.move_to_end(key)
+        while len(self._tunes) > self._max_size:
+            self._tunes.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._tunes)
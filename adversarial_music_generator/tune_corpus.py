@@ -0,0 +1,430 @@
+import dataclasses
+import hashlib
+import json
+import mmap
+import os
+import shutil
+import struct
+import sys
+import tempfile
+from array import array
+from typing import List, Optional, Dict, Any, Iterator, Tuple, BinaryIO
+
+from adversarial_music_generator.interfaces import TuneGeneratorInterface
+from adversarial_music_generator.models.packed_tunes import PackedTunes
+from adversarial_music_generator.models.timbre import Timbre
+from adversarial_music_generator.models.track import Track
+from adversarial_music_generator.models.tune import Tune
+from adversarial_music_generator.models.tune_blueprint import TuneBlueprint
+
+# a corpus is a single file:
+#
+# - a header: magic, byte order, numbers of tunes, tracks and notes, size of metadata
+# - index sections (int64): where tracks of every tune start, where notes of every tune start,
+#   where notes of every track start, where metadata of every tune starts
+# - per-tune sections (float64): bpm, start time, end time
+# - note columns of all tunes concatenated: starts, ends, velocities (float64), pitches (int32)
+# - metadata of every tune (timbres and tags of tracks, the blueprint) as json, one document per tune
+#
+# every section starts at a multiple of 8 bytes, so that it can be used in place once the file is mapped
+
+_MAGIC = b'AMGTUNE1'
+_HEADER = struct.Struct('<8s8sqqqq')
+_ALIGNMENT = 8
+# spilled note columns stay in memory up to this size, which is what small batches need
+_MAX_IN_MEMORY_SPILL_SIZE = 16 * 1024 * 1024
+# notes are collected into arrays and spilled in chunks of this many
+_SPILL_CHUNK_NUM_NOTES = 1 << 16
+
+NoteColumnViews = Tuple[memoryview, memoryview, memoryview, memoryview]
+
+
+class TuneCorpusError(Exception):
+    pass
+
+
+def _padding(size: int) -> int:
+    return -size % _ALIGNMENT
+
+
+def _get_item_size(chunk) -> int:
+    return chunk.itemsize if isinstance(chunk, array) else 1
+
+
+class TuneCorpusWriter:
+    """
+    writes tunes into a corpus file one by one, the file appears when the writer is closed.
+
+    Note columns are spilled into temporary files as tunes come, so only the index is kept in memory.
+    Without a path, the corpus is only written by write_to (see SharedTunes).
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self._path: Optional[str] = path
+
+        self._tune_track_offsets: array = array('q', [0])
+        self._tune_note_offsets: array = array('q', [0])
+        self._track_note_offsets: array = array('q', [0])
+        self._metadata_offsets: array = array('q', [0])
+        self._bpms: array = array('d')
+        self._start_times: array = array('d')
+        self._end_times: array = array('d')
+
+        # starts, ends, velocities, pitches, metadata
+        self._spills: List[BinaryIO] = [tempfile.SpooledTemporaryFile(_MAX_IN_MEMORY_SPILL_SIZE)
+                                        for _ in range(5)]
+        # the same, not spilled yet
+        self._chunks: Tuple[array, array, array, array, bytearray] = \
+            (array('d'), array('d'), array('d'), array('i'), bytearray())
+        # bytes in every spill
+        self._spill_sizes: List[int] = [0] * len(self._spills)
+        # encoded metadata of tracks without tags, by timbre
+        self._track_metadata_cache: Dict[Tuple[str, str], str] = {}
+        self._closed: bool = False
+
+    def add(self, tune: Tune, blueprint: Optional[TuneBlueprint] = None):
+        if self._closed:
+            raise TuneCorpusError('cannot add a tune to a closed corpus writer (error: 6c2d94e1)')
+
+        # encoded first, failing to encode leaves the writer as it was
+        encoded_blueprint = json.dumps(dataclasses.asdict(blueprint)) if blueprint is not None else 'null'
+        encoded_metadata = ('{"tracks":[' + ','.join(self._encode_track_metadata(track) for track in tune.tracks)
+                            + '],"blueprint":' + encoded_blueprint + '}').encode()
+
+        starts_chunk, ends_chunk, velocities_chunk, pitches_chunk, metadata_chunk = self._chunks
+
+        for track in tune.tracks:
+            pitches, starts, ends, velocities = track.get_columns()
+            starts_chunk += starts
+            ends_chunk += ends
+            velocities_chunk += velocities
+            pitches_chunk += pitches
+            self._track_note_offsets.append(self._track_note_offsets[-1] + len(pitches))
+
+        metadata_chunk += encoded_metadata
+
+        if len(pitches_chunk) >= _SPILL_CHUNK_NUM_NOTES:
+            self._spill()
+
+        self._tune_track_offsets.append(len(self._track_note_offsets) - 1)
+        self._tune_note_offsets.append(self._track_note_offsets[-1])
+        self._metadata_offsets.append(self._metadata_offsets[-1] + len(encoded_metadata))
+        self._bpms.append(tune.bpm)
+        self._start_times.append(tune.start_time)
+        self._end_times.append(tune.end_time)
+
+    def _encode_track_metadata(self, track: Track) -> str:
+        timbre = (track.timbre.frequency_character, track.timbre.dynamics)
+        if not track.tags and timbre in self._track_metadata_cache:
+            return self._track_metadata_cache[timbre]
+
+        try:
+            res = json.dumps({'timbre': timbre, 'tags': track.tags})
+        except (TypeError, ValueError) as e:
+            raise TuneCorpusError(f'tags of the tune cannot be stored as json: {e} (error: 1f9b3a70)') from e
+
+        # json turns tuples into lists and keys into strings, such tags would not come back the same
+        if track.tags and json.loads(res)['tags'] != track.tags:
+            raise TuneCorpusError(f'tags {track.tags} would not survive json (error: 1f9b3a70)')
+
+        if not track.tags:
+            self._track_metadata_cache[timbre] = res
+        return res
+
+    def _spill(self):
+        for i, (chunk, spill) in enumerate(zip(self._chunks, self._spills)):
+            spill.write(chunk)
+            self._spill_sizes[i] += len(chunk) * _get_item_size(chunk)
+            del chunk[:]
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+
+        try:
+            if self._path is None:
+                return
+
+            # written to a temp file first so that a concurrent reader never sees half of it
+            dir_path = os.path.dirname(os.path.abspath(self._path))
+            fd, tmp_path = tempfile.mkstemp(dir=dir_path, suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    self.write_to(f)
+                os.replace(tmp_path, self._path)
+            except BaseException:
+                os.remove(tmp_path)
+                raise
+        finally:
+            for spill in self._spills:
+                spill.close()
+
+    def get_size(self) -> int:
+        """
+        size of what write_to would write for the tunes added so far, in bytes
+        """
+        index_size = 8 * (len(self._tune_track_offsets) + len(self._tune_note_offsets) + len(self._track_note_offsets)
+                          + len(self._metadata_offsets) + len(self._bpms) + len(self._start_times)
+                          + len(self._end_times))
+        spills_size = 0
+        for chunk, spill_size in zip(self._chunks, self._spill_sizes):
+            size = spill_size + len(chunk) * _get_item_size(chunk)
+            spills_size += size + _padding(size)
+        return _HEADER.size + index_size + spills_size
+
+    def write_to(self, f: BinaryIO):
+        """
+        writes the corpus (tunes added so far) to a file-like object
+        """
+        self._spill()
+        f.write(_HEADER.pack(_MAGIC, sys.byteorder.encode().ljust(8, b'\0'), len(self._bpms),
+                             len(self._track_note_offsets) - 1, self._track_note_offsets[-1],
+                             self._metadata_offsets[-1]))
+        for section in [self._tune_track_offsets, self._tune_note_offsets, self._track_note_offsets,
+                        self._metadata_offsets, self._bpms, self._start_times, self._end_times]:
+            section.tofile(f)
+
+        for spill, spill_size in zip(self._spills, self._spill_sizes):
+            spill.seek(0)
+            shutil.copyfileobj(spill, f)
+            f.write(b'\0' * _padding(spill_size))
+
+    def __enter__(self) -> 'TuneCorpusWriter':
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is None:
+            self.close()
+        else:
+            # a failed write leaves no file behind
+            self._closed = True
+            for spill in self._spills:
+                spill.close()
+
+
+def write_tune_corpus(path: str, tunes: List[Tune], blueprints: Optional[List[TuneBlueprint]] = None):
+    with TuneCorpusWriter(path) as writer:
+        for i, tune in enumerate(tunes):
+            writer.add(tune, blueprints[i] if blueprints is not None else None)
+
+
+class TuneCorpus:
+    """
+    a corpus file mapped into memory, nothing is read or parsed until it is asked for.
+
+    Note columns of the whole corpus are exposed as memoryviews over the mapping (pitches, starts,
+    ends, velocities), notes of the i-th tune occupying positions tune_note_offsets[i] (inclusive)
+    to tune_note_offsets[i+1] (exclusive), so tunes can be scanned without creating Tune objects at all.
+
+    The mapping is private: writing into the views never touches the file.
+    A corpus is pickled as its path, so it can be passed to worker processes cheaply.
+    """
+
+    def __init__(self, path: str):
+        self._path: Optional[str] = path
+        self._name: str = path
+
+        with open(path, 'rb') as f:
+            try:
+                # a private (copy on write) mapping, since cython only takes writable buffers
+                self._mmap: Optional[mmap.mmap] = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+            except ValueError as e:
+                raise TuneCorpusError(f'{path} is not a tune corpus (error: 9a4e5c18)') from e
+
+        self._read_sections(memoryview(self._mmap))
+
+    @classmethod
+    def from_buffer(cls, buffer, name: str = 'buffer') -> 'TuneCorpus':
+        """
+        a corpus over a writable buffer holding one (like a shared memory segment), nothing is copied.
+
+        Such a corpus cannot be pickled, the buffer is the caller's to share.
+        """
+        res = cls.__new__(cls)
+        res._path = None
+        res._name = name
+        res._mmap = None
+        res._read_sections(memoryview(buffer))
+        return res
+
+    def _read_sections(self, buffer: memoryview):
+        if len(buffer) < _HEADER.size:
+            raise TuneCorpusError(f'{self._name} is not a tune corpus (error: 9a4e5c18)')
+
+        magic, byte_order, num_tunes, num_tracks, num_notes, metadata_size = _HEADER.unpack_from(buffer)
+        if magic != _MAGIC:
+            raise TuneCorpusError(f'{self._name} is not a tune corpus (error: 9a4e5c18)')
+        if byte_order.rstrip(b'\0').decode() != sys.byteorder:
+            raise TuneCorpusError(f'{self._name} was written on a machine of a different byte order '
+                                  f'(error: 27d0b6f3)')
+
+        self._buffer: memoryview = buffer
+        self._position: int = _HEADER.size
+        self._digest: Optional[str] = None
+
+        self.tune_track_offsets: memoryview = self._take_section('q', num_tunes + 1)
+        self.tune_note_offsets: memoryview = self._take_section('q', num_tunes + 1)
+        self.track_note_offsets: memoryview = self._take_section('q', num_tracks + 1)
+        self._metadata_offsets: memoryview = self._take_section('q', num_tunes + 1)
+        self.bpms: memoryview = self._take_section('d', num_tunes)
+        self.start_times: memoryview = self._take_section('d', num_tunes)
+        self.end_times: memoryview = self._take_section('d', num_tunes)
+        self.starts: memoryview = self._take_section('d', num_notes)
+        self.ends: memoryview = self._take_section('d', num_notes)
+        self.velocities: memoryview = self._take_section('d', num_notes)
+        self.pitches: memoryview = self._take_section('i', num_notes)
+        self._metadata: memoryview = self._take_section('B', metadata_size)
+        # a buffer may be longer than the corpus in it, shared memory segments come in whole pages
+        self._size: int = min(self._position, len(buffer))
+
+        # the same columns as bytes, for copying notes into Track arrays
+        self._pitches_bytes: memoryview = self.pitches.cast('B')
+        self._starts_bytes: memoryview = self.starts.cast('B')
+        self._ends_bytes: memoryview = self.ends.cast('B')
+        self._velocities_bytes: memoryview = self.velocities.cast('B')
+
+    def _take_section(self, type_code: str, length: int) -> memoryview:
+        size = length * struct.calcsize(type_code)
+        end = self._position + size
+        if end > len(self._buffer):
+            raise TuneCorpusError(f'{self._name} is truncated (error: c51e8a3d)')
+
+        section = self._buffer[self._position:end].cast(type_code)
+        self._position = end + _padding(size)
+        return section
+
+    def __len__(self) -> int:
+        return len(self.bpms)
+
+    def get_digest(self) -> str:
+        """
+        a hash of the whole corpus, calculated once, corpora with the same tunes have the same digest
+        """
+        if self._digest is None:
+            self._digest = hashlib.blake2b(self._buffer[:self._size]).hexdigest()
+        return self._digest
+
+    def get_note_columns(self, idx: int) -> NoteColumnViews:
+        """
+        (pitches, starts, ends, velocities) of all notes of the tune, views over the mapping
+        """
+        start, end = self.tune_note_offsets[idx], self.tune_note_offsets[idx + 1]
+        return self.pitches[start:end], self.starts[start:end], self.ends[start:end], self.velocities[start:end]
+
+    def get_packed_tunes(self, start_idx: int = 0, end_idx: Optional[int] = None) -> PackedTunes:
+        """
+        tunes from start_idx to end_idx as PackedTunes, note columns are views over the mapping
+        """
+        if end_idx is None:
+            end_idx = len(self)
+
+        first_note, last_note = self.tune_note_offsets[start_idx], self.tune_note_offsets[end_idx]
+        offsets = array('q', self.tune_note_offsets[start_idx:end_idx + 1])
+        for i in range(len(offsets)):
+            offsets[i] -= first_note
+
+        return PackedTunes(self.pitches[first_note:last_note], self.starts[first_note:last_note],
+                           self.ends[first_note:last_note], self.velocities[first_note:last_note], offsets)
+
+    def get_metadata(self, idx: int) -> Dict[str, Any]:
+        """
+        timbres and tags of tracks and the blueprint of the tune, parsed every time it is asked for
+        """
+        return json.loads(bytes(self._metadata[self._metadata_offsets[idx]:self._metadata_offsets[idx + 1]]))
+
+    def get_blueprint(self, idx: int) -> Optional[TuneBlueprint]:
+        blueprint = self.get_metadata(idx)['blueprint']
+        return TuneBlueprint(**blueprint) if blueprint is not None else None
+
+    def get_tune(self, idx: int) -> Tune:
+        """
+        the stored tune as a Tune, its note arrays are copies, so it can be changed freely
+        """
+        metadata = self.get_metadata(idx)
+
+        res = Tune()
+        res.bpm = self.bpms[idx]
+        res.start_time = self.start_times[idx]
+        res.end_time = self.end_times[idx]
+
+        first_track = self.tune_track_offsets[idx]
+        pitch_size, time_size = self.pitches.itemsize, self.starts.itemsize
+        for track_idx, track_metadata in enumerate(metadata['tracks']):
+            start, end = self.track_note_offsets[first_track + track_idx], \
+                self.track_note_offsets[first_track + track_idx + 1]
+
+            track = Track(Timbre(*track_metadata['timbre']))
+            track.tags = track_metadata['tags']
+            # filled in place, not through the attributes, so that clones of the track can share the arrays
+            pitches, starts, ends, velocities = track.get_writable_columns()
+            pitches.frombytes(self._pitches_bytes[start * pitch_size:end * pitch_size])
+            starts.frombytes(self._starts_bytes[start * time_size:end * time_size])
+            ends.frombytes(self._ends_bytes[start * time_size:end * time_size])
+            velocities.frombytes(self._velocities_bytes[start * time_size:end * time_size])
+            res.tracks.append(track)
+
+        return res
+
+    def get_tunes(self, start_idx: int = 0, end_idx: Optional[int] = None) -> List[Tune]:
+        if end_idx is None:
+            end_idx = len(self)
+        return [self.get_tune(i) for i in range(start_idx, end_idx)]
+
+    def __iter__(self) -> Iterator[Tune]:
+        for i in range(len(self)):
+            yield self.get_tune(i)
+
+    def close(self):
+        """
+        unmaps the file, views handed out before keep the mapping alive until they are gone
+        """
+        for value in list(vars(self).values()):
+            if isinstance(value, memoryview):
+                value.release()
+        if self._mmap is None:
+            return
+        try:
+            self._mmap.close()
+        except BufferError:
+            pass
+
+    def __enter__(self) -> 'TuneCorpus':
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def __getstate__(self):
+        if self._path is None:
+            raise TuneCorpusError(f'a corpus over {self._name} cannot be pickled (error: 84c3f5a6)')
+        return self._path
+
+    def __setstate__(self, path: str):
+        self.__init__(path)
+
+
+class CorpusTuneGenerator(TuneGeneratorInterface):
+    """
+    "generates" tunes by picking them from a corpus, a tune seed picks a tune by its hash.
+
+    It is meant to calibrate evaluators against stored tunes:
+
+        NaiveRandomEvaluator(CorpusTuneGenerator(TuneCorpus(path)), 'calibration')
+    """
+
+    def __init__(self, corpus: TuneCorpus):
+        self._corpus: TuneCorpus = corpus
+
+    def get_calibration_cache_key(self) -> str:
+        return super().get_calibration_cache_key() + '/' + self._corpus.get_digest()
+
+    def generate_tunes(self, generator_seed: str, tune_seeds: List[str]) -> List[Tune]:
+        if len(self._corpus) == 0:
+            raise TuneCorpusError('cannot pick tunes from an empty corpus (error: e07a9b52)')
+
+        res = []
+        for seed in tune_seeds:
+            digest = hashlib.blake2b((generator_seed + '/' + seed).encode(), digest_size=8).digest()
+            res.append(self._corpus.get_tune(int.from_bytes(digest, 'little') % len(self._corpus)))
+        return res
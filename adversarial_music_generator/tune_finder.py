@@ -1,21 +1,48 @@
+import asyncio
+import cProfile
+import json
 import logging
-from copy import deepcopy
-from dataclasses import dataclass
+import math
+import os
+import queue
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass, field
 from multiprocessing.pool import Pool
-from typing import Dict, List, Callable
-
+from typing import Dict, List, Callable, Optional, Tuple, Iterator, AsyncIterator, Hashable, Sequence, Union
+
+from adversarial_music_generator.calibrating_tune_evaluator import CalibratingTuneEvaluator
+from adversarial_music_generator.chunk_scheduler import ChunkSchedulerInterface, FixedChunkScheduler, \
+    AdaptiveChunkScheduler, TaskFactory
+from adversarial_music_generator.cpus import get_num_available_cpus
+from adversarial_music_generator.distributed.coordinator import DistributedCoordinator
+from adversarial_music_generator.evaluation_cache import EvaluationCache, AspectValues
 from adversarial_music_generator.find_tunes_task import FindTunesTask
 from adversarial_music_generator.interfaces import TuneGeneratorInterface, TuneMutatorInterface, \
-    TuneEvaluatorInterface, EvaluationReducerInterface, TuneProcessorInterface
+    TuneEvaluatorInterface, TuneProcessorInterface, IncrementalTuneEvaluatorInterface
+from adversarial_music_generator.models.compact_blueprint import CompactBlueprint, BaseSeedTable, create_tune_seed, \
+    create_mutation_seed, BlueprintError, pack_blueprints, unpack_blueprints
+from adversarial_music_generator.models.evaluation_batch import EvaluationBatch
+from adversarial_music_generator.models.mutation_delta import MutationDelta
+from adversarial_music_generator.models.search_checkpoint import SearchCheckpoint
+from adversarial_music_generator.models.search_metrics import StageMetrics, PhaseMetrics, SearchMetrics
+from adversarial_music_generator.models.search_snapshot import SearchSnapshot
 from adversarial_music_generator.models.tune import Tune
 from adversarial_music_generator.models.tune_blueprint import TuneBlueprint
 from adversarial_music_generator.models.tune_evaluation_result import TuneEvaluationResult
+from adversarial_music_generator.top_k_collector import TopKCollector
+from adversarial_music_generator.tune_cache import TuneCache
+from adversarial_music_generator.tune_corpus import TuneCorpusError
 from adversarial_music_generator.tune_finder_interface import TuneFinderInterface
 
 SearchResultsDict = Dict[str, TuneEvaluationResult]
 MutationSearchResultsDict = Dict[str, TuneEvaluationResult]
+EvaluateFunction = Callable[[List[int]], List[TuneEvaluationResult]]
 ProgressReportingFunction = Callable[
-    [str, int, int, List[TuneEvaluationResult], List[List[TuneEvaluationResult]], Dict], None
+    [str, int, int, EvaluationBatch, TopKCollector], None
 ]
 
 
@@ -28,276 +55,1049 @@ class GenerationSearchTask:
     base_seed_str: str
     start_idx: int
     end_idx: int
-    generator: TuneGeneratorInterface
-    evaluator: TuneEvaluatorInterface
-    postprocessor: TuneProcessorInterface
+    # the index of the base seed in the search's BaseSeedTable
+    base_seed_idx: int = 0
+
+    def get_iterations(self) -> Sequence[int]:
+        return range(self.start_idx, self.end_idx)
 
 
 @dataclass
 class MutationSearchTask:
-    initial_tunes_blueprints: List[TuneBlueprint]
-    base_mutation_seed_str: str
+    initial_tunes_blueprints: List[CompactBlueprint]
+    # base seeds the blueprints refer to
+    base_seeds: BaseSeedTable
+    epoch: int
     start_idx: int
     end_idx: int
+    # known evaluations of the initial tunes, if any, as values of the evaluator's aspects
+    initial_tunes_aspect_values: Optional[List[AspectValues]] = None
+    # if set, the task is partitioned by parent: start_idx and end_idx are indices of initial tunes,
+    # and the task covers all iterations of the epoch mutating them (iteration i mutates
+    # initial tune i % number of initial tunes), this is the number of iterations in the epoch
+    num_iterations_in_epoch: Optional[int] = None
+
+    def get_iterations(self) -> Sequence[int]:
+        """
+        iterations of the epoch covered by the task, in the order they are run
+        """
+        if self.num_iterations_in_epoch is None:
+            return range(self.start_idx, self.end_idx)
+
+        # children of a parent go one after another
+        num_parents = len(self.initial_tunes_blueprints)
+        return [i for parent_idx in range(self.start_idx, self.end_idx)
+                for i in range(parent_idx, self.num_iterations_in_epoch, num_parents)]
+
+    def __getstate__(self):
+        # mutations of common ancestors of the initial tunes are packed once
+        state = dict(self.__dict__)
+        state['initial_tunes_blueprints'] = pack_blueprints(self.initial_tunes_blueprints)
+        return state
+
+    def __setstate__(self, state):
+        state['initial_tunes_blueprints'] = unpack_blueprints(state['initial_tunes_blueprints'])
+        self.__dict__.update(state)
+
+
+@dataclass
+class SearchTaskResult:
+    evaluations: EvaluationBatch
+    # timings and counters of the worker that has run the task
+    metrics: StageMetrics
+
+
+@dataclass
+class WorkerContext:
+    """
+    everything a worker needs besides the task itself,
+    it is installed once per worker process rather than shipped with every task
+    """
     generator: TuneGeneratorInterface
     evaluator: TuneEvaluatorInterface
     mutator: TuneMutatorInterface
     postprocessor: TuneProcessorInterface
+    # not yet postprocessed tunes, to replay blueprints from their parents
+    tune_cache: Optional[TuneCache]
+    # evaluations of tunes seen by the worker, by content hash
+    evaluation_cache: Optional[EvaluationCache] = None
+    # see FindTunesTask.incremental_evaluation
+    incremental_evaluation: bool = False
+    # collects a profile of all tasks run by the worker, if profiling is on
+    profiler: Optional[cProfile.Profile] = None
+    profile_path: Optional[str] = None
+    trace_memory: bool = False
+    # content hashes of parents of the epoch whose evaluations have been put into the evaluation cache,
+    # so that later tasks of the epoch put them there again without materializing the parents
+    parent_content_hashes: Dict[CompactBlueprint, bytes] = field(default_factory=dict)
+    parent_content_hashes_epoch: Optional[int] = None
+
+
+_worker_context: Optional[WorkerContext] = None
+
+
+def _install_worker_context(generator: TuneGeneratorInterface, evaluator: TuneEvaluatorInterface,
+                            mutator: TuneMutatorInterface, postprocessor: TuneProcessorInterface,
+                            tune_cache_size: int, evaluation_cache_size: int = 0, incremental_evaluation: bool = False,
+                            profile_dir: Optional[str] = None, trace_memory: bool = False):
+    global _worker_context
+
+    profiler, profile_path = None, None
+    if profile_dir is not None:
+        os.makedirs(profile_dir, exist_ok=True)
+        profiler = cProfile.Profile()
+        profile_path = os.path.join(profile_dir, f'worker_{os.getpid()}.prof')
+
+    if trace_memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+
+    _worker_context = WorkerContext(
+        generator=generator,
+        evaluator=evaluator,
+        mutator=mutator,
+        postprocessor=postprocessor,
+        tune_cache=TuneCache(tune_cache_size) if tune_cache_size > 0 else None,
+        evaluation_cache=EvaluationCache(evaluation_cache_size) if evaluation_cache_size > 0 else None,
+        incremental_evaluation=incremental_evaluation,
+        profiler=profiler,
+        profile_path=profile_path,
+        trace_memory=trace_memory
+    )
+
+
+def _create_base_seed_table(find_task: FindTunesTask) -> BaseSeedTable:
+    """
+    the search and materialization of its results make the same table, so that compact blueprints
+    of both are equal and tunes cached during the search are found by materialization
+    """
+    return BaseSeedTable([find_task.base_seed])
+
+
+def _get_worker_context() -> WorkerContext:
+    if _worker_context is None:
+        raise TuneFinderError('worker context has not been installed (error: 5be2c6f0)')
+    return _worker_context
+
+
+@contextmanager
+def _instrument_task(context: WorkerContext, metrics: StageMetrics):
+    """
+    measures a task as a whole and, if asked for, profiles it and traces its memory
+    """
+    cache = context.tune_cache
+    num_cache_hits, num_cache_misses = (cache.num_hits, cache.num_misses) if cache is not None else (0, 0)
+
+    if context.trace_memory:
+        if hasattr(tracemalloc, 'reset_peak'):
+            tracemalloc.reset_peak()
+        else:
+            # python < 3.9, the peak is reset by tracing anew
+            tracemalloc.stop()
+            tracemalloc.start()
+    if context.profiler is not None:
+        context.profiler.enable()
+
+    try:
+        with metrics.measure('task'):
+            yield
+    finally:
+        if context.profiler is not None:
+            context.profiler.disable()
+            # rewritten after every task, so that the profile survives the pool shutdown
+            context.profiler.dump_stats(context.profile_path)
+        if context.trace_memory:
+            metrics.record_peak('traced_memory_bytes', tracemalloc.get_traced_memory()[1])
+        if cache is not None:
+            metrics.count('tune_cache_hits', cache.num_hits - num_cache_hits)
+            metrics.count('tune_cache_misses', cache.num_misses - num_cache_misses)
+
+
+def _evaluate_tunes(context: WorkerContext, tunes: List[Tune], metrics: StageMetrics,
+                    evaluate_function: Optional[EvaluateFunction] = None) -> List[TuneEvaluationResult]:
+    """
+    evaluates tunes not found in the evaluation cache (each distinct tune once) and takes the rest from the cache.
+
+    evaluate_function gets positions of tunes to evaluate, it defaults to plain evaluate_tunes of the evaluator
+    """
+    evaluator = context.evaluator
+    if evaluate_function is None:
+        def evaluate_function(positions: List[int]) -> List[TuneEvaluationResult]:
+            return evaluator.evaluate_tunes([tunes[i] for i in positions])
+
+    cache = context.evaluation_cache
+    if cache is None:
+        with metrics.measure('evaluation'):
+            return evaluate_function(list(range(len(tunes))))
+
+    aspects = evaluator.get_aspects()
+
+    with metrics.measure('hashing'):
+        content_hashes = [tune.content_hash() for tune in tunes]
+
+    values_by_hash: Dict[bytes, AspectValues] = {}
+    positions_to_evaluate: Dict[bytes, int] = {}
+    for position, content_hash in enumerate(content_hashes):
+        if content_hash in values_by_hash or content_hash in positions_to_evaluate:
+            continue
+        values = cache.get(content_hash)
+        if values is not None:
+            values_by_hash[content_hash] = values
+        else:
+            positions_to_evaluate[content_hash] = position
 
+    with metrics.measure('evaluation'):
+        evaluations = evaluate_function(list(positions_to_evaluate.values()))
 
-def _generate_tune_by_blueprint(blueprint: TuneBlueprint, generator: TuneGeneratorInterface,
-                                mutator: TuneMutatorInterface, postprocessor: TuneProcessorInterface) -> Tune:
-    tune = generator.generate_tunes(blueprint.base_seed, [blueprint.tune_seed])[0]
-    for mutation_seed in blueprint.mutation_seeds:
-        mutator.mutate_tune(tune, mutation_seed)
-    postprocessor.process(tune, blueprint.base_seed, blueprint.tune_seed)
-    return tune
+    if len(evaluations) != len(positions_to_evaluate):
+        raise TuneFinderError('size mismatch (error: 4f1b7a9e)')
 
+    for content_hash, evaluation in zip(positions_to_evaluate.keys(), evaluations):
+        values = tuple(evaluation.get_aspect_value(aspect) for aspect in aspects)
+        values_by_hash[content_hash] = values
+        cache.put(content_hash, values)
 
-def _handle_generation_search_task(task: GenerationSearchTask) -> List[TuneEvaluationResult]:
-    logging.info(f"generation {task.start_idx} - {task.end_idx}")
+    metrics.count('evaluated_tunes', len(evaluations))
+    metrics.count('evaluation_cache_hits', len(tunes) - len(evaluations))
 
-    generator = task.generator
-    evaluator = task.evaluator
+    return [_create_evaluation(aspects, values_by_hash[content_hash]) for content_hash in content_hashes]
 
-    seeds = [task.base_seed_str + str(i) for i in range(task.start_idx, task.end_idx)]
 
-    tunes = generator.generate_tunes(task.base_seed_str, seeds)
-    for tune, tune_seed in zip(tunes, seeds):
-        task.postprocessor.process(tune, task.base_seed_str, tune_seed)
+def _create_evaluation(aspects: List[str], values: AspectValues) -> TuneEvaluationResult:
+    evaluation = TuneEvaluationResult()
+    for aspect, value in zip(aspects, values):
+        evaluation.set_aspect_value(aspect, value)
+    return evaluation
 
-    evaluations = evaluator.evaluate_tunes(tunes)
 
-    if len(tunes) != len(evaluations) or len(seeds) != len(evaluations):
-        raise TuneFinderError('size mismatch (error: 93bf5bcc)')
+def _get_blueprint_prefix_key(blueprint: TuneBlueprint, num_mutations: int) -> Tuple:
+    return blueprint.base_seed, blueprint.tune_seed, tuple(blueprint.mutation_seeds[0:num_mutations])
 
-    for seed, evaluation in zip(seeds, evaluations):
-        evaluation.blueprint = TuneBlueprint(base_seed=task.base_seed_str, tune_seed=seed, mutation_seeds=[])
 
-    return evaluations
+def _generate_tune_by_blueprint(blueprint: TuneBlueprint, generator: TuneGeneratorInterface,
+                                mutator: TuneMutatorInterface, postprocessor: TuneProcessorInterface,
+                                cache: Optional[TuneCache] = None) -> Tune:
+    tune = _generate_raw_tune_by_blueprint(blueprint, generator, mutator, cache)
+    postprocessor.process(tune, blueprint.base_seed, blueprint.tune_seed)
+    return tune
 
 
-def _handle_mutation_search_task(task: MutationSearchTask) -> List[TuneEvaluationResult]:
-    evaluator = task.evaluator
-    source_tunes = [_generate_tune_by_blueprint(x, task.generator, task.mutator, task.postprocessor) for x in
-                    task.initial_tunes_blueprints]
+def _generate_raw_tune_by_blueprint(blueprint: TuneBlueprint, generator: TuneGeneratorInterface,
+                                    mutator: TuneMutatorInterface, cache: Optional[TuneCache] = None) -> Tune:
+    """
+    generates a tune and applies mutations from the blueprint, but does not postprocess it.
 
-    mutated_tunes: List[Tune] = []
-    mutated_tunes_blueprints: List[TuneBlueprint] = []
+    If a cache is given, replay starts from the longest mutation prefix found there,
+    and the resulting tune is put into the cache for its descendants to start from.
+    """
+    return _replay_blueprint(blueprint.base_seed, blueprint.tune_seed, len(blueprint.mutation_seeds),
+                             lambda num_mutations: _get_blueprint_prefix_key(blueprint, num_mutations),
+                             lambda num_applied_mutations: blueprint.mutation_seeds[num_applied_mutations:],
+                             generator, mutator, cache)
 
-    for i in range(task.start_idx, task.end_idx):
-        source_tune_blueprint = task.initial_tunes_blueprints[i % len(source_tunes)]
-        cloned_blueprint = deepcopy(source_tune_blueprint)
 
-        if i >= len(task.initial_tunes_blueprints):
-            # first N tunes (one for every original tune_seed)
-            # go unmutated to leave the original
-            # tunes in the evaluated set (in case no mutations bring any
-            # improvement)
-            mutation_seed = task.base_mutation_seed_str + str(i)
-        else:
-            mutation_seed = TuneMutatorInterface.SPECIAL_SEED_STR_TO_LEAVE_TUNE_UNMUTATED
+def _generate_tune_by_compact_blueprint(blueprint: CompactBlueprint, base_seeds: BaseSeedTable,
+                                        generator: TuneGeneratorInterface, mutator: TuneMutatorInterface,
+                                        postprocessor: TuneProcessorInterface,
+                                        cache: Optional[TuneCache] = None) -> Tune:
+    tune = _generate_raw_tune_by_compact_blueprint(blueprint, base_seeds, generator, mutator, cache)
+    base_seed = base_seeds[blueprint.base_seed_idx]
+    postprocessor.process(tune, base_seed, create_tune_seed(base_seed, blueprint.tune_idx))
+    return tune
 
-        cloned_blueprint.mutation_seeds.append(mutation_seed)
 
-        mutated_tune = _generate_tune_by_blueprint(cloned_blueprint, task.generator, task.mutator, task.postprocessor)
+def _generate_raw_tune_by_compact_blueprint(blueprint: CompactBlueprint, base_seeds: BaseSeedTable,
+                                            generator: TuneGeneratorInterface, mutator: TuneMutatorInterface,
+                                            cache: Optional[TuneCache] = None) -> Tune:
+    """
+    same as _generate_raw_tune_by_blueprint, seed strings are only made for mutations actually replayed
+    and prefixes of the blueprint serve as cache keys
+    """
+    base_seed = base_seeds[blueprint.base_seed_idx]
+
+    def get_mutation_seeds(num_applied_mutations: int) -> List[str]:
+        return [create_mutation_seed(base_seed, epoch, index)
+                for epoch, index in blueprint.get_steps()[num_applied_mutations:]]
+
+    return _replay_blueprint(base_seed, create_tune_seed(base_seed, blueprint.tune_idx), blueprint.num_mutations,
+                             blueprint.get_prefix, get_mutation_seeds, generator, mutator, cache)
+
+
+def _replay_blueprint(base_seed: str, tune_seed: str, num_mutations: int,
+                      get_prefix_key: Callable[[int], Hashable], get_mutation_seeds: Callable[[int], List[str]],
+                      generator: TuneGeneratorInterface, mutator: TuneMutatorInterface,
+                      cache: Optional[TuneCache]) -> Tune:
+    """
+    :param get_prefix_key: gives the cache key of the tune with the first n mutations applied
+    :param get_mutation_seeds: gives the seeds of all the mutations but the first n
+    """
+    num_applied_mutations = 0
+    tune: Optional[Tune] = None
+
+    if cache is not None:
+        for num_cached_mutations in range(num_mutations, -1, -1):
+            cached_tune = cache.get(get_prefix_key(num_cached_mutations))
+            if cached_tune is not None:
+                tune = cached_tune.clone()
+                num_applied_mutations = num_cached_mutations
+                break
+
+    if tune is None:
+        tune = generator.generate_tunes(base_seed, [tune_seed])[0]
+
+    if num_applied_mutations < num_mutations:
+        for mutation_seed in get_mutation_seeds(num_applied_mutations):
+            mutator.mutate_tune(tune, mutation_seed)
+
+        if cache is not None:
+            cache.put(get_prefix_key(num_mutations), tune.clone())
 
-        mutated_tunes.append(mutated_tune)
-        mutated_tunes_blueprints.append(cloned_blueprint)
+    return tune
 
-    evaluations = evaluator.evaluate_tunes(mutated_tunes)
 
-    for (evaluation, blueprint) in zip(evaluations, mutated_tunes_blueprints):
-        evaluation.blueprint = blueprint
+def _materialize_tunes(blueprints: List[TuneBlueprint], base_seeds: BaseSeedTable,
+                       context: WorkerContext) -> List[Tune]:
+    """
+    blueprints made by the search are replayed in the compact form, which is what the search caches
+    tunes by, so replays start from tunes cached during the search
+    """
+    res = []
+    for blueprint in blueprints:
+        try:
+            compact_blueprint = CompactBlueprint.from_blueprint(blueprint, base_seeds)
+        except BlueprintError:
+            res.append(_generate_tune_by_blueprint(blueprint, context.generator, context.mutator,
+                                                   context.postprocessor, context.tune_cache))
+            continue
+
+        res.append(_generate_tune_by_compact_blueprint(compact_blueprint, base_seeds, context.generator,
+                                                       context.mutator, context.postprocessor, context.tune_cache))
+    return res
+
+
+def _import_shared_tunes():
+    """
+    returns the shared_tunes module, or None if shared memory is not there (python < 3.8)
+    """
+    try:
+        from adversarial_music_generator import shared_tunes
+    except ImportError:
+        return None
+    return shared_tunes
+
+
+def _handle_materialization_task(blueprints: List[TuneBlueprint], base_seeds: BaseSeedTable) -> Union[str, List[Tune]]:
+    """
+    materializes tunes and hands them over in a shared memory segment, returns the name of the segment.
+
+    Tunes are returned as they are if they cannot be put there (no shared memory, or tags of their
+    tracks are not json).
+    """
+    tunes = _materialize_tunes(blueprints, base_seeds, _get_worker_context())
+
+    shared_tunes = _import_shared_tunes()
+    if shared_tunes is None:
+        return tunes
+
+    try:
+        return shared_tunes.SharedTunes.create(tunes).release()
+    except TuneCorpusError:
+        return tunes
+
+
+def _handle_generation_search_task(task: GenerationSearchTask) -> SearchTaskResult:
+    logging.info(f"generation {task.start_idx} - {task.end_idx}")
 
-    return evaluations
+    context = _get_worker_context()
+    generator = context.generator
+    evaluator = context.evaluator
+    metrics = StageMetrics()
+
+    with _instrument_task(context, metrics):
+        seeds = [create_tune_seed(task.base_seed_str, i) for i in range(task.start_idx, task.end_idx)]
+
+        with metrics.measure('generation'):
+            tunes = generator.generate_tunes(task.base_seed_str, seeds)
+
+        with metrics.measure('postprocessing'):
+            for tune, tune_seed in zip(tunes, seeds):
+                context.postprocessor.process(tune, task.base_seed_str, tune_seed)
+
+        evaluations = _evaluate_tunes(context, tunes, metrics)
+
+        if len(tunes) != len(evaluations) or len(seeds) != len(evaluations):
+            raise TuneFinderError('size mismatch (error: 93bf5bcc)')
+
+        with metrics.measure('packing'):
+            for i, evaluation in zip(range(task.start_idx, task.end_idx), evaluations):
+                evaluation.blueprint = CompactBlueprint(task.base_seed_idx, i)
+            batch = EvaluationBatch.from_results(evaluator.get_aspects(), evaluations)
+
+        metrics.count('tunes', len(tunes))
+
+    return SearchTaskResult(evaluations=batch, metrics=metrics)
+
+
+def _handle_mutation_search_task(task: MutationSearchTask) -> SearchTaskResult:
+    context = _get_worker_context()
+    evaluator = context.evaluator
+    cache = context.tune_cache
+    base_seeds = task.base_seeds
+    num_source_tunes = len(task.initial_tunes_blueprints)
+    metrics = StageMetrics()
+
+    # children are evaluated from their parents and mutation deltas; a postprocessor
+    # changing tunes would make deltas relative to parents meaningless
+    use_deltas = context.incremental_evaluation and isinstance(evaluator, IncrementalTuneEvaluatorInterface) \
+        and context.postprocessor.leaves_tunes_unchanged()
+    seed_evaluation_cache = context.evaluation_cache is not None and task.initial_tunes_aspect_values is not None
+
+    iterations = task.get_iterations()
+    # only parents of the task's iterations are materialized
+    parent_indices = sorted(set(i % num_source_tunes for i in iterations))
+
+    if seed_evaluation_cache and context.parent_content_hashes_epoch != task.epoch:
+        # parents of an epoch are never parents again, their children are
+        context.parent_content_hashes.clear()
+        context.parent_content_hashes_epoch = task.epoch
+
+    with _instrument_task(context, metrics):
+        parent_tunes: Dict[int, Tune] = {}
+        if use_deltas or seed_evaluation_cache:
+            with metrics.measure('cache_warmup'):
+                for parent_idx in parent_indices:
+                    parent_blueprint = task.initial_tunes_blueprints[parent_idx]
+                    if not use_deltas and parent_blueprint in context.parent_content_hashes:
+                        # the parent is only needed to replay its children from
+                        if cache is not None:
+                            _generate_raw_tune_by_compact_blueprint(parent_blueprint, base_seeds, context.generator,
+                                                                    context.mutator, cache)
+                        metrics.count('reused_parent_hashes')
+                        continue
+
+                    parent_tunes[parent_idx] = _generate_tune_by_compact_blueprint(
+                        parent_blueprint, base_seeds, context.generator, context.mutator, context.postprocessor,
+                        cache)
+        elif cache is not None:
+            # parents go to the cache, so every child costs a clone and a single mutation
+            with metrics.measure('cache_warmup'):
+                for parent_idx in parent_indices:
+                    _generate_raw_tune_by_compact_blueprint(task.initial_tunes_blueprints[parent_idx], base_seeds,
+                                                            context.generator, context.mutator, cache)
+        metrics.count('materialized_parents', len(parent_indices))
+
+        if seed_evaluation_cache:
+            # unmutated children of the parents, as well as mutations turning out to be no-ops,
+            # are not evaluated again
+            for parent_idx in parent_indices:
+                parent_blueprint = task.initial_tunes_blueprints[parent_idx]
+                content_hash = context.parent_content_hashes.get(parent_blueprint)
+                if content_hash is None:
+                    content_hash = parent_tunes[parent_idx].content_hash()
+                    context.parent_content_hashes[parent_blueprint] = content_hash
+                context.evaluation_cache.put(content_hash, tuple(task.initial_tunes_aspect_values[parent_idx]))
+
+        # seeds the postprocessor gets for children of every source tune
+        source_tunes_seeds = [(base_seeds[blueprint.base_seed_idx],
+                               create_tune_seed(base_seeds[blueprint.base_seed_idx], blueprint.tune_idx))
+                              for blueprint in task.initial_tunes_blueprints]
+
+        mutated_tunes: List[Tune] = []
+        mutated_tunes_blueprints: List[CompactBlueprint] = []
+        deltas: List[Optional[MutationDelta]] = []
+
+        for i in iterations:
+            with metrics.measure('replay'):
+                source_tune_blueprint = task.initial_tunes_blueprints[i % num_source_tunes]
+                base_seed, tune_seed = source_tunes_seeds[i % num_source_tunes]
+
+                if i >= len(task.initial_tunes_blueprints):
+                    mutation_idx = i
+                else:
+                    # first N tunes (one for every original tune_seed)
+                    # go unmutated to leave the original
+                    # tunes in the evaluated set (in case no mutations bring any
+                    # improvement)
+                    mutation_idx = CompactBlueprint.TRANSPARENT_INDEX
+
+                # the child shares all the mutations of its parent, nothing is copied
+                mutated_blueprint = source_tune_blueprint.mutate(task.epoch, mutation_idx)
+                mutation_seed = create_mutation_seed(base_seed, task.epoch, mutation_idx)
+
+                if use_deltas:
+                    mutated_tune = parent_tunes[i % num_source_tunes].clone()
+                    deltas.append(context.mutator.mutate_tune_with_delta(mutated_tune, mutation_seed))
+                    if cache is not None:
+                        cache.put(mutated_blueprint, mutated_tune.clone())
+                else:
+                    mutated_tune = _generate_raw_tune_by_compact_blueprint(mutated_blueprint, base_seeds,
+                                                                           context.generator, context.mutator, cache)
+
+            with metrics.measure('postprocessing'):
+                context.postprocessor.process(mutated_tune, base_seed, tune_seed)
+
+            mutated_tunes.append(mutated_tune)
+            mutated_tunes_blueprints.append(mutated_blueprint)
+
+        def evaluate_incrementally(positions: List[int]) -> List[TuneEvaluationResult]:
+            incremental_positions = [p for p in positions if deltas[p] is not None]
+            other_positions = [p for p in positions if deltas[p] is None]
+            evaluations_by_position: Dict[int, TuneEvaluationResult] = {}
+
+            if incremental_positions:
+                # states are only calculated if there is anything to evaluate incrementally
+                parent_states = dict(zip(parent_tunes, evaluator.get_evaluation_states(list(parent_tunes.values()))))
+                parent_positions = [iterations[p] % num_source_tunes for p in incremental_positions]
+                incremental_evaluations = evaluator.evaluate_mutated_tunes(
+                    [parent_tunes[p] for p in parent_positions],
+                    [parent_states[p] for p in parent_positions],
+                    [mutated_tunes[p] for p in incremental_positions],
+                    [deltas[p] for p in incremental_positions]
+                )
+                evaluations_by_position.update(zip(incremental_positions, incremental_evaluations))
+                metrics.count('incrementally_evaluated_tunes', len(incremental_positions))
+
+            if other_positions:
+                other_evaluations = evaluator.evaluate_tunes([mutated_tunes[p] for p in other_positions])
+                evaluations_by_position.update(zip(other_positions, other_evaluations))
+
+            return [evaluations_by_position[p] for p in positions]
+
+        evaluations = _evaluate_tunes(context, mutated_tunes, metrics, evaluate_incrementally if use_deltas else None)
+
+        with metrics.measure('packing'):
+            for (evaluation, blueprint) in zip(evaluations, mutated_tunes_blueprints):
+                evaluation.blueprint = blueprint
+            batch = EvaluationBatch.from_results(evaluator.get_aspects(), evaluations)
+
+        metrics.count('tunes', len(mutated_tunes))
+
+    return SearchTaskResult(evaluations=batch, metrics=metrics)
 
 
 class TuneFinder(TuneFinderInterface):
-    def find_tunes(self, find_task: FindTunesTask) -> List[Tune]:
-
-        chunk_size = find_task.chunk_size
+    def __init__(self, coordinator: Optional[DistributedCoordinator] = None):
+        # a pool lives as long as a find_tunes run and
+        # serves its random search phase as well as all mutation epochs
+        self._pool: Optional[Pool] = None
+        self._pool_size: int = 0
+        # the task the workers of the pool have been set up for
+        self._pool_find_task: Optional[FindTunesTask] = None
+        # if given, tasks go to remote workers connected to it instead of the pool
+        self._coordinator: Optional[DistributedCoordinator] = coordinator
+        self._metrics: SearchMetrics = SearchMetrics()
 
-        random_search_tasks = self._generate_random_search_tasks(
-            num_iterations=find_task.num_generation_iterations,
-            base_seed_str=find_task.base_seed,
-            generator=find_task.generator,
-            evaluator=find_task.evaluator,
-            postprocessor=find_task.postprocessor,
-            chunk_size=chunk_size
-        )
+    def find_tunes(self, find_task: FindTunesTask) -> List[Tune]:
+        final_snapshot = None
+        snapshots = self.find_tunes_iter(find_task)
+        try:
+            for final_snapshot in snapshots:
+                if final_snapshot.is_final:
+                    # while the pool is still there to materialize the tunes
+                    return self.generate_tunes(find_task, final_snapshot.blueprints)
+        finally:
+            snapshots.close()
+
+        return self.generate_tunes(find_task, final_snapshot.blueprints)
+
+    def find_tunes_iter(self, find_task: FindTunesTask) -> Iterator[SearchSnapshot]:
+        """
+        runs a search yielding a snapshot after the random phase and after every mutation epoch,
+        the last one has is_final set.
+
+        Closing the iterator early stops the search (and its pool) at the end of the current phase.
+        """
+        self._metrics = SearchMetrics()
+
+        # calibration happens once, here, so that workers get a calibrated evaluator
+        self._calibrate_evaluator(find_task)
+
+        # tracing slows everything down, so it does not outlive the search in this process
+        was_tracing_memory = tracemalloc.is_tracing()
+
+        # the context in this process is used for non-parallel runs
+        # and to materialize the tunes found
+        _install_worker_context(*self._get_worker_context_args(find_task))
+
+        if self._coordinator is not None:
+            self._coordinator.install_worker_context(self._get_worker_context_args(find_task))
+        elif find_task.parallelize:
+            self._pool_size = self._get_pool_size(find_task)
+            # workers hand materialized tunes over in shared memory if there is one
+            shared_tunes = _import_shared_tunes()
+            if shared_tunes is not None:
+                shared_tunes.prepare_to_share_with_workers()
+            self._pool = Pool(self._pool_size, initializer=_install_worker_context,
+                              initargs=self._get_worker_context_args(find_task))
+            self._pool_find_task = find_task
+
+        try:
+            yield from self._search(find_task)
+        finally:
+            if self._pool is not None:
+                self._pool.close()
+                self._pool.join()
+                self._pool = None
+                self._pool_find_task = None
+            if tracemalloc.is_tracing() and not was_tracing_memory:
+                tracemalloc.stop()
+
+    async def find_tunes_async(self, find_task: FindTunesTask) -> AsyncIterator[SearchSnapshot]:
+        """
+        same as find_tunes_iter, but phases run in a separate thread not to block the event loop
+        """
+        loop = asyncio.get_running_loop()
+        snapshots = self.find_tunes_iter(find_task)
+
+        # a single thread, so that closing waits for a phase still running, if any
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            try:
+                while True:
+                    snapshot = await loop.run_in_executor(executor, next, snapshots, None)
+                    if snapshot is None:
+                        return
+                    yield snapshot
+            finally:
+                await loop.run_in_executor(executor, snapshots.close)
+
+    def get_metrics(self) -> SearchMetrics:
+        """
+        metrics of the phases run by the last (or current) search
+        """
+        return self._metrics
+
+    def generate_tunes(self, find_task: FindTunesTask, blueprints: List[TuneBlueprint]) -> List[Tune]:
+        """
+        materializes tunes by blueprints of a snapshot,
+        in the workers of the search if it is running (tunes come back through shared memory)
+        """
+        base_seeds = _create_base_seed_table(find_task)
+        if self._pool is not None and self._pool_find_task is find_task and len(blueprints) > 1:
+            return self._generate_tunes_in_pool(blueprints, base_seeds)
+
+        context = _worker_context
+        if context is None or context.generator is not find_task.generator:
+            _install_worker_context(*self._get_worker_context_args(find_task))
+            context = _get_worker_context()
+
+        return _materialize_tunes(blueprints, base_seeds, context)
+
+    def _generate_tunes_in_pool(self, blueprints: List[TuneBlueprint], base_seeds: BaseSeedTable) -> List[Tune]:
+        num_chunks = min(len(blueprints), self._pool_size)
+        bounds = [len(blueprints) * i // num_chunks for i in range(num_chunks + 1)]
+        chunks = [blueprints[bounds[i]:bounds[i + 1]] for i in range(num_chunks)]
+
+        async_results = [self._pool.apply_async(_handle_materialization_task, (chunk, base_seeds))
+                         for chunk in chunks]
+        for async_result in async_results:
+            async_result.wait()
+
+        # segments released by workers belong to nobody until attached here, so all of them
+        # are collected before anything can fail, and those not taken over are removed in the end
+        unclaimed_names = [async_result.get() for async_result in async_results
+                           if async_result.successful() and isinstance(async_result.get(), str)]
+        try:
+            tunes = []
+            for async_result in async_results:
+                # raises the error of a failed chunk
+                result = async_result.get()
+                if isinstance(result, str):
+                    shared_tunes = _import_shared_tunes().SharedTunes.attach(result, owner=True)
+                    unclaimed_names.remove(result)
+                    with shared_tunes:
+                        tunes.extend(shared_tunes.get_tunes())
+                else:
+                    tunes.extend(result)
+
+            return tunes
+        finally:
+            for name in unclaimed_names:
+                _import_shared_tunes().SharedTunes.remove(name)
+
+    def _search(self, find_task: FindTunesTask) -> Iterator[SearchSnapshot]:
+
+        search_start_time = time.perf_counter()
 
         # noinspection PyUnusedLocal
         def progress_reporting_function_impl(phase: str, iterations_done: int, total_iterations: int,
-                                             new_results: List[TuneEvaluationResult],
-                                             results_so_far: List[List[TuneEvaluationResult]],
-                                             memory: Dict):
+                                             new_results: EvaluationBatch,
+                                             collector: TopKCollector):
             """
 
             :param str phase:
             :param int iterations_done:
             :param int total_iterations:
-            :param List[TuneEvaluationResult] new_results:
-            :param List[List[TuneEvaluationResult]] results_so_far:
-            :param Dict memory: a "persistent" memory object
-                                provided by the outer process (empty at the beginning)
+            :param EvaluationBatch new_results:
+            :param TopKCollector collector: the collector of the phase, new results already added
             :return:
             """
-            locally_best_evaluations = self._get_best_evaluations(new_results, find_task.reducer, 1)
-            locally_best_score = find_task.reducer.reduce(locally_best_evaluations[0])
-
-            best_score_memory_key = 'best_score'
-            best_evaluation_memory_key = 'best_evaluation'
-
-            if best_score_memory_key not in memory:
-                memory[best_score_memory_key] = locally_best_score
-                memory[best_evaluation_memory_key] = locally_best_evaluations[0]
-
-            if memory[best_score_memory_key] < locally_best_score:
-                memory[best_score_memory_key] = locally_best_score
-                memory[best_evaluation_memory_key] = locally_best_evaluations[0]
-
-            best_score = memory[best_score_memory_key]
             print(phase, iterations_done, "of", total_iterations, "(yielded ", len(new_results), 'evaluations)',
-                  'best score:', best_score)
+                  'best score:', collector.best_score)
 
         # the line below is to basically have a type-hinted var and notice in IDE if
         # the function implementation violates the contract
         progress_reporting_function: ProgressReportingFunction = progress_reporting_function_impl
 
-        random_search_results = self._run_tasks(
-            find_task=find_task,
-            processing_function=_handle_generation_search_task,
-            tasks=random_search_tasks,
-            progress_reporting_function=progress_reporting_function,
-            phase_name='random search')
+        snapshots: List[SearchSnapshot] = []
+        num_evaluations = 0
+
+        def create_snapshot(phase: str, epoch: Optional[int], checkpoint: SearchCheckpoint,
+                            phase_metrics: Optional[PhaseMetrics]) -> SearchSnapshot:
+            snapshot = SearchSnapshot(
+                phase=phase,
+                epoch=epoch,
+                blueprints=checkpoint.blueprints,
+                scores=checkpoint.scores,
+                phase_seconds=phase_metrics.wall_seconds if phase_metrics is not None else 0.0,
+                elapsed_seconds=time.perf_counter() - search_start_time,
+                num_evaluations=num_evaluations,
+                is_final=checkpoint.next_epoch >= find_task.num_mutation_epochs,
+                metrics=phase_metrics,
+                stopped_by=checkpoint.stopped_by
+            )
+            snapshots.append(snapshot)
+
+            if not snapshot.is_final and snapshot.stopped_by is None:
+                for policy in find_task.stopping_policies:
+                    if policy.should_stop(snapshots, find_task.num_mutation_iterations_in_epoch):
+                        snapshot.stopped_by = type(policy).__name__
+                        # so that resuming the search does not run the epochs the policy has skipped
+                        checkpoint.stopped_by = snapshot.stopped_by
+                        self._save_checkpoint(find_task, checkpoint)
+                        break
+
+            if snapshot.stopped_by is not None:
+                snapshot.is_final = True
+                # what the last epoch would have kept
+                snapshot.blueprints = snapshot.blueprints[0:find_task.num_tunes_to_find]
+                snapshot.scores = snapshot.scores[0:find_task.num_tunes_to_find]
+
+            return snapshot
+
+        checkpoint = self._load_checkpoint(find_task)
+
+        # blueprints travel between processes in the compact form, they are only expanded for snapshots
+        base_seeds = _create_base_seed_table(find_task)
+        base_seed_idx = base_seeds.intern(find_task.base_seed)
+
+        if checkpoint is None:
+            phase_metrics = PhaseMetrics(phase='random search', epoch=None)
+            phase_start_time = time.perf_counter()
+
+            def create_generation_search_task(start_idx: int, end_idx: int) -> GenerationSearchTask:
+                return GenerationSearchTask(base_seed_str=find_task.base_seed, start_idx=start_idx,
+                                            end_idx=end_idx, base_seed_idx=base_seed_idx)
+
+            collector = TopKCollector(find_task.num_tunes_to_keep_from_generation, find_task.reducer)
+            self._run_tasks(
+                processing_function=_handle_generation_search_task,
+                scheduler=self._create_chunk_scheduler(find_task, create_generation_search_task,
+                                                       find_task.num_generation_iterations),
+                progress_reporting_function=progress_reporting_function,
+                phase_name='random search',
+                num_iterations=find_task.num_generation_iterations,
+                collector=collector,
+                phase_metrics=phase_metrics)
+
+            num_evaluations += find_task.num_generation_iterations
+            with phase_metrics.parent.measure('checkpointing'):
+                checkpoint = self._create_checkpoint(find_task, 0, collector, base_seeds, num_evaluations, snapshots)
+                self._save_checkpoint(find_task, checkpoint)
+            best_blueprints = [evaluation.blueprint for evaluation in collector.get_best()]
+
+            self._finish_phase_metrics(find_task, phase_metrics, phase_start_time)
+            snapshot = create_snapshot('random search', None, checkpoint, phase_metrics)
+        else:
+            best_blueprints = [CompactBlueprint.from_blueprint(blueprint, base_seeds)
+                               for blueprint in checkpoint.blueprints]
+            num_evaluations = checkpoint.num_evaluations
+            # phases before the checkpoint, for stopping policies to see what they would have seen
+            # had the search not been interrupted
+            snapshots.extend(self._restore_previous_snapshots(find_task, checkpoint))
+            if checkpoint.next_epoch == 0:
+                snapshot = create_snapshot('random search', None, checkpoint, None)
+            else:
+                snapshot = create_snapshot('mutation', checkpoint.next_epoch - 1, checkpoint, None)
 
-        num_tunes_to_mutate = find_task.num_tunes_to_keep_from_generation
-        best_tune_evaluations: List[TuneEvaluationResult] = self._get_best_evaluations(random_search_results,
-                                                                                       find_task.reducer,
-                                                                                       num_tunes_to_mutate)
+        yield snapshot
+        if snapshot.is_final:
+            return
 
-        best_blueprints: List[TuneBlueprint] = [x.blueprint for x in best_tune_evaluations]
+        best_aspect_values: Optional[List[List[float]]] = checkpoint.aspect_values
 
-        for epoch in range(find_task.num_mutation_epochs):
+        for epoch in range(checkpoint.next_epoch, find_task.num_mutation_epochs):
             print("=========================")
             print("mutation epoch " + str(epoch))
             print("=========================")
-            mutation_search_tasks = self._generate_mutation_search_tasks(
-                num_iterations=find_task.num_mutation_iterations_in_epoch,
-                best_tunes_blueprints=best_blueprints,
-                evaluator=find_task.evaluator,
-                mutator=find_task.mutator,
-                generator=find_task.generator,
-                chunk_size=chunk_size,
-                base_mutation_seed_str=find_task.base_seed + "_mutation_epoch_" + str(epoch) + "_",
-                postprocessor=find_task.postprocessor
-            )
-
-            mutation_results = self._run_tasks(
-                find_task=find_task,
-                processing_function=_handle_mutation_search_task,
-                tasks=mutation_search_tasks,
-                progress_reporting_function=progress_reporting_function,
-                phase_name="mutation"
-            )
+            phase_metrics = PhaseMetrics(phase='mutation', epoch=epoch)
+            phase_start_time = time.perf_counter()
+
+            def create_mutation_search_task(start_idx: int, end_idx: int) -> MutationSearchTask:
+                return MutationSearchTask(initial_tunes_blueprints=best_blueprints,
+                                          base_seeds=base_seeds, epoch=epoch,
+                                          start_idx=start_idx, end_idx=end_idx,
+                                          initial_tunes_aspect_values=best_aspect_values,
+                                          num_iterations_in_epoch=num_iterations_in_epoch)
+
+            if find_task.partition_mutations_by_parent:
+                # tasks are cut by parents, a chunk of parents is about as much work as chunk_size iterations
+                num_iterations_in_epoch = find_task.num_mutation_iterations_in_epoch
+                scheduler = self._create_chunk_scheduler(
+                    find_task, create_mutation_search_task, len(best_blueprints),
+                    iterations_per_unit=math.ceil(num_iterations_in_epoch / max(1, len(best_blueprints))))
+            else:
+                num_iterations_in_epoch = None
+                scheduler = self._create_chunk_scheduler(find_task, create_mutation_search_task,
+                                                         find_task.num_mutation_iterations_in_epoch)
 
             if epoch < find_task.num_mutation_epochs - 1:
                 num_tunes_to_keep = find_task.num_tunes_to_keep_after_mutation_epoch
             else:
                 num_tunes_to_keep = find_task.num_tunes_to_find
 
-            best_tune_evaluations = self._get_best_evaluations(mutation_results, find_task.reducer,
-                                                               num_tunes_to_keep)
-
-            best_blueprints = [x.blueprint for x in best_tune_evaluations]
-
-        return [_generate_tune_by_blueprint(bp, find_task.generator, find_task.mutator, find_task.postprocessor) for bp
-                in best_blueprints]
-
-    def _run_tasks(self, find_task: FindTunesTask, processing_function: callable, tasks: List,
-                   progress_reporting_function: ProgressReportingFunction, phase_name: str) -> List:
-
-        results: List = []
-
-        progress_reporting_memory = {}
-
-        def register_result(result):
-            results.append(result)
-            progress_reporting_function(phase_name, len(results), len(tasks), result, results,
-                                        progress_reporting_memory)
-
-        if find_task.parallelize:
-            with Pool(self._get_pool_size()) as p:
-                for task in tasks:
-                    p.apply_async(processing_function, (task,), callback=register_result)
-                p.close()
-                p.join()
-        else:
-            for task in tasks:
-                result = processing_function(task)
-                results.append(result)
-                progress_reporting_function(phase_name, len(results), len(tasks), result, results,
-                                            progress_reporting_memory)
-
-        return self._merge_async_results(results)
-
-    def _get_best_evaluations(self, evaluations: List[TuneEvaluationResult],
-                              reducer: EvaluationReducerInterface,
-                              how_many: int) -> List[TuneEvaluationResult]:
-
-        def overall_score_calculator(x: TuneEvaluationResult) -> float:
-            return reducer.reduce(x)
-
-        evaluations.sort(key=overall_score_calculator, reverse=True)
-        return evaluations[0:how_many]
-
-    def _generate_random_search_tasks(self, num_iterations: int, base_seed_str: str, generator: TuneGeneratorInterface,
-                                      evaluator: TuneEvaluatorInterface, postprocessor: TuneProcessorInterface,
-                                      chunk_size: int) -> List[GenerationSearchTask]:
-        cursor = 0
-        tasks = []
-        while cursor < num_iterations:
-            task = GenerationSearchTask(
-                start_idx=cursor,
-                end_idx=min(cursor + chunk_size, num_iterations),
-                generator=generator,
-                evaluator=evaluator,
-                base_seed_str=base_seed_str,
-                postprocessor=postprocessor
-            )
-            tasks.append(task)
-            cursor += chunk_size
-
-        return tasks
-
-    def _generate_mutation_search_tasks(self, num_iterations, best_tunes_blueprints: List[TuneBlueprint],
-                                        base_mutation_seed_str: str,
-                                        generator: TuneGeneratorInterface, mutator: TuneMutatorInterface,
-                                        evaluator: TuneEvaluatorInterface,
-                                        postprocessor: TuneProcessorInterface,
-                                        chunk_size: int) -> List[MutationSearchTask]:
-        cursor = 0
-        tasks = []
-        while cursor < num_iterations:
-            task = MutationSearchTask(
-                start_idx=cursor,
-                end_idx=min(cursor + chunk_size, num_iterations),
-                generator=generator,
-                evaluator=evaluator,
-                mutator=mutator,
-                initial_tunes_blueprints=best_tunes_blueprints,
-                base_mutation_seed_str=base_mutation_seed_str,
-                postprocessor=postprocessor
+            collector = TopKCollector(num_tunes_to_keep, find_task.reducer)
+            self._run_tasks(
+                processing_function=_handle_mutation_search_task,
+                scheduler=scheduler,
+                progress_reporting_function=progress_reporting_function,
+                phase_name="mutation",
+                num_iterations=find_task.num_mutation_iterations_in_epoch,
+                collector=collector,
+                phase_metrics=phase_metrics
             )
-            tasks.append(task)
-            cursor += chunk_size
 
-        return tasks
+            num_evaluations += find_task.num_mutation_iterations_in_epoch
+            with phase_metrics.parent.measure('checkpointing'):
+                checkpoint = self._create_checkpoint(find_task, epoch + 1, collector, base_seeds, num_evaluations,
+                                                     snapshots)
+                self._save_checkpoint(find_task, checkpoint)
+            best_blueprints = [evaluation.blueprint for evaluation in collector.get_best()]
+            best_aspect_values = checkpoint.aspect_values
+
+            self._finish_phase_metrics(find_task, phase_metrics, phase_start_time)
+            snapshot = create_snapshot('mutation', epoch, checkpoint, phase_metrics)
+
+            yield snapshot
+            if snapshot.is_final:
+                return
+
+    def _run_tasks(self, processing_function: callable, scheduler: ChunkSchedulerInterface,
+                   progress_reporting_function: ProgressReportingFunction, phase_name: str, num_iterations: int,
+                   collector: TopKCollector, phase_metrics: PhaseMetrics):
+        """
+        runs the tasks of a phase feeding their results to the collector.
+
+        :param num_iterations: of the whole phase, for progress reporting
+
+        A few tasks per worker are kept in flight, new ones are taken from the scheduler
+        as soon as others complete, so that it can size them by how long the previous ones took.
+        """
+
+        num_iterations_done = 0
+        parent_metrics = phase_metrics.parent
+        seconds_in_callbacks = 0.0
+
+        def register_result(task, result: SearchTaskResult):
+            nonlocal num_iterations_done, seconds_in_callbacks
+            callback_start_time = time.perf_counter()
+            iterations = task.get_iterations()
+            num_iterations_done += len(iterations)
+            phase_metrics.worker.merge(result.metrics)
+            scheduler.register_completion(task, result.metrics.seconds['task'])
+
+            with parent_metrics.measure('selection'):
+                # iteration numbers are unique within a phase and do not depend
+                # on the order tasks complete in, which makes selection deterministic
+                collector.add_batch(result.evaluations, order_keys=iterations)
+
+            with parent_metrics.measure('progress_reporting'):
+                progress_reporting_function(phase_name, num_iterations_done, num_iterations, result.evaluations,
+                                            collector)
+
+            seconds_in_callbacks += time.perf_counter() - callback_start_time
+
+        # results and errors are delivered here from pool or coordinator threads
+        completions: queue.Queue = queue.Queue()
+
+        def submit(task):
+            if self._coordinator is not None:
+                self._coordinator.submit(processing_function, task,
+                                         callback=lambda result: completions.put((task, result, None)),
+                                         error_callback=lambda error: completions.put((task, None, error)))
+            elif self._pool is not None:
+                self._pool.apply_async(processing_function, (task,),
+                                       callback=lambda result: completions.put((task, result, None)),
+                                       error_callback=lambda error: completions.put((task, None, error)))
+            else:
+                completions.put((task, processing_function(task), None))
+
+        max_num_tasks_in_flight = 2 * self._get_num_workers()
+        num_tasks_in_flight = 0
+        start_time = time.perf_counter()
+
+        while True:
+            while num_tasks_in_flight < max_num_tasks_in_flight:
+                with parent_metrics.measure('task_preparation'):
+                    task = scheduler.next_task()
+                if task is None:
+                    break
+                phase_metrics.num_tasks += 1
+                num_tasks_in_flight += 1
+                submit(task)
+
+            if num_tasks_in_flight == 0:
+                break
+
+            task, result, error = completions.get()
+            num_tasks_in_flight -= 1
+            if error is not None:
+                raise error
+
+            register_result(task, result)
+
+        # includes running the tasks in this very process for non-parallel runs
+        parent_metrics.add_time('waiting', time.perf_counter() - start_time - seconds_in_callbacks)
+
+    def _create_chunk_scheduler(self, find_task: FindTunesTask, create_task: TaskFactory,
+                                num_units: int, iterations_per_unit: int = 1) -> ChunkSchedulerInterface:
+        """
+        :param num_units: what the scheduler cuts into tasks, iterations or anything a task can cover a range of
+        :param iterations_per_unit: to translate chunk sizes of the find task, which are in iterations
+        """
+        def to_units(num_iterations: int) -> int:
+            return max(1, round(num_iterations / max(1, iterations_per_unit)))
+
+        if not find_task.adaptive_chunking:
+            return FixedChunkScheduler(create_task, num_units, to_units(find_task.chunk_size))
+
+        return AdaptiveChunkScheduler(
+            create_task=create_task,
+            num_iterations=num_units,
+            num_workers=self._get_num_workers(),
+            target_chunk_seconds=find_task.target_chunk_seconds,
+            min_chunk_size=to_units(find_task.min_chunk_size),
+            max_chunk_size=to_units(find_task.chunk_size)
+        )
 
-    def _merge_async_results(self, results: List[List[TuneEvaluationResult]]) -> List[TuneEvaluationResult]:
-        return [val for sublist in results for val in sublist]
+    def _get_num_workers(self) -> int:
+        if self._coordinator is not None:
+            return max(1, self._coordinator.num_workers)
+        if self._pool is not None:
+            return self._pool_size
+        return 1
+
+    def _finish_phase_metrics(self, find_task: FindTunesTask, phase_metrics: PhaseMetrics, phase_start_time: float):
+        phase_metrics.wall_seconds = time.perf_counter() - phase_start_time
+        self._metrics.phases.append(phase_metrics)
+
+        if find_task.metrics_path is not None:
+            self._write_atomically(find_task.metrics_path, json.dumps(self._metrics.to_dict(), indent=2))
+        if find_task.prometheus_metrics_path is not None:
+            self._write_atomically(find_task.prometheus_metrics_path, self._metrics.to_prometheus())
+
+    def _get_checkpointed_task_parameters(self, find_task: FindTunesTask) -> Dict:
+        """
+        parameters a checkpoint is only valid for
+        """
+        plugins = [find_task.generator, find_task.evaluator, find_task.postprocessor, find_task.reducer,
+                   find_task.mutator]
+
+        return {
+            'base_seed': find_task.base_seed,
+            'num_generation_iterations': find_task.num_generation_iterations,
+            'num_mutation_epochs': find_task.num_mutation_epochs,
+            'num_tunes_to_keep_from_generation': find_task.num_tunes_to_keep_from_generation,
+            'num_tunes_to_keep_after_mutation_epoch': find_task.num_tunes_to_keep_after_mutation_epoch,
+            'num_mutation_iterations_in_epoch': find_task.num_mutation_iterations_in_epoch,
+            'num_tunes_to_find': find_task.num_tunes_to_find,
+            'plugins': [type(x).__module__ + '.' + type(x).__qualname__ for x in plugins]
+        }
+
+    def _create_checkpoint(self, find_task: FindTunesTask, next_epoch: int, collector: TopKCollector,
+                           base_seeds: BaseSeedTable, num_evaluations: int,
+                           previous_snapshots: List[SearchSnapshot]) -> SearchCheckpoint:
+        best_with_scores = collector.get_best_with_scores()
+        aspects = find_task.evaluator.get_aspects()
+        return SearchCheckpoint(
+            task_parameters=self._get_checkpointed_task_parameters(find_task),
+            next_epoch=next_epoch,
+            blueprints=[evaluation.blueprint.expand(base_seeds) for _, evaluation in best_with_scores],
+            scores=[score for score, _ in best_with_scores],
+            aspect_values=[[evaluation.get_aspect_value(aspect) for aspect in aspects]
+                           for _, evaluation in best_with_scores],
+            num_evaluations=num_evaluations,
+            previous_best_scores=[s.scores[0] if s.scores else None for s in previous_snapshots]
+        )
 
-    def _get_pool_size(self) -> int:
-        # make it dependent on the number of available CPU cores
-        return 4
+    def _restore_previous_snapshots(self, find_task: FindTunesTask,
+                                    checkpoint: SearchCheckpoint) -> List[SearchSnapshot]:
+        """
+        snapshots of the phases before a checkpoint as far as it knows them: their best scores only
+        """
+        res = []
+        for i, best_score in enumerate(checkpoint.previous_best_scores):
+            res.append(SearchSnapshot(
+                phase='random search' if i == 0 else 'mutation',
+                epoch=None if i == 0 else i - 1,
+                blueprints=[],
+                scores=[best_score] if best_score is not None else [],
+                phase_seconds=0.0,
+                elapsed_seconds=0.0,
+                num_evaluations=find_task.num_generation_iterations + i * find_task.num_mutation_iterations_in_epoch,
+                is_final=False
+            ))
+        return res
+
+    def _load_checkpoint(self, find_task: FindTunesTask) -> Optional[SearchCheckpoint]:
+        path = find_task.checkpoint_path
+        if path is None or not os.path.exists(path):
+            return None
+
+        with open(path) as f:
+            checkpoint = SearchCheckpoint.from_dict(json.load(f))
+
+        if checkpoint.task_parameters != self._get_checkpointed_task_parameters(find_task):
+            raise TuneFinderError(f'checkpoint {path} has been made for another task (error: 7c0e92d4)')
+
+        return checkpoint
+
+    def _save_checkpoint(self, find_task: FindTunesTask, checkpoint: SearchCheckpoint):
+        path = find_task.checkpoint_path
+        if path is None:
+            return
+
+        self._write_atomically(path, json.dumps(checkpoint.to_dict()))
+
+    def _write_atomically(self, path: str, content: str):
+        # an interruption while writing must not damage the previous version of the file
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        with os.fdopen(fd, 'w') as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+
+    def _calibrate_evaluator(self, find_task: FindTunesTask):
+        evaluator = find_task.evaluator
+        if not isinstance(evaluator, CalibratingTuneEvaluator) or evaluator.is_calibrated():
+            return
+
+        if not find_task.parallelize or evaluator.get_num_calibration_iterations() <= find_task.chunk_size:
+            evaluator.calibrate()
+            return
+
+        def parallel_map(function: Callable, chunks: List) -> List:
+            # only called when there is no cached calibration
+            with Pool(self._get_pool_size(find_task)) as pool:
+                return pool.map(function, chunks)
+
+        evaluator.calibrate(parallel_map, find_task.chunk_size)
+
+    def _get_worker_context_args(self, find_task: FindTunesTask) -> Tuple:
+        return (find_task.generator, find_task.evaluator, find_task.mutator, find_task.postprocessor,
+                find_task.tune_cache_size, find_task.evaluation_cache_size, find_task.incremental_evaluation,
+                find_task.profile_dir, find_task.trace_memory)
+
+    def _get_pool_size(self, find_task: FindTunesTask) -> int:
+        if find_task.pool_size is not None:
+            return find_task.pool_size
+
+        return get_num_available_cpus()
@@ -1,10 +1,39 @@
+import io
+import struct
+from typing import List, Tuple
+
 from midiutil import MIDIFile
 from adversarial_music_generator.models.timbre import Timbre
+from adversarial_music_generator.models.track import Track
 from adversarial_music_generator.models.tune import Tune
 
+TICKS_PER_QUARTER_NOTE = 960
+
+# secondary sort keys of events happening at the same tick, the same as midiutil uses
+_ORDER_TRACK_NAME = 0
+_ORDER_PROGRAM_CHANGE = 1
+_ORDER_NOTE_OFF = 2
+_ORDER_NOTE_ON = 3
+
+_END_OF_TRACK = b'\x00\xff\x2f\x00'
+
 
 class TuneToMidiConverter:
+    def __init__(self, use_direct_encoder: bool = False):
+        """
+        :param use_direct_encoder: encode files straight from note arrays rather than through midiutil,
+                                   files are byte for byte the same, only made much faster
+        """
+        self._use_direct_encoder: bool = use_direct_encoder
+
     def convert(self, tune: Tune, output_file_path: str):
+        with open(output_file_path, "wb") as output_file:
+            output_file.write(self.to_bytes(tune))
+
+    def to_bytes(self, tune: Tune) -> bytes:
+        if self._use_direct_encoder:
+            return self._encode_directly(tune)
+
         midi_file = MIDIFile(
             numTracks=len(tune.tracks)
         )
@@ -15,13 +44,119 @@ class TuneToMidiConverter:
         for idx, track in enumerate(tune.tracks):
             midi_file.addTrackName(idx, 0.0, 'Track ' + str(idx))
             midi_file.addProgramChange(idx, idx, 0.0, self._generate_program_number(track.timbre))
-            for note in track.notes:
-                start_time_in_quarters = note.start_time_seconds / length_of_quarter_seconds
-                length_in_quarters = (note.end_time_seconds - note.start_time_seconds) / length_of_quarter_seconds
-                midi_file.addNote(idx, idx, note.note, start_time_in_quarters, length_in_quarters, round(note.velocity * 127))
+            for pitch, start, end, velocity in zip(*track.get_columns()):
+                start_time_in_quarters = start / length_of_quarter_seconds
+                length_in_quarters = (end - start) / length_of_quarter_seconds
+                midi_file.addNote(idx, idx, pitch, start_time_in_quarters, length_in_quarters,
+                                  _to_midi_velocity(velocity))
 
-        with open(output_file_path, "wb") as output_file:
-            midi_file.writeFile(output_file)
+        output = io.BytesIO()
+        midi_file.writeFile(output)
+        return output.getvalue()
 
     def _generate_program_number(self, timbre: Timbre) -> int:
         return 42  # cello
+
+    def _encode_directly(self, tune: Tune) -> bytes:
+        """
+        a format 1 standard midi file: a tempo track followed by a track per tune track
+        """
+        chunks = [b'MThd', struct.pack('>LHHH', 6, 1, len(tune.tracks) + 1, TICKS_PER_QUARTER_NOTE)]
+
+        tempo = struct.pack('>L', int(60000000 / tune.bpm))[1:4]
+        chunks.append(_create_track_chunk(b'\x00\xff\x51\x03' + tempo))
+
+        for idx, track in enumerate(tune.tracks):
+            chunks.append(_create_track_chunk(self._encode_track_events(tune, idx, track)))
+
+        return b''.join(chunks)
+
+    def _encode_track_events(self, tune: Tune, idx: int, track: Track) -> bytes:
+        """
+        events of a track, processed the way midiutil does it: same pitch notes starting (or ending)
+        at the same tick are collapsed into one, and a note is cut short by a same pitch note starting
+        before it ends
+        """
+        length_of_quarter_seconds = 60 / tune.bpm
+        pitches, starts, ends, velocities = track.get_columns()
+
+        # (tick, order, note idx, pitch, velocity), note idx being the insertion order
+        events: List[Tuple[int, int, int, int, int]] = [(0, _ORDER_TRACK_NAME, -1, 0, 0),
+                                                        (0, _ORDER_PROGRAM_CHANGE, -1, 0, 0)]
+        seen_note_ons, seen_note_offs = set(), set()
+        for note_idx in range(len(pitches)):
+            pitch, start = pitches[note_idx], starts[note_idx]
+            start_time_in_quarters = start / length_of_quarter_seconds
+            length_in_quarters = (ends[note_idx] - start) / length_of_quarter_seconds
+            tick = int(start_time_in_quarters * TICKS_PER_QUARTER_NOTE)
+            end_tick = tick + int(length_in_quarters * TICKS_PER_QUARTER_NOTE)
+            velocity = _to_midi_velocity(velocities[note_idx])
+
+            # the first of equal events is kept
+            if (tick, pitch) not in seen_note_ons:
+                seen_note_ons.add((tick, pitch))
+                events.append((tick, _ORDER_NOTE_ON, note_idx, pitch, velocity))
+            if (end_tick, pitch) not in seen_note_offs:
+                seen_note_offs.add((end_tick, pitch))
+                events.append((end_tick, _ORDER_NOTE_OFF, note_idx, pitch, velocity))
+
+        events.sort()
+
+        # a note off closing a note that has a later same pitch note sounding over it
+        # is moved to where that later note starts
+        sounding_note_ticks = {}
+        for event_idx, (tick, order, note_idx, pitch, velocity) in enumerate(events):
+            if order not in (_ORDER_NOTE_ON, _ORDER_NOTE_OFF):
+                continue
+            stack = sounding_note_ticks.setdefault(pitch, [])
+            if order == _ORDER_NOTE_ON:
+                stack.append(tick)
+            elif len(stack) > 1:
+                events[event_idx] = (stack.pop(), order, note_idx, pitch, velocity)
+            elif stack:
+                stack.pop()
+
+        events.sort()
+
+        name = ('Track ' + str(idx)).encode('ISO-8859-1')
+        data = bytearray()
+        previous_tick = 0
+        for tick, order, _, pitch, velocity in events:
+            data += bytes(_encode_var_length(tick - previous_tick))
+            if order == _ORDER_NOTE_ON:
+                data += bytes((0x90 | idx, pitch, velocity))
+            elif order == _ORDER_NOTE_OFF:
+                data += bytes((0x80 | idx, pitch, velocity))
+            elif order == _ORDER_TRACK_NAME:
+                data += b'\xff\x03' + bytes(_encode_var_length(len(name))) + name
+            else:
+                data += bytes((0xc0 | idx, self._generate_program_number(track.timbre)))
+            previous_tick = tick
+
+        return bytes(data)
+
+
+def _to_midi_velocity(velocity: float) -> int:
+    # velocities are 0..1, but nothing stops a generator from going beyond that
+    return min(127, max(0, round(velocity * 127)))
+
+
+def _create_track_chunk(events: bytes) -> bytes:
+    return b'MTrk' + struct.pack('>L', len(events) + len(_END_OF_TRACK)) + events + _END_OF_TRACK
+
+
+def _encode_var_length(value: int) -> List[int]:
+    """
+    a midi variable length quantity, 7 bits per byte, the most significant ones first
+    """
+    if value == 0:
+        return [0]
+
+    res = []
+    high_bit = 0x00
+    while value > 0:
+        res.append((value & 0x7f) | high_bit)
+        value >>= 7
+        high_bit = 0x80
+    res.reverse()
+    return res
@@ -0,0 +1,37 @@
+import unittest
+
+from adversarial_music_generator.benchmark.suite import run_suite, compare_with_baseline, BenchmarkResult
+
+
+class BenchmarkTestCase(unittest.TestCase):
+    def test_compare_with_baseline(self):
+        results = [
+            BenchmarkResult(name='fast', items=100, seconds=1.0),
+            BenchmarkResult(name='slow', items=50, seconds=1.0),
+            BenchmarkResult(name='new', items=1, seconds=1.0),
+        ]
+        baseline = {'fast': 110.0, 'slow': 100.0, 'gone': 1.0}
+
+        regressions = compare_with_baseline(results, baseline, tolerance=0.3)
+
+        self.assertEqual(2, len(regressions))
+        self.assertTrue(regressions[0].startswith('slow:'))
+        self.assertEqual('new: 1.0/s, missing from baseline', regressions[1])
+
+    def test_run_suite(self):
+        # searches in this process only, unit tests need no worker pools
+        results = run_suite(scale=0.01, repeat=1, max_workers=0)
+
+        names = [r.name for r in results]
+        self.assertEqual(len(names), len(set(names)))
+        self.assertIn('evaluator.evaluate_tunes', names)
+        self.assertIn('corpus.get_tunes', names)
+        self.assertIn('find_tunes[workers=0,chunk=100]', names)
+        self.assertNotIn('find_tunes[workers=1,chunk=100]', names)
+        for result in results:
+            self.assertGreater(result.items, 0)
+            self.assertGreater(result.items_per_second, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
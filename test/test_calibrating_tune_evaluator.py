@@ -0,0 +1,87 @@
+import tempfile
+import unittest
+from multiprocessing.pool import Pool
+from typing import List
+
+from adversarial_music_generator.calibrating_tune_evaluator import CalibratingTuneEvaluator
+from adversarial_music_generator.demo.naive_random.naive_random_generator import NaiveRandomGenerator
+from adversarial_music_generator.fast_seed import FastSeed
+from adversarial_music_generator.interfaces import TuneGeneratorInterface
+from adversarial_music_generator.models.tune import Tune
+from adversarial_music_generator.models.tune_evaluation_result import TuneEvaluationResult
+
+
+class NumNotesEvaluator(CalibratingTuneEvaluator):
+    ASPECT_NUM_NOTES = 'num_notes'
+
+    def __init__(self, calibration_cache_dir: str = None, generator: TuneGeneratorInterface = None):
+        super().__init__(generator or NaiveRandomGenerator(), 'calibration', 30, calibration_cache_dir)
+        self.num_evaluated_tunes = 0
+
+    def get_aspects(self) -> List[str]:
+        return [self.ASPECT_NUM_NOTES]
+
+    def _evaluate_one_tune_without_normalization(self, tune: Tune) -> TuneEvaluationResult:
+        self.num_evaluated_tunes += 1
+        res = TuneEvaluationResult()
+        res.set_aspect_value(self.ASPECT_NUM_NOTES, float(tune.num_notes))
+        return res
+
+
+class CalibratingTuneEvaluatorTestCase(unittest.TestCase):
+    def test_calibrates_once(self):
+        evaluator = NumNotesEvaluator()
+        tunes = NaiveRandomGenerator().generate_tunes('x', ['a', 'b'])
+
+        evaluator.evaluate_tunes(tunes)
+        evaluator.evaluate_tunes(tunes)
+
+        self.assertTrue(evaluator.is_calibrated())
+        self.assertEqual(30 + 2 + 2, evaluator.num_evaluated_tunes)
+
+    def test_chunked_parallel_calibration_is_the_same(self):
+        serial = NumNotesEvaluator()
+        serial.calibrate()
+
+        parallel = NumNotesEvaluator()
+        with Pool(2) as pool:
+            parallel.calibrate(pool.map, 7)
+
+        self.assertEqual(serial.get_calibration(), parallel.get_calibration())
+
+    def test_calibration_is_shipped_and_cached(self):
+        with tempfile.TemporaryDirectory() as cache_dir:
+            first = NumNotesEvaluator(cache_dir)
+            first.calibrate()
+
+            second = NumNotesEvaluator(cache_dir)
+            second.calibrate()
+
+            shipped = NumNotesEvaluator()
+            shipped.set_calibration(first.get_calibration())
+
+        self.assertEqual(30, first.num_evaluated_tunes)
+        self.assertEqual(0, second.num_evaluated_tunes)
+        self.assertEqual(first.get_calibration(), second.get_calibration())
+
+        tunes = NaiveRandomGenerator().generate_tunes('x', ['a', 'b'])
+        self.assertEqual([x.get_aspect_value('num_notes') for x in first.evaluate_tunes(tunes)],
+                         [x.get_aspect_value('num_notes') for x in shipped.evaluate_tunes(tunes)])
+        self.assertEqual(2, shipped.num_evaluated_tunes)
+
+    def test_calibrations_are_cached_by_configuration(self):
+        class NewNumNotesEvaluator(NumNotesEvaluator):
+            def get_calibration_cache_key(self) -> str:
+                return super().get_calibration_cache_key() + '/2'
+
+        with tempfile.TemporaryDirectory() as cache_dir:
+            evaluators = [NumNotesEvaluator(cache_dir), NumNotesEvaluator(cache_dir, NaiveRandomGenerator(FastSeed)),
+                          NewNumNotesEvaluator(cache_dir)]
+            for evaluator in evaluators:
+                evaluator.calibrate()
+
+        self.assertEqual([30, 30, 30], [evaluator.num_evaluated_tunes for evaluator in evaluators])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,53 @@
+import unittest
+from typing import List, Tuple
+
+from adversarial_music_generator.chunk_scheduler import FixedChunkScheduler, AdaptiveChunkScheduler, \
+    ChunkSchedulerInterface
+from adversarial_music_generator.tune_finder import GenerationSearchTask
+
+
+def _create_task(start_idx: int, end_idx: int) -> GenerationSearchTask:
+    return GenerationSearchTask(base_seed_str='a', start_idx=start_idx, end_idx=end_idx)
+
+
+def _take_all(scheduler: ChunkSchedulerInterface, seconds_per_iteration: float) -> List[Tuple[int, int]]:
+    ranges = []
+    while True:
+        task = scheduler.next_task()
+        if task is None:
+            return ranges
+        ranges.append((task.start_idx, task.end_idx))
+        scheduler.register_completion(task, seconds_per_iteration * (task.end_idx - task.start_idx))
+
+
+class ChunkSchedulerTestCase(unittest.TestCase):
+    def test_fixed(self):
+        ranges = _take_all(FixedChunkScheduler(_create_task, 25, 10), 0.01)
+        self.assertEqual([(0, 10), (10, 20), (20, 25)], ranges)
+
+    def test_adaptive_covers_all_iterations_once(self):
+        scheduler = AdaptiveChunkScheduler(_create_task, num_iterations=10000, num_workers=4,
+                                           target_chunk_seconds=1.0, min_chunk_size=20, max_chunk_size=1000)
+        ranges = _take_all(scheduler, 0.005)
+
+        self.assertEqual(0, ranges[0][0])
+        self.assertEqual(10000, ranges[-1][1])
+        for (_, end_idx), (next_start_idx, _) in zip(ranges, ranges[1:]):
+            self.assertEqual(end_idx, next_start_idx)
+
+        sizes = [end_idx - start_idx for start_idx, end_idx in ranges]
+        # starts small, grows to a second's worth of iterations, shrinks towards the end
+        self.assertEqual(20, sizes[0])
+        self.assertEqual(200, max(sizes))
+        self.assertLess(sizes[-2], 200)
+
+    def test_adaptive_respects_max_chunk_size(self):
+        scheduler = AdaptiveChunkScheduler(_create_task, num_iterations=100000, num_workers=1,
+                                           target_chunk_seconds=1.0, min_chunk_size=20, max_chunk_size=500)
+        sizes = [end_idx - start_idx for start_idx, end_idx in _take_all(scheduler, 0.0)]
+
+        self.assertEqual(500, max(sizes))
+
+
+if __name__ == '__main__':
+    unittest.main()
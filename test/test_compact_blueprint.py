@@ -0,0 +1,87 @@
+import pickle
+import unittest
+from copy import deepcopy
+
+from parameterized import parameterized
+
+from adversarial_music_generator.interfaces import TuneMutatorInterface
+from adversarial_music_generator.models.compact_blueprint import CompactBlueprint, BaseSeedTable, BlueprintError, \
+    pack_blueprints, unpack_blueprints
+from adversarial_music_generator.models.tune_blueprint import TuneBlueprint
+
+
+class CompactBlueprintTestCase(unittest.TestCase):
+    def test_expands_to_search_seeds(self):
+        base_seeds = BaseSeedTable()
+        blueprint = CompactBlueprint(base_seeds.intern('whatever'), 2) \
+            .mutate(0, CompactBlueprint.TRANSPARENT_INDEX) \
+            .mutate(17, 3951)
+
+        self.assertEqual(TuneBlueprint(base_seed='whatever', tune_seed='whatever2',
+                                       mutation_seeds=[TuneMutatorInterface.SPECIAL_SEED_STR_TO_LEAVE_TUNE_UNMUTATED,
+                                                       'whatever_mutation_epoch_17_3951']),
+                         blueprint.expand(base_seeds))
+        self.assertEqual(blueprint, CompactBlueprint.from_blueprint(blueprint.expand(base_seeds), base_seeds))
+
+    def test_children_share_parent_mutations(self):
+        parent = CompactBlueprint(0, 1).mutate(0, 5).mutate(1, 7)
+        child = parent.mutate(2, 9)
+
+        self.assertIs(parent.steps, child.steps[0])
+        self.assertEqual(3, child.num_mutations)
+        self.assertEqual([(0, 5), (1, 7), (2, 9)], child.get_steps())
+        self.assertEqual(parent, child.get_prefix(2))
+        self.assertEqual(CompactBlueprint(0, 1), child.get_prefix(0))
+        self.assertEqual(hash(parent), hash(child.get_prefix(2)))
+
+    def test_pickles_smaller_than_strings(self):
+        base_seeds = BaseSeedTable(['whatever'])
+        parents = [CompactBlueprint(0, i) for i in range(10)]
+        for epoch in range(20):
+            parents = [parents[i % 10].mutate(epoch, i) for i in range(100)]
+
+        compact_size = len(pickle.dumps(parents))
+        expanded_size = len(pickle.dumps([blueprint.expand(base_seeds) for blueprint in parents]))
+
+        self.assertLess(compact_size * 4, expanded_size)
+        self.assertEqual(parents, pickle.loads(pickle.dumps(parents)))
+        self.assertEqual('whatever', deepcopy(base_seeds)[0])
+
+    def test_long_lineages_pickle_and_compare(self):
+        blueprint = CompactBlueprint(0, 1)
+        for epoch in range(5000):
+            blueprint = blueprint.mutate(epoch, epoch % 2 * CompactBlueprint.TRANSPARENT_INDEX)
+
+        restored = pickle.loads(pickle.dumps(blueprint))
+
+        self.assertEqual(blueprint, restored)
+        self.assertEqual(hash(blueprint), hash(restored))
+        self.assertEqual(blueprint.get_steps(), restored.get_steps())
+        self.assertNotEqual(blueprint, restored.get_prefix(4999).mutate(4999, 1))
+        self.assertEqual(blueprint, deepcopy(blueprint))
+
+    def test_packing_stores_shared_mutations_once(self):
+        parents = [CompactBlueprint(0, i) for i in range(3)]
+        for epoch in range(2000):
+            parents = [parents[i % 3].mutate(epoch, i) for i in range(3)]
+        blueprints = [parents[i % 3].mutate(2000, i) for i in range(30)] + [None, CompactBlueprint(1, 7)]
+
+        steps, rows = pack_blueprints(blueprints)
+        unpacked = unpack_blueprints(pickle.loads(pickle.dumps((steps, rows))))
+
+        self.assertEqual(3 * (3 * 2000 + 30), len(steps))
+        self.assertEqual(blueprints, unpacked)
+        self.assertEqual([hash(x) for x in blueprints], [hash(x) for x in unpacked])
+        self.assertEqual(2001, unpacked[0].num_mutations)
+        self.assertIs(unpacked[0].steps[0], unpacked[3].steps[0])
+
+    @parameterized.expand([
+        ('foreign_tune_seed', TuneBlueprint(base_seed='a', tune_seed='b1', mutation_seeds=[])),
+        ('padded_tune_seed', TuneBlueprint(base_seed='a', tune_seed='a01', mutation_seeds=[])),
+        ('foreign_mutation_seed', TuneBlueprint(base_seed='a', tune_seed='a1', mutation_seeds=['m1'])),
+        ('incomplete_mutation_seed', TuneBlueprint(base_seed='a', tune_seed='a1',
+                                                   mutation_seeds=['a_mutation_epoch_1'])),
+    ])
+    def test_only_search_seeds_can_be_made_compact(self, _, blueprint: TuneBlueprint):
+        with self.assertRaises(BlueprintError):
+            CompactBlueprint.from_blueprint(blueprint, BaseSeedTable())
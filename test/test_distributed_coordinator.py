@@ -0,0 +1,72 @@
+import threading
+import unittest
+from multiprocessing.connection import Client
+
+from adversarial_music_generator.distributed.coordinator import DistributedCoordinator, DistributedExecutionError
+from adversarial_music_generator.distributed.worker import run_worker
+
+AUTHKEY = b'whatever'
+
+
+def double(x: int) -> int:
+    return 2 * x
+
+
+class DistributedCoordinatorTestCase(unittest.TestCase):
+    def setUp(self):
+        self._coordinator = DistributedCoordinator(('127.0.0.1', 0), AUTHKEY)
+
+    def tearDown(self):
+        self._coordinator.shutdown()
+
+    def _start_worker(self) -> threading.Thread:
+        worker = threading.Thread(target=run_worker, args=(self._coordinator.address, AUTHKEY), daemon=True)
+        worker.start()
+        self.assertTrue(self._coordinator.wait_for_workers(1, timeout=30))
+        return worker
+
+    def test_run_tasks(self):
+        self._start_worker()
+        results = {}
+
+        self._coordinator.run_tasks(double, [1, 2, 3], lambda task, result: results.update({task: result}))
+
+        self.assertEqual({1: 2, 2: 4, 3: 6}, results)
+
+    def test_unpicklable_task_fails_its_job_only(self):
+        self._start_worker()
+
+        with self.assertRaises(DistributedExecutionError):
+            self._coordinator.run_tasks(double, [lambda: None], lambda task, result: None)
+
+        results = []
+        self._coordinator.run_tasks(double, [5], lambda task, result: results.append(result))
+        self.assertEqual([10], results)
+
+    def test_failing_callback_fails_the_job(self):
+        self._start_worker()
+
+        def callback(task, result):
+            raise ValueError('whatever')
+
+        with self.assertRaises(DistributedExecutionError):
+            self._coordinator.run_tasks(double, [1, 2], callback)
+
+        self.assertEqual(1, self._coordinator.num_workers)
+
+    def test_tasks_fail_when_the_last_worker_disconnects(self):
+        errors = []
+        failed = threading.Event()
+
+        def error_callback(error: Exception):
+            errors.append(error)
+            failed.set()
+
+        # a worker taking a task and going away without running it
+        connection = Client(self._coordinator.address, authkey=AUTHKEY)
+        self._coordinator.submit(double, 1, callback=lambda result: None, error_callback=error_callback)
+        connection.recv()
+        connection.close()
+
+        self.assertTrue(failed.wait(timeout=30))
+        self.assertIsInstance(errors[0], DistributedExecutionError)
@@ -0,0 +1,61 @@
+import pickle
+import unittest
+
+from adversarial_music_generator.models.evaluation_batch import EvaluationBatch
+from adversarial_music_generator.models.tune_blueprint import TuneBlueprint
+from adversarial_music_generator.models.tune_evaluation_result import TuneEvaluationResult, TuneEvaluationError
+
+
+class EvaluationBatchTestCase(unittest.TestCase):
+    ASPECTS = ['harmony', 'content']
+
+    def test_rows_are_available_as_views_and_copies(self):
+        results = self._create_results()
+        batch = EvaluationBatch.from_results(self.ASPECTS, results)
+
+        self.assertEqual(3, len(batch))
+        for row, result in enumerate(results):
+            view = batch.get_view(row)
+            copy = batch.get_result(row)
+            for aspect in self.ASPECTS:
+                self.assertEqual(result.get_aspect_value(aspect), view.get_aspect_value(aspect))
+                self.assertEqual(result.get_aspect_value(aspect), copy.get_aspect_value(aspect))
+            self.assertEqual(result.blueprint, view.blueprint)
+            self.assertEqual(result.blueprint, copy.blueprint)
+            self.assertEqual(self.ASPECTS, list(view))
+
+        batch.get_view(1).set_aspect_value('content', 42.0)
+        self.assertEqual(42.0, batch.get_aspect_value(1, 'content'))
+
+        with self.assertRaises(TuneEvaluationError):
+            batch.get_view(0).get_aspect_value('rhythmicality')
+
+    def test_pickling_keeps_everything(self):
+        batch = EvaluationBatch.from_results(self.ASPECTS, self._create_results())
+
+        restored = pickle.loads(pickle.dumps(batch))
+
+        self.assertEqual(batch.aspects, restored.aspects)
+        self.assertEqual(batch.values, restored.values)
+        self.assertEqual(batch.blueprints, restored.blueprints)
+
+    def _create_results(self):
+        blueprints = [
+            TuneBlueprint(base_seed='a', tune_seed='a1', mutation_seeds=[]),
+            TuneBlueprint(base_seed='a', tune_seed='a2', mutation_seeds=['m1', 'm2']),
+            None
+        ]
+
+        results = []
+        for i, blueprint in enumerate(blueprints):
+            result = TuneEvaluationResult()
+            result.set_aspect_value('harmony', i * 0.5)
+            result.set_aspect_value('content', -float(i))
+            result.blueprint = blueprint
+            results.append(result)
+
+        return results
+
+
+if __name__ == '__main__':
+    unittest.main()
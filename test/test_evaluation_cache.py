@@ -0,0 +1,41 @@
+import unittest
+
+from adversarial_music_generator.demo.naive_random.naive_random_generator import NaiveRandomGenerator
+from adversarial_music_generator.demo.naive_random.naive_random_mutator import NaiveRandomMutator
+from adversarial_music_generator.evaluation_cache import EvaluationCache
+from adversarial_music_generator.interfaces import TuneMutatorInterface
+
+
+class EvaluationCacheTestCase(unittest.TestCase):
+    def test_least_recently_used_evaluation_is_evicted(self):
+        cache = EvaluationCache(2)
+
+        cache.put(b'a', (1.0,))
+        cache.put(b'b', (2.0,))
+        self.assertEqual((1.0,), cache.get(b'a'))
+        cache.put(b'c', (3.0,))
+
+        self.assertEqual(2, len(cache))
+        self.assertIsNone(cache.get(b'b'))
+        self.assertEqual((1.0,), cache.get(b'a'))
+        self.assertEqual(2, cache.num_hits)
+        self.assertEqual(1, cache.num_misses)
+
+    def test_content_hash(self):
+        tune = NaiveRandomGenerator().generate_tunes('base', ['1'])[0]
+        mutator = NaiveRandomMutator()
+
+        clone = tune.clone()
+        mutator.mutate_tune(clone, TuneMutatorInterface.SPECIAL_SEED_STR_TO_LEAVE_TUNE_UNMUTATED)
+        self.assertEqual(tune.content_hash(), clone.content_hash())
+
+        mutator.mutate_tune(clone, 'mutation')
+        self.assertNotEqual(tune.content_hash(), clone.content_hash())
+
+        clone = tune.clone()
+        clone.tracks[0].tags['something'] = 1
+        self.assertNotEqual(tune.content_hash(), clone.content_hash())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -3,7 +3,10 @@ import pyximport
 from parameterized import parameterized
 
 pyximport.install()
-from adversarial_music_generator.evaluation_lib.harmony import calculate_disharmony  # noqa E402
+from adversarial_music_generator.evaluation_lib.harmony import calculate_disharmony, calculate_disharmony_sweep, \
+    calculate_disharmony_batch, calculate_disharmony_sweep_fixed, calculate_touched_disharmony_fixed  # noqa E402
+
+from random import Random  # noqa E402
 
 from array import array  # noqa E402
 
@@ -20,3 +23,74 @@ class TuneFinderTestCase(unittest.TestCase):
     def test_something(self, starts: array, ends: array, pitches: array, expected_result: float):
         res = calculate_disharmony(starts, ends, pitches)
         self.assertEqual(expected_result, res)
+
+        self.assertEqual(expected_result, calculate_disharmony_sweep(starts, ends, pitches))
+
+    @parameterized.expand([(0,), (1,), (7,), (100,), (500,)])
+    def test_sweep_matches_quadratic_kernel(self, num_notes: int):
+        rnd = Random(num_notes)
+        starts = [rnd.uniform(0.0, 30.0) for _ in range(num_notes)]
+        ends = [start + rnd.uniform(0.1, 1.0) for start in starts]
+        pitches = array('i', [rnd.randint(40, 90) for _ in range(num_notes)])
+
+        expected = calculate_disharmony(array('f', starts), array('f', ends), pitches)
+        res = calculate_disharmony_sweep(array('d', starts), array('d', ends), pitches)
+
+        # the quadratic kernel accumulates in single precision, hence the tolerance
+        self.assertAlmostEqual(expected, res, delta=1e-5 * max(1.0, expected))
+        self.assertEqual(res, calculate_disharmony_sweep(array('f', starts), array('f', ends), pitches))
+
+    def test_batch_matches_one_tune_at_a_time(self):
+        rnd = Random(42)
+        starts, ends, pitches = array('d'), array('d'), array('i')
+        offsets = array('q', [0])
+        expected = []
+
+        for num_notes in [3, 0, 50, 1, 120]:
+            tune_starts = array('d', [rnd.uniform(0.0, 10.0) for _ in range(num_notes)])
+            tune_ends = array('d', [start + rnd.uniform(0.1, 1.0) for start in tune_starts])
+            tune_pitches = array('i', [rnd.randint(40, 90) for _ in range(num_notes)])
+            expected.append(calculate_disharmony_sweep(tune_starts, tune_ends, tune_pitches))
+
+            starts += tune_starts
+            ends += tune_ends
+            pitches += tune_pitches
+            offsets.append(len(pitches))
+
+        res = calculate_disharmony_batch(starts, ends, pitches, offsets)
+
+        self.assertEqual(expected, list(res))
+        self.assertEqual([], list(calculate_disharmony_batch(starts, ends, pitches, array('q', [0]))))
+
+    @parameterized.expand([(1,), (2,), (30,), (200,)])
+    def test_touched_disharmony_updates_sweep_exactly(self, num_notes: int):
+        rnd = Random(num_notes)
+        starts = array('d', [rnd.uniform(0.0, num_notes / 10.0) for _ in range(num_notes)])
+        ends = array('d', [start + rnd.uniform(0.1, 1.0) for start in starts])
+        pitches = array('i', [rnd.randint(40, 90) for _ in range(num_notes)])
+        touched = array('i', sorted(rnd.sample(range(num_notes), max(1, num_notes // 10))))
+
+        self.assertEqual(calculate_disharmony_sweep_fixed(starts, ends, pitches),
+                         calculate_touched_disharmony_fixed(starts, ends, pitches, array('i', range(num_notes))))
+
+        changed_pitches = array('i', pitches)
+        for i in touched:
+            changed_pitches[i] += rnd.randint(-6, 5)
+
+        updated = calculate_disharmony_sweep_fixed(starts, ends, pitches) \
+            - calculate_touched_disharmony_fixed(starts, ends, pitches, touched) \
+            + calculate_touched_disharmony_fixed(starts, ends, changed_pitches, touched)
+
+        self.assertEqual(calculate_disharmony_sweep_fixed(starts, ends, changed_pitches), updated)
+
+    def test_touched_disharmony_checks_positions(self):
+        starts, ends, pitches = array('d', [0.0, 0.5, 1.0]), array('d', [1.0, 1.5, 2.0]), array('i', [60, 61, 66])
+
+        # repeated positions count once
+        self.assertEqual(calculate_touched_disharmony_fixed(starts, ends, pitches, array('i', [0, 2])),
+                         calculate_touched_disharmony_fixed(starts, ends, pitches, array('i', [2, 0, 2, 0])))
+        for position in [-1, 3]:
+            with self.assertRaises(IndexError):
+                calculate_touched_disharmony_fixed(starts, ends, pitches, array('i', [0, position]))
+        with self.assertRaises(IndexError):
+            calculate_touched_disharmony_fixed(array('d'), array('d'), array('i'), array('i', [0]))
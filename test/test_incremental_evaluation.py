@@ -0,0 +1,75 @@
+import contextlib
+import io
+import unittest
+
+from parameterized import parameterized
+
+from adversarial_music_generator.demo.naive_random.donothing_postprocessor import DoNothingPostprocessor
+from adversarial_music_generator.demo.naive_random.naive_random_evaluator import NaiveRandomEvaluator
+from adversarial_music_generator.demo.naive_random.naive_random_generator import NaiveRandomGenerator
+from adversarial_music_generator.demo.naive_random.naive_random_mutator import NaiveRandomMutator
+from adversarial_music_generator.demo.naive_random.naive_random_reducer import NaiveRandomReducer
+from adversarial_music_generator.find_tunes_task import FindTunesTask
+from adversarial_music_generator.interfaces import TuneMutatorInterface
+from adversarial_music_generator.tune_finder import TuneFinder
+
+
+class IncrementalEvaluationTestCase(unittest.TestCase):
+    def test_mutated_tunes_are_evaluated_exactly_as_from_scratch(self):
+        generator, mutator = NaiveRandomGenerator(), NaiveRandomMutator()
+        evaluator = NaiveRandomEvaluator(generator, 'calibration', num_calibration_iterations=10)
+        evaluator.calibrate()
+
+        parents = generator.generate_tunes('base', [str(i) for i in range(10)])
+        parent_states = evaluator.get_evaluation_states(parents)
+
+        tunes, deltas = [], []
+        for i in range(100):
+            tune = parents[i % 10].clone()
+            seed = 'mutation' + str(i) if i % 7 else TuneMutatorInterface.SPECIAL_SEED_STR_TO_LEAVE_TUNE_UNMUTATED
+            deltas.append(mutator.mutate_tune_with_delta(tune, seed))
+            tunes.append(tune)
+
+        expected = evaluator.evaluate_tunes(tunes)
+        res = evaluator.evaluate_mutated_tunes([parents[i % 10] for i in range(100)],
+                                               [parent_states[i % 10] for i in range(100)], tunes, deltas)
+
+        aspects = evaluator.get_aspects()
+        self.assertEqual([[e.get_aspect_value(a) for a in aspects] for e in expected],
+                         [[r.get_aspect_value(a) for a in aspects] for r in res])
+
+    @parameterized.expand([(True,), (False,)])
+    def test_finder_gives_the_same_tunes(self, parallelize: bool):
+        def find(incremental_evaluation: bool):
+            generator = NaiveRandomGenerator()
+            task = FindTunesTask(
+                generator=generator,
+                evaluator=NaiveRandomEvaluator(generator, 'calibration', num_calibration_iterations=10),
+                reducer=NaiveRandomReducer(),
+                mutator=NaiveRandomMutator(),
+                postprocessor=DoNothingPostprocessor(),
+                num_generation_iterations=40,
+                num_mutation_iterations_in_epoch=60,
+                num_mutation_epochs=3,
+                num_tunes_to_keep_from_generation=5,
+                num_tunes_to_keep_after_mutation_epoch=5,
+                base_seed='base',
+                num_tunes_to_find=3,
+                parallelize=parallelize,
+                chunk_size=25,
+                incremental_evaluation=incremental_evaluation
+            )
+            tune_finder = TuneFinder()
+            with contextlib.redirect_stdout(io.StringIO()):
+                tunes = tune_finder.find_tunes(task)
+            return tunes, tune_finder.get_metrics()
+
+        incremental_tunes, metrics = find(True)
+        tunes, _ = find(False)
+
+        self.assertEqual([t.note_columns() for t in tunes], [t.note_columns() for t in incremental_tunes])
+        self.assertGreater(metrics.phases[-1].worker.counts['incrementally_evaluated_tunes'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,60 @@
+import os
+import tarfile
+import tempfile
+import unittest
+import zipfile
+
+from parameterized import parameterized
+
+from adversarial_music_generator.demo.naive_random.naive_random_generator import NaiveRandomGenerator
+from adversarial_music_generator.midi_export import BatchMidiExporter, MidiExportError
+from adversarial_music_generator.tune_to_midi_converter import TuneToMidiConverter
+
+
+class BatchMidiExporterTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tunes = NaiveRandomGenerator().generate_tunes('export', [str(i) for i in range(10)])
+        self.expected = [TuneToMidiConverter(use_direct_encoder=True).to_bytes(tune) for tune in self.tunes]
+
+    @parameterized.expand([(False,), (True,)])
+    def test_tunes_are_exported_to_dir(self, parallelize: bool):
+        with tempfile.TemporaryDirectory() as dir_path:
+            exporter = BatchMidiExporter(parallelize=parallelize, pool_size=2, chunk_size=3)
+            paths = exporter.export_to_dir(self.tunes, os.path.join(dir_path, 'midi'))
+
+            self.assertEqual([os.path.join(dir_path, 'midi', f'tune_{i}.mid') for i in range(10)], paths)
+            for path, expected in zip(paths, self.expected):
+                with open(path, 'rb') as midi_file:
+                    self.assertEqual(expected, midi_file.read())
+
+    @parameterized.expand([('tunes.zip',), ('tunes.tar',), ('tunes.tar.gz',), ('tunes.tar.xz',)])
+    def test_tunes_are_exported_to_archive(self, file_name: str):
+        file_names = [f'{i}.mid' for i in range(10)]
+        with tempfile.TemporaryDirectory() as dir_path:
+            archive_path = os.path.join(dir_path, file_name)
+            BatchMidiExporter(pool_size=2, chunk_size=3).export_to_archive(self.tunes, archive_path, file_names)
+
+            if file_name.endswith('.zip'):
+                with zipfile.ZipFile(archive_path) as archive:
+                    self.assertEqual(file_names, archive.namelist())
+                    actual = [archive.read(name) for name in file_names]
+            else:
+                with tarfile.open(archive_path) as archive:
+                    self.assertEqual(file_names, archive.getnames())
+                    actual = [archive.extractfile(name).read() for name in file_names]
+
+        self.assertEqual(self.expected, actual)
+
+    def test_unknown_archive_format_is_rejected(self):
+        with tempfile.TemporaryDirectory() as dir_path:
+            with self.assertRaises(MidiExportError):
+                BatchMidiExporter(parallelize=False).export_to_archive(self.tunes, os.path.join(dir_path, 'tunes.rar'))
+
+    def test_file_names_must_match_tunes(self):
+        with tempfile.TemporaryDirectory() as dir_path:
+            with self.assertRaises(MidiExportError):
+                BatchMidiExporter(parallelize=False).export_to_dir(self.tunes, dir_path, ['a.mid'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+import unittest
+
+from parameterized import parameterized
+
+from adversarial_music_generator.demo.naive_random.naive_random_generator import NaiveRandomGenerator
+from adversarial_music_generator.demo.naive_random.naive_random_mutator import NaiveRandomMutator
+from adversarial_music_generator.models.timbre_repository import TimbreRepository
+from adversarial_music_generator.models.track import Track
+from adversarial_music_generator.models.tune import Tune
+from adversarial_music_generator.seed import Seed
+
+
+def mutate_tune_the_old_way(tune: Tune, seed_str: str):
+    """
+    a straightforward copy of how the mutator used to work, one draw and one track scan at a time
+    """
+    seed = Seed(seed_str)
+
+    num_notes_to_remove = seed.randint(0, 10, 'num notes to remove')
+    num_notes_to_change = seed.randint(0, 10, 'num notes to change')
+
+    total_num_notes = tune.num_notes
+
+    removed_notes_ids = set([seed.randint(0, total_num_notes, 'removed note' + str(i)) for i in
+                             range(num_notes_to_remove)])
+
+    changed_notes_ids = set([seed.randint(0, total_num_notes, 'changed note' + str(i)) for i in
+                             range(num_notes_to_change)])
+
+    offset = 0
+    for track in tune.tracks:
+        num_track_notes = track.num_notes
+
+        for i in changed_notes_ids:
+            if offset <= i < offset + num_track_notes:
+                movement = seed.randint(-6, 5, "note movement" + str(i))
+                track.pitches[i - offset] += movement
+
+        track.remove_notes([i - offset for i in removed_notes_ids if offset <= i < offset + num_track_notes])
+
+        offset += num_track_notes
+
+
+class NaiveRandomMutatorTestCase(unittest.TestCase):
+
+    @parameterized.expand([
+        ('generated', False),
+        ('with_empty_tracks', True),
+    ])
+    def test_mutations_are_the_same_as_before(self, _, add_empty_tracks: bool):
+        generator, mutator = NaiveRandomGenerator(), NaiveRandomMutator()
+
+        for tune_idx, tune in enumerate(generator.generate_tunes('base', [str(i) for i in range(20)])):
+            if add_empty_tracks:
+                self._add_empty_tracks(tune)
+
+            for mutation_idx in range(10):
+                seed = 'mutation ' + str(tune_idx) + ' ' + str(mutation_idx)
+                expected, res = tune.clone(), tune.clone()
+                mutate_tune_the_old_way(expected, seed)
+                delta = mutator.mutate_tune_with_delta(res, seed)
+
+                self.assertEqual(expected.content_hash(), res.content_hash())
+
+                # the delta must describe exactly what happened to the notes
+                parent_pitches = tune.note_columns()[0]
+                pitches = res.note_columns()[0]
+                self.assertEqual(len(parent_pitches) - len(delta.removed_notes), len(pitches))
+                for before, after in delta.changed_notes:
+                    self.assertNotIn(before, delta.removed_notes)
+                    self.assertTrue(-6 <= pitches[after] - parent_pitches[before] <= 5)
+
+    def _add_empty_tracks(self, tune: Tune):
+        tune.tracks.insert(0, Track(TimbreRepository.pad))
+        tune.tracks.insert(2, Track(TimbreRepository.pad))
+        tune.tracks.append(Track(TimbreRepository.pad))
@@ -0,0 +1,89 @@
+import os
+import sys
+import tempfile
+import unittest
+from typing import List
+from unittest import mock
+
+from parameterized import parameterized
+
+from adversarial_music_generator.demo.naive_random.naive_random_evaluator import NaiveRandomEvaluator
+from adversarial_music_generator.demo.naive_random.naive_random_generator import NaiveRandomGenerator
+from adversarial_music_generator.interfaces import TuneEvaluatorInterface
+from adversarial_music_generator.models.tune import Tune
+from adversarial_music_generator.models.tune_evaluation_result import TuneEvaluationResult
+from adversarial_music_generator import parallel_evaluation
+from adversarial_music_generator.parallel_evaluation import ParallelTuneEvaluator
+from adversarial_music_generator.tune_corpus import TuneCorpus, write_tune_corpus
+
+
+class BpmEvaluator(TuneEvaluatorInterface):
+    """
+    an evaluator looking beyond notes, it gets materialized tunes
+    """
+
+    def get_aspects(self) -> List[str]:
+        return ['bpm', 'num_tracks']
+
+    def evaluate_tunes(self, tunes: List[Tune]) -> List[TuneEvaluationResult]:
+        res = []
+        for tune in tunes:
+            evaluation = TuneEvaluationResult()
+            evaluation.set_aspect_value('bpm', tune.bpm)
+            evaluation.set_aspect_value('num_tracks', len(tune.tracks))
+            res.append(evaluation)
+        return res
+
+
+class ParallelTuneEvaluatorTestCase(unittest.TestCase):
+    def setUp(self):
+        generator = NaiveRandomGenerator()
+        self.tunes = generator.generate_tunes('parallel', [str(i) for i in range(50)])
+        for i, tune in enumerate(self.tunes):
+            tune.bpm = 100.0 + i
+        self.evaluators = [NaiveRandomEvaluator(generator, 'calibration', num_calibration_iterations=20),
+                           BpmEvaluator()]
+
+    @parameterized.expand([(False, 0), (True, 0), (False, 1), (True, 1)])
+    def test_tunes_are_evaluated_as_evaluator_does(self, parallelize: bool, evaluator_idx: int):
+        evaluator = self.evaluators[evaluator_idx]
+        expected = evaluator.evaluate_tunes(self.tunes)
+
+        batch = ParallelTuneEvaluator(evaluator, parallelize=parallelize, pool_size=2,
+                                      chunk_size=7).evaluate_tunes(self.tunes)
+
+        self.assertEqual(evaluator.get_aspects(), batch.aspects)
+        self.assertEqual([[e.get_aspect_value(a) for a in evaluator.get_aspects()] for e in expected],
+                         [[batch.get_aspect_value(row, a) for a in batch.aspects] for row in range(len(batch))])
+
+    def test_tunes_are_evaluated_without_shared_memory(self):
+        evaluator = self.evaluators[1]
+        expected = ParallelTuneEvaluator(evaluator, parallelize=False).evaluate_tunes(self.tunes)
+
+        # shared memory is there since python 3.8, before that the tunes go to workers in a corpus file
+        with mock.patch.dict(sys.modules, {'adversarial_music_generator.shared_tunes': None}):
+            batch = ParallelTuneEvaluator(evaluator, parallelize=True, pool_size=2,
+                                          chunk_size=7).evaluate_tunes(self.tunes)
+
+        self.assertEqual(list(expected.values), list(batch.values))
+
+    @parameterized.expand([(False,), (True,)])
+    def test_corpus_is_evaluated_as_evaluator_does(self, parallelize: bool):
+        evaluator = self.evaluators[0]
+        expected = evaluator.evaluate_tunes(self.tunes)
+
+        with tempfile.TemporaryDirectory() as dir_path:
+            path = os.path.join(dir_path, 'tunes.corpus')
+            write_tune_corpus(path, self.tunes)
+            with TuneCorpus(path) as corpus:
+                batch = ParallelTuneEvaluator(evaluator, parallelize=parallelize, pool_size=2,
+                                              chunk_size=7).evaluate_corpus(corpus)
+
+        self.assertEqual([e.get_aspect_value(NaiveRandomEvaluator.ASPECT_HARMONY) for e in expected],
+                         [batch.get_aspect_value(row, NaiveRandomEvaluator.ASPECT_HARMONY) for row in range(50)])
+        # the corpus of the caller is not kept by an in-process run
+        self.assertIsNone(parallel_evaluation._corpus)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,55 @@
+import unittest
+
+from parameterized import parameterized
+
+from adversarial_music_generator.demo.naive_random.naive_random_generator import NaiveRandomGenerator
+from adversarial_music_generator.fast_seed import FastSeed
+from adversarial_music_generator.seed import Seed
+
+
+class SeedTestCase(unittest.TestCase):
+
+    @parameterized.expand([(Seed,), (FastSeed,)])
+    def test_values_are_reproducible_and_within_range(self, seed_class):
+        seed = seed_class('abc')
+        same_seed = seed_class('abc')
+
+        ints = [seed.randint(3, 7, 'int' + str(i)) for i in range(200)]
+        floats = [seed.randfloat(-1.0, 1.0, 'float' + str(i)) for i in range(200)]
+
+        self.assertEqual(ints, [same_seed.randint(3, 7, 'int' + str(i)) for i in range(200)])
+        self.assertEqual(floats, [same_seed.randfloat(-1.0, 1.0, 'float' + str(i)) for i in range(200)])
+        self.assertEqual({3, 4, 5, 6, 7}, set(ints))
+        self.assertTrue(all(-1.0 <= x < 1.0 for x in floats))
+        self.assertNotEqual(floats, [seed_class('abd').randfloat(-1.0, 1.0, 'float' + str(i)) for i in range(200)])
+
+    @parameterized.expand([(Seed,), (FastSeed,)])
+    def test_bulk_draws_match_single_draws(self, seed_class):
+        seed = seed_class('abc')
+        indices = [0, 5, 3, 100]
+
+        self.assertEqual([seed.randint(0, 1000, 'pitch ' + str(i)) for i in indices],
+                         seed.randints(0, 1000, 'pitch ', indices))
+        self.assertEqual([seed.randfloat(0.5, 2.0, 'start ' + str(i)) for i in indices],
+                         seed.randfloats(0.5, 2.0, 'start ', indices))
+
+    def test_subseed_keeps_the_engine(self):
+        self.assertIsInstance(FastSeed('abc').create_subseed('x'), FastSeed)
+        self.assertEqual(FastSeed('abc/x').randint(0, 100, 'y'), FastSeed('abc').create_subseed('x').randint(0, 100, 'y'))
+
+    def test_generator_with_fast_seed(self):
+        generator = NaiveRandomGenerator(FastSeed)
+
+        tunes = generator.generate_tunes('base', ['a', 'b', 'a'])
+
+        self.assertEqual(tunes[0].note_columns(), tunes[2].note_columns())
+        self.assertNotEqual(tunes[0].note_columns(), tunes[1].note_columns())
+        for tune in tunes:
+            self.assertEqual(3, len(tune.tracks))
+            for note in tune.all_notes():
+                self.assertTrue(40 <= note.note <= 90)
+                self.assertTrue(0.1 <= note.end_time_seconds - note.start_time_seconds <= 1.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
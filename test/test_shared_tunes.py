@@ -0,0 +1,73 @@
+import unittest
+from multiprocessing.pool import Pool
+from typing import List
+
+from adversarial_music_generator.demo.naive_random.naive_random_generator import NaiveRandomGenerator
+
+try:
+    from adversarial_music_generator.shared_tunes import SharedTunes, prepare_to_share_with_workers
+except ImportError:
+    raise unittest.SkipTest('shared memory is there since python 3.8')
+
+
+def _get_content_hashes(shared_tunes: SharedTunes) -> List[bytes]:
+    return [tune.content_hash() for tune in shared_tunes.get_tunes()]
+
+
+def _create_shared_tunes(seeds: List[str]) -> str:
+    return SharedTunes.create(NaiveRandomGenerator().generate_tunes('shared', seeds)).release()
+
+
+class SharedTunesTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tunes = NaiveRandomGenerator().generate_tunes('shared', [str(i) for i in range(10)])
+
+    def test_workers_read_shared_tunes(self):
+        prepare_to_share_with_workers()
+        with SharedTunes.create(self.tunes) as shared_tunes:
+            with Pool(2) as pool:
+                content_hashes = pool.map(_get_content_hashes, [shared_tunes, shared_tunes])
+
+        expected = [tune.content_hash() for tune in self.tunes]
+        self.assertEqual([expected, expected], content_hashes)
+
+    def test_workers_hand_tunes_over(self):
+        prepare_to_share_with_workers()
+        with Pool(2) as pool:
+            name = pool.apply(_create_shared_tunes, ([str(i) for i in range(10)],))
+
+        with SharedTunes.attach(name, owner=True) as shared_tunes:
+            self.assertEqual([t.content_hash() for t in self.tunes], _get_content_hashes(shared_tunes))
+
+        with self.assertRaises(FileNotFoundError):
+            SharedTunes.attach(name)
+
+    def test_segment_is_removed_by_its_owner(self):
+        shared_tunes = SharedTunes.create(self.tunes)
+        attached = SharedTunes.attach(shared_tunes.name)
+        attached.close()
+
+        with SharedTunes.attach(shared_tunes.name) as attached:
+            self.assertEqual(10, len(attached))
+        shared_tunes.close()
+        with self.assertRaises(FileNotFoundError):
+            SharedTunes.attach(shared_tunes.name)
+
+    def test_released_segment_can_be_removed(self):
+        name = SharedTunes.create(self.tunes).release()
+
+        SharedTunes.remove(name)
+
+        with self.assertRaises(FileNotFoundError):
+            SharedTunes.attach(name)
+
+    def test_packed_columns_are_read_in_place(self):
+        with SharedTunes.create(self.tunes) as shared_tunes:
+            packed = shared_tunes.corpus.get_packed_tunes()
+            self.assertEqual(sum(t.num_notes for t in self.tunes), len(packed.pitches))
+            self.assertEqual(list(self.tunes[0].note_columns()[0]), list(packed.pitches[0:packed.offsets[1]]))
+            del packed
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,68 @@
+import unittest
+from random import Random
+
+from adversarial_music_generator.interfaces import EvaluationReducerInterface
+from adversarial_music_generator.models.evaluation_batch import EvaluationBatch, EvaluationBatchRow
+from adversarial_music_generator.models.tune_evaluation_result import TuneEvaluationResult
+from adversarial_music_generator.top_k_collector import TopKCollector
+
+
+class CountingReducer(EvaluationReducerInterface):
+    def __init__(self):
+        self.num_calls = 0
+
+    def reduce(self, result: TuneEvaluationResult) -> float:
+        self.num_calls += 1
+        return result.get_aspect_value('score')
+
+
+class TopKCollectorTestCase(unittest.TestCase):
+    def test_keeps_k_best_with_ties_broken_by_order_key(self):
+        scores = [3.0, 1.0, 5.0, 3.0, 5.0, 0.0, 3.0]
+        evaluations = [self._create_evaluation(score) for score in scores]
+        reducer = CountingReducer()
+        collector = TopKCollector(4, reducer)
+
+        collector.add_many(evaluations, 0)
+
+        self.assertEqual([evaluations[i] for i in [2, 4, 0, 3]], collector.get_best())
+        self.assertEqual([5.0, 5.0, 3.0, 3.0], [score for score, _ in collector.get_best_with_scores()])
+        self.assertEqual(5.0, collector.best_score)
+        self.assertEqual(len(scores), collector.num_seen)
+        self.assertEqual(len(scores), reducer.num_calls)
+
+    def test_result_does_not_depend_on_arrival_order(self):
+        rnd = Random(1)
+        evaluations = [self._create_evaluation(float(rnd.randint(0, 5))) for _ in range(100)]
+        chunks = [(i, evaluations[i:i + 10]) for i in range(0, 100, 10)]
+
+        in_order = TopKCollector(15, CountingReducer())
+        for first_order_key, chunk in chunks:
+            in_order.add_many(chunk, first_order_key)
+
+        rnd.shuffle(chunks)
+        shuffled = TopKCollector(15, CountingReducer())
+        for first_order_key, chunk in chunks:
+            shuffled.add_many(chunk, first_order_key)
+
+        self.assertEqual(in_order.get_best(), shuffled.get_best())
+
+    def test_batch_rows_are_collected_as_standalone_results(self):
+        evaluations = [self._create_evaluation(score) for score in [1.0, 4.0, 2.0, 4.0]]
+        batch = EvaluationBatch.from_results(['score'], evaluations)
+        collector = TopKCollector(2, CountingReducer())
+
+        collector.add_batch(batch, 10)
+        best = collector.get_best()
+
+        self.assertEqual([4.0, 4.0], [x.get_aspect_value('score') for x in best])
+        self.assertNotIsInstance(best[0], EvaluationBatchRow)
+
+    def _create_evaluation(self, score: float) -> TuneEvaluationResult:
+        res = TuneEvaluationResult()
+        res.set_aspect_value('score', score)
+        return res
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,114 @@
+import unittest
+from array import array
+
+from adversarial_music_generator.models.note import Note
+from adversarial_music_generator.models.timbre_repository import TimbreRepository
+from adversarial_music_generator.models.track import Track
+from adversarial_music_generator.models.tune import Tune
+
+
+class TrackTestCase(unittest.TestCase):
+    def test_notes_are_stored_in_columns(self):
+        track = self._create_track()
+
+        self.assertEqual(array('i', [60, 62, 64]), track.pitches)
+        self.assertEqual(array('d', [0.0, 1.0, 2.0]), track.starts)
+        self.assertEqual(array('d', [0.5, 1.5, 2.5]), track.ends)
+        self.assertEqual(array('d', [1.0, 0.5, 0.25]), track.velocities)
+        self.assertEqual(3, track.num_notes)
+
+    def test_note_views_read_and_write_columns(self):
+        track = self._create_track()
+
+        view = track.notes[1]
+        self.assertEqual(Note(62, 1.0, 1.5, 0.5), view)
+
+        view.note += 5
+        view.end_time_seconds = 1.75
+        self.assertEqual(67, track.pitches[1])
+        self.assertEqual(1.75, track.ends[1])
+        self.assertEqual(Note(67, 1.0, 1.75, 0.5), track.notes[-2].to_note())
+
+    def test_list_operations(self):
+        track = self._create_track()
+
+        track.notes.append(Note(70, 3.0, 3.5, 1.0))
+        del track.notes[0]
+        track.notes.insert(0, Note(50, 0.1, 0.2, 0.3))
+
+        self.assertEqual([50, 62, 64, 70], [n.note for n in track.notes])
+        self.assertEqual(4, len(track.notes))
+
+        track.notes = track.notes[::-1]
+        self.assertEqual(array('i', [70, 64, 62, 50]), track.pitches)
+
+    def test_remove_notes(self):
+        track = self._create_track()
+
+        track.remove_notes([2, 0])
+
+        self.assertEqual(array('i', [62]), track.pitches)
+        self.assertEqual(array('d', [1.0]), track.starts)
+
+    def test_tune_note_columns_follow_all_notes_order(self):
+        tune = Tune()
+        other_track = Track(TimbreRepository.bass)
+        other_track.add_note(40, 5.0, 6.0, 1.0)
+        tune.tracks = [self._create_track(), other_track]
+
+        pitches, starts, ends, velocities = tune.note_columns()
+
+        self.assertEqual([n.note for n in tune.all_notes()], list(pitches))
+        self.assertEqual([n.start_time_seconds for n in tune.all_notes()], list(starts))
+        self.assertEqual(4, tune.num_notes)
+
+    def test_arrays_taken_before_cloning_do_not_change_clones(self):
+        track = self._create_track()
+        pitches = track.pitches
+        starts = array('d', [0.0, 1.0, 2.0])
+        track.starts = starts
+
+        clone = track.clone()
+        pitches[0] = 1
+        starts[0] = 5.0
+
+        self.assertEqual(array('i', [60, 62, 64]), clone.get_columns()[0])
+        self.assertEqual(array('d', [0.0, 1.0, 2.0]), clone.get_columns()[1])
+        self.assertEqual(array('i', [1, 62, 64]), track.get_columns()[0])
+
+        # a clone of a clone nobody has taken arrays from shares them again
+        self.assertIs(clone.get_columns()[2], clone.clone().get_columns()[2])
+
+    def test_clones_share_arrays_until_changed(self):
+        tune = Tune()
+        other_track = Track(TimbreRepository.bass)
+        other_track.add_note(40, 5.0, 6.0, 1.0)
+        tune.tracks = [self._create_track(), other_track]
+
+        clone = tune.clone()
+        self.assertIs(tune.tracks[0].get_columns()[0], clone.tracks[0].get_columns()[0])
+        self.assertEqual(Note(62, 1.0, 1.5, 0.5), clone.tracks[0].notes[1])
+        self.assertIs(tune.tracks[0].get_columns()[0], clone.tracks[0].get_columns()[0])
+
+        clone.tracks[0].pitches[0] += 1
+        clone.tracks[0].remove_notes([2])
+        tune.tracks[1].notes[0].velocity = 0.5
+
+        self.assertEqual(array('i', [60, 62, 64]), tune.tracks[0].pitches)
+        self.assertEqual(array('i', [61, 62]), clone.tracks[0].pitches)
+        self.assertEqual(array('d', [0.5]), tune.tracks[1].velocities)
+        self.assertEqual(array('d', [1.0]), clone.tracks[1].velocities)
+        self.assertEqual(tune.clone().content_hash(), tune.content_hash())
+
+    def _create_track(self) -> Track:
+        track = Track(TimbreRepository.lead)
+        track.notes = [
+            Note(note=60, start_time_seconds=0.0, end_time_seconds=0.5, velocity=1.0),
+            Note(note=62, start_time_seconds=1.0, end_time_seconds=1.5, velocity=0.5),
+            Note(note=64, start_time_seconds=2.0, end_time_seconds=2.5, velocity=0.25),
+        ]
+        return track
+
+
+if __name__ == '__main__':
+    unittest.main()
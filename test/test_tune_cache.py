@@ -0,0 +1,45 @@
+import unittest
+
+from adversarial_music_generator.demo.naive_random.donothing_postprocessor import DoNothingPostprocessor
+from adversarial_music_generator.demo.naive_random.naive_random_generator import NaiveRandomGenerator
+from adversarial_music_generator.demo.naive_random.naive_random_mutator import NaiveRandomMutator
+from adversarial_music_generator.models.tune import Tune
+from adversarial_music_generator.models.tune_blueprint import TuneBlueprint
+from adversarial_music_generator.tune_cache import TuneCache
+from adversarial_music_generator.tune_finder import _generate_tune_by_blueprint
+
+
+class TuneCacheTestCase(unittest.TestCase):
+    def test_least_recently_used_tune_is_evicted(self):
+        cache = TuneCache(2)
+        tunes = [Tune(), Tune(), Tune()]
+
+        cache.put('a', tunes[0])
+        cache.put('b', tunes[1])
+        self.assertIs(tunes[0], cache.get('a'))
+        cache.put('c', tunes[2])
+
+        self.assertEqual(2, len(cache))
+        self.assertIsNone(cache.get('b'))
+        self.assertIs(tunes[0], cache.get('a'))
+        self.assertIs(tunes[2], cache.get('c'))
+
+    def test_replay_from_cached_prefix_gives_the_same_tune(self):
+        generator, mutator, postprocessor = NaiveRandomGenerator(), NaiveRandomMutator(), DoNothingPostprocessor()
+        cache = TuneCache(10)
+
+        parent = TuneBlueprint(base_seed='base', tune_seed='base1', mutation_seeds=['m1', 'm2'])
+        child = TuneBlueprint(base_seed='base', tune_seed='base1', mutation_seeds=['m1', 'm2', 'm3'])
+
+        _generate_tune_by_blueprint(parent, generator, mutator, postprocessor, cache)
+        cached_child = _generate_tune_by_blueprint(child, generator, mutator, postprocessor, cache)
+        cached_again = _generate_tune_by_blueprint(child, generator, mutator, postprocessor, cache)
+        replayed_child = _generate_tune_by_blueprint(child, generator, mutator, postprocessor)
+
+        self.assertEqual(2, len(cache))
+        for tune in [cached_child, cached_again]:
+            self.assertEqual(replayed_child.note_columns(), tune.note_columns())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,172 @@
+import io
+import os
+import pickle
+import tempfile
+import unittest
+from array import array
+
+from pyximport import pyximport
+
+from adversarial_music_generator.demo.naive_random.naive_random_evaluator import NaiveRandomEvaluator
+from adversarial_music_generator.demo.naive_random.naive_random_generator import NaiveRandomGenerator
+from adversarial_music_generator.models.packed_tunes import PackedTunes
+from adversarial_music_generator.models.timbre_repository import TimbreRepository
+from adversarial_music_generator.models.track import Track
+from adversarial_music_generator.models.tune import Tune
+from adversarial_music_generator.models.tune_blueprint import TuneBlueprint
+from adversarial_music_generator.tune_corpus import TuneCorpus, TuneCorpusWriter, TuneCorpusError, \
+    write_tune_corpus, CorpusTuneGenerator
+
+pyximport.install()
+from adversarial_music_generator.evaluation_lib.harmony import calculate_disharmony_batch  # noqa: E402
+
+
+class TuneCorpusTestCase(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, 'tunes.corpus')
+
+        self.tunes = NaiveRandomGenerator().generate_tunes('corpus', [str(i) for i in range(20)])
+        self.tunes[3].bpm = 97.5
+        self.tunes[3].end_time = 12.25
+        self.tunes[3].tracks[1].tags = {'role': 'bass', 'octave': 2}
+        # a tune without notes and one without tracks
+        self.tunes[5].tracks.append(Track(TimbreRepository.pad))
+        self.tunes[7].tracks = []
+        self.blueprints = [TuneBlueprint('corpus', str(i), ['m' + str(i)] * (i % 3)) for i in range(20)]
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def test_tunes_are_stored_losslessly(self):
+        write_tune_corpus(self.path, self.tunes, self.blueprints)
+
+        with TuneCorpus(self.path) as corpus:
+            self.assertEqual(20, len(corpus))
+            for i, expected in enumerate(self.tunes):
+                tune = corpus.get_tune(i)
+                self.assertEqual(expected.content_hash(), tune.content_hash())
+                self.assertEqual(expected.note_columns(), tune.note_columns())
+                self.assertEqual([t.tags for t in expected.tracks], [t.tags for t in tune.tracks])
+                self.assertEqual(self.blueprints[i], corpus.get_blueprint(i))
+
+    def test_note_columns_are_read_in_place(self):
+        write_tune_corpus(self.path, self.tunes)
+
+        with TuneCorpus(self.path) as corpus:
+            self.assertIsNone(corpus.get_blueprint(0))
+            for i, tune in enumerate(self.tunes):
+                self.assertEqual(list(map(list, tune.note_columns())), list(map(list, corpus.get_note_columns(i))))
+
+            expected = PackedTunes.from_tunes(self.tunes[4:12])
+            packed = corpus.get_packed_tunes(4, 12)
+            self.assertEqual(list(expected.offsets), list(packed.offsets))
+            self.assertEqual(
+                list(calculate_disharmony_batch(expected.starts, expected.ends, expected.pitches, expected.offsets)),
+                list(calculate_disharmony_batch(packed.starts, packed.ends, packed.pitches, packed.offsets))
+            )
+            del packed
+
+    def test_tunes_read_share_arrays_with_their_clones(self):
+        write_tune_corpus(self.path, self.tunes)
+
+        with TuneCorpus(self.path) as corpus:
+            tune = corpus.get_tune(0)
+        clone = tune.clone()
+
+        for track, cloned_track in zip(tune.tracks, clone.tracks):
+            for column, cloned_column in zip(track.get_columns(), cloned_track.get_columns()):
+                self.assertIs(column, cloned_column)
+
+    def test_tunes_are_written_one_by_one(self):
+        with TuneCorpusWriter(self.path) as writer:
+            for tune in self.tunes:
+                writer.add(tune)
+            self.assertFalse(os.path.exists(self.path))
+
+        with TuneCorpus(self.path) as corpus:
+            self.assertEqual([t.content_hash() for t in self.tunes], [t.content_hash() for t in corpus])
+
+    def test_corpus_can_be_empty(self):
+        write_tune_corpus(self.path, [])
+
+        with TuneCorpus(self.path) as corpus:
+            self.assertEqual(0, len(corpus))
+            self.assertEqual([], corpus.get_tunes())
+
+    def test_corpus_is_pickled_as_path(self):
+        write_tune_corpus(self.path, self.tunes)
+
+        with TuneCorpus(self.path) as corpus:
+            data = pickle.dumps(corpus)
+        self.assertLess(len(data), 200)
+
+        corpus = pickle.loads(data)
+        self.assertEqual(self.tunes[2].content_hash(), corpus.get_tune(2).content_hash())
+        corpus.close()
+
+    def test_other_files_are_rejected(self):
+        with open(self.path, 'wb') as f:
+            f.write(b'MThd' + bytes(100))
+
+        with self.assertRaises(TuneCorpusError):
+            TuneCorpus(self.path)
+
+    def test_tags_must_be_json(self):
+        tune = Tune()
+        tune.tracks = [Track(TimbreRepository.lead)]
+        tune.tracks[0].tags = {'notes': array('d')}
+
+        with self.assertRaises(TuneCorpusError):
+            write_tune_corpus(self.path, [tune])
+        self.assertEqual([], os.listdir(self.dir.name))
+
+    def test_writer_is_left_consistent(self):
+        unstorable_tune = Tune()
+        unstorable_tune.tracks = [Track(TimbreRepository.lead), Track(TimbreRepository.lead)]
+        unstorable_tune.tracks[0].pitches = array('i', [60])
+        unstorable_tune.tracks[1].tags = {'notes': array('d')}
+
+        with TuneCorpusWriter(self.path) as writer:
+            writer.add(self.tunes[0])
+            with self.assertRaises(TuneCorpusError):
+                writer.add(unstorable_tune)
+
+            # neither asking for the size nor writing changes what comes next
+            size = writer.get_size()
+            buffer = io.BytesIO()
+            writer.write_to(buffer)
+            self.assertEqual(size, len(buffer.getvalue()))
+            writer.add(self.tunes[1])
+
+        with TuneCorpus(self.path) as corpus:
+            self.assertEqual([t.content_hash() for t in self.tunes[:2]], [t.content_hash() for t in corpus])
+            self.assertEqual(os.path.getsize(self.path), writer.get_size())
+
+    def test_evaluator_can_be_calibrated_against_corpus(self):
+        write_tune_corpus(self.path, self.tunes)
+
+        with TuneCorpus(self.path) as corpus:
+            evaluator = NaiveRandomEvaluator(CorpusTuneGenerator(corpus), 'calibration', num_calibration_iterations=10)
+            evaluations = evaluator.evaluate_tunes(corpus.get_tunes())
+
+        self.assertEqual(20, len(evaluations))
+
+    def test_generators_over_different_corpora_have_different_cache_keys(self):
+        other_path = os.path.join(self.dir.name, 'other.corpus')
+        write_tune_corpus(self.path, self.tunes)
+        write_tune_corpus(other_path, self.tunes[:-1])
+
+        with TuneCorpus(self.path) as corpus, TuneCorpus(other_path) as other_corpus:
+            with open(self.path, 'rb') as f:
+                same_corpus = TuneCorpus.from_buffer(bytearray(f.read()))
+
+            keys = [CorpusTuneGenerator(x).get_calibration_cache_key() for x in [corpus, other_corpus, same_corpus]]
+            same_corpus.close()
+
+        self.assertNotEqual(keys[0], keys[1])
+        self.assertEqual(keys[0], keys[2])
+
+
+if __name__ == '__main__':
+    unittest.main()
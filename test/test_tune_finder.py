@@ -1,15 +1,30 @@
+import asyncio
+import contextlib
+import io
+import json
+import os
+import tempfile
+import tracemalloc
+from multiprocessing import Process
 import unittest
 from typing import List
+from unittest import mock
 import re
 
+from adversarial_music_generator.distributed.coordinator import DistributedCoordinator
+from adversarial_music_generator.distributed.worker import run_worker
 from adversarial_music_generator.find_tunes_task import FindTunesTask
 from adversarial_music_generator.interfaces import TuneGeneratorInterface, TuneEvaluatorInterface, TuneMutatorInterface, \
-    EvaluationReducerInterface, TuneProcessorInterface
+    EvaluationReducerInterface, TuneProcessorInterface, StoppingPolicyInterface
 from adversarial_music_generator.models.note import Note
+from adversarial_music_generator.models.search_snapshot import SearchSnapshot
 from adversarial_music_generator.models.timbre_repository import TimbreRepository
 from adversarial_music_generator.models.track import Track
+from adversarial_music_generator.models.tune_blueprint import TuneBlueprint
 from adversarial_music_generator.models.tune_evaluation_result import TuneEvaluationResult
-from adversarial_music_generator.tune_finder import Tune, TuneFinder
+from adversarial_music_generator.stopping_policies import PlateauStoppingPolicy, WallClockStoppingPolicy, \
+    EvaluationBudgetStoppingPolicy
+from adversarial_music_generator.tune_finder import Tune, TuneFinder, TuneFinderError
 from parameterized import parameterized
 
 
@@ -36,6 +51,25 @@ class MockTuneGenerator(TuneGeneratorInterface):
         return tune
 
 
+class TaggingMockTuneGenerator(MockTuneGenerator):
+    def __init__(self, tags: dict):
+        self.tags = tags
+
+    def _generate_one_tune(self, seed: str) -> Tune:
+        tune = super()._generate_one_tune(seed)
+        tune.tracks[0].tags = dict(self.tags)
+        return tune
+
+
+class CountingMockTuneGenerator(MockTuneGenerator):
+    def __init__(self):
+        self.num_generated_tunes = 0
+
+    def _generate_one_tune(self, seed: str) -> Tune:
+        self.num_generated_tunes += 1
+        return super()._generate_one_tune(seed)
+
+
 class MockTuneEvaluator(TuneEvaluatorInterface):
     def get_aspects(self) -> List[str]:
         return [
@@ -87,6 +121,23 @@ class MockPostprocessor(TuneProcessorInterface):
         pass
 
 
+class InterruptedTuneFinder(TuneFinder):
+    """
+    a finder crashing after a given number of search phases
+    """
+
+    def __init__(self, num_phases_to_run: int):
+        super().__init__()
+        self.num_phases_to_run = num_phases_to_run
+        self.num_phases_run = 0
+
+    def _run_tasks(self, *args, **kwargs):
+        if self.num_phases_run == self.num_phases_to_run:
+            raise InterruptedError()
+        super()._run_tasks(*args, **kwargs)
+        self.num_phases_run += 1
+
+
 class TuneFinderTestCase(unittest.TestCase):
     """
     In this test case we use some very predictable generator, mutator, evaluator, and reducer.
@@ -143,6 +194,324 @@ class TuneFinderTestCase(unittest.TestCase):
         self.assertEqual(1, len(tunes))
         self.assertEqual(389, len(tunes[0].tracks[0].notes))
 
+    def test_resume_from_checkpoint(self):
+        with tempfile.TemporaryDirectory() as checkpoint_dir:
+            checkpoint_path = os.path.join(checkpoint_dir, 'search.json')
+
+            uninterrupted_tunes = TuneFinder().find_tunes(self._create_task())
+
+            interrupted_finder = InterruptedTuneFinder(num_phases_to_run=2)
+            with self.assertRaises(InterruptedError):
+                interrupted_finder.find_tunes(self._create_task(checkpoint_path=checkpoint_path))
+            self.assertTrue(os.path.exists(checkpoint_path))
+
+            resumed_finder = InterruptedTuneFinder(num_phases_to_run=100)
+            resumed_tunes = resumed_finder.find_tunes(self._create_task(checkpoint_path=checkpoint_path))
+
+            # the random phase and the first epoch are not repeated
+            self.assertEqual(2, resumed_finder.num_phases_run)
+            self.assertEqual([t.note_columns() for t in uninterrupted_tunes],
+                             [t.note_columns() for t in resumed_tunes])
+
+            with self.assertRaises(TuneFinderError):
+                TuneFinder().find_tunes(self._create_task(checkpoint_path=checkpoint_path, base_seed='b'))
+
+    @parameterized.expand([({'origin': 'mock'}, True), ({'origin': ('not', 'json')}, True), ({'origin': 'mock'}, False)])
+    def test_tunes_materialized_in_workers_are_the_same(self, tags: dict, shared_memory: bool):
+        # tags that cannot go through shared memory, or no shared memory (python < 3.8),
+        # make workers send tunes as they are
+        generator = TaggingMockTuneGenerator(tags)
+        serial_task = self._create_task()
+        serial_task.generator = generator
+        parallel_task = self._create_task(parallelize=True)
+        parallel_task.generator = generator
+        parallel_task.pool_size = 2
+
+        serial_tunes = TuneFinder().find_tunes(serial_task)
+        without_shared_memory = mock.patch('adversarial_music_generator.tune_finder._import_shared_tunes',
+                                           return_value=None)
+        with contextlib.nullcontext() if shared_memory else without_shared_memory:
+            parallel_tunes = TuneFinder().find_tunes(parallel_task)
+
+        self.assertEqual([t.content_hash() for t in serial_tunes], [t.content_hash() for t in parallel_tunes])
+        self.assertEqual([tags, tags], [t.tracks[0].tags for t in parallel_tunes])
+
+    @unittest.skipUnless(os.path.isdir('/dev/shm'), 'shared memory segments are not files here')
+    def test_failed_materialization_in_workers_leaves_no_segments(self):
+        task = self._create_task(parallelize=True)
+        task.pool_size = 2
+        tune_finder = TuneFinder()
+        segments_before = set(os.listdir('/dev/shm'))
+
+        search = tune_finder.find_tunes_iter(task)
+        blueprints = next(search).blueprints
+        # the tune seed has no number for the generator to take
+        broken_blueprint = TuneBlueprint(base_seed='a', tune_seed='a', mutation_seeds=[])
+        with self.assertRaises(ValueError):
+            tune_finder.generate_tunes(task, blueprints + [broken_blueprint])
+        search.close()
+
+        self.assertEqual(segments_before, set(os.listdir('/dev/shm')))
+
+    @parameterized.expand([(True,), (False,)])
+    def test_adaptive_chunking_gives_the_same_tunes(self, parallelize: bool):
+        task = self._create_task(parallelize=parallelize)
+        task.adaptive_chunking = True
+        task.min_chunk_size = 5
+        task.target_chunk_seconds = 0.001
+
+        self.assertEqual([t.note_columns() for t in TuneFinder().find_tunes(self._create_task())],
+                         [t.note_columns() for t in TuneFinder().find_tunes(task)])
+
+    def test_progress_is_reported_against_phase_totals(self):
+        task = self._create_task()
+        task.num_generation_iterations = 70
+
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            TuneFinder().find_tunes(task)
+
+        progress = re.findall(r'^(random search|mutation) (\d+) of (\d+) ', output.getvalue(), re.MULTILINE)
+        self.assertEqual({('random search', '70'), ('mutation', '100')}, {(x[0], x[2]) for x in progress})
+        self.assertEqual(3 + 3 * 4, len(progress))
+
+    @parameterized.expand([(True,), (False,)])
+    def test_partitioning_by_parent_gives_the_same_tunes(self, adaptive_chunking: bool):
+        task = self._create_task()
+        task.partition_mutations_by_parent = True
+        task.adaptive_chunking = adaptive_chunking
+        task.min_chunk_size = 5
+        task.target_chunk_seconds = 0.001
+        tune_finder = TuneFinder()
+
+        reference_tune_finder = TuneFinder()
+        self.assertEqual([t.note_columns() for t in reference_tune_finder.find_tunes(self._create_task())],
+                         [t.note_columns() for t in tune_finder.find_tunes(task)])
+
+        for phase, reference_phase in zip(tune_finder.get_metrics().phases[2:],
+                                          reference_tune_finder.get_metrics().phases[2:]):
+            # every parent is materialized by a single task
+            self.assertEqual(10, phase.worker.counts['materialized_parents'])
+            self.assertLess(phase.worker.counts['materialized_parents'],
+                            reference_phase.worker.counts['materialized_parents'])
+            self.assertEqual(100, phase.worker.counts['tunes'])
+
+    def test_evaluation_cache(self):
+        task = self._create_task()
+        uncached_task = self._create_task()
+        uncached_task.evaluation_cache_size = 0
+
+        tune_finder = TuneFinder()
+        tunes = tune_finder.find_tunes(task)
+
+        self.assertEqual([t.note_columns() for t in TuneFinder().find_tunes(uncached_task)],
+                         [t.note_columns() for t in tunes])
+        for phase in tune_finder.get_metrics().phases[1:]:
+            # unmutated survivors are never evaluated again
+            self.assertGreaterEqual(phase.worker.counts['evaluation_cache_hits'], 4)
+            self.assertEqual(100, phase.worker.counts['evaluated_tunes'] + phase.worker.counts['evaluation_cache_hits'])
+
+        # 4 tasks mutating all the parents (4, then 10) of an epoch, only the first one materializes them
+        self.assertEqual([3 * 4, 3 * 10, 3 * 10],
+                         [phase.worker.counts['reused_parent_hashes'] for phase in tune_finder.get_metrics().phases[1:]])
+
+    @parameterized.expand([(True,), (False,)])
+    def test_find_tunes_iter(self, parallelize: bool):
+        task = self._create_task(parallelize=parallelize)
+        tune_finder = TuneFinder()
+
+        snapshots = list(tune_finder.find_tunes_iter(task))
+
+        self.assertEqual([None, 0, 1, 2], [s.epoch for s in snapshots])
+        self.assertEqual([False, False, False, True], [s.is_final for s in snapshots])
+        self.assertEqual(2, len(snapshots[-1].blueprints))
+        self.assertEqual(sorted(snapshots[-1].scores, reverse=True), snapshots[-1].scores)
+
+        # mutation epochs keep the unmutated parents, so the best score never drops
+        best_scores = [s.scores[0] for s in snapshots]
+        self.assertEqual(sorted(best_scores), best_scores)
+
+        self.assertEqual([t.note_columns() for t in TuneFinder().find_tunes(self._create_task())],
+                         [t.note_columns() for t in tune_finder.generate_tunes(task, snapshots[-1].blueprints)])
+
+    def test_materialization_starts_from_tunes_cached_by_search(self):
+        task = self._create_task()
+        task.generator = CountingMockTuneGenerator()
+        tune_finder = TuneFinder()
+
+        snapshots = list(tune_finder.find_tunes_iter(task))
+        num_generated_tunes = task.generator.num_generated_tunes
+        tunes = tune_finder.generate_tunes(task, snapshots[-1].blueprints)
+
+        self.assertEqual(num_generated_tunes, task.generator.num_generated_tunes)
+        self.assertEqual([t.note_columns() for t in TuneFinder().find_tunes(self._create_task())],
+                         [t.note_columns() for t in tunes])
+
+    def test_find_tunes_async(self):
+        async def take_first_snapshot():
+            async for snapshot in TuneFinder().find_tunes_async(self._create_task(parallelize=True)):
+                # the search is stopped right after its random phase
+                return snapshot
+
+        snapshot = asyncio.run(take_first_snapshot())
+
+        self.assertEqual('random search', snapshot.phase)
+        self.assertFalse(snapshot.is_final)
+        self.assertEqual(4, len(snapshot.blueprints))
+
+    @parameterized.expand([(True,), (False,)])
+    def test_metrics(self, parallelize: bool):
+        with tempfile.TemporaryDirectory() as output_dir:
+            task = self._create_task(parallelize=parallelize)
+            task.metrics_path = os.path.join(output_dir, 'metrics.json')
+            task.prometheus_metrics_path = os.path.join(output_dir, 'metrics.prom')
+            task.profile_dir = os.path.join(output_dir, 'profiles')
+            task.trace_memory = True
+
+            tune_finder = TuneFinder()
+            snapshots = list(tune_finder.find_tunes_iter(task))
+            metrics = tune_finder.get_metrics()
+
+            self.assertEqual([s.metrics for s in snapshots], metrics.phases)
+            self.assertEqual([None, 0, 1, 2], [p.epoch for p in metrics.phases])
+            for phase in metrics.phases:
+                self.assertEqual(4, phase.num_tasks)
+                self.assertEqual(100, phase.worker.counts['tunes'])
+                self.assertGreater(phase.worker.seconds['evaluation'], 0.0)
+                self.assertGreater(phase.worker.peaks['traced_memory_bytes'], 0)
+                self.assertIn('selection', phase.parent.seconds)
+                self.assertIn('waiting', phase.parent.seconds)
+                self.assertGreaterEqual(phase.wall_seconds, phase.parent.seconds['selection'])
+            self.assertIn('replay', metrics.phases[1].worker.seconds)
+
+            with open(task.metrics_path) as f:
+                self.assertEqual(metrics.to_dict(), json.load(f))
+            with open(task.prometheus_metrics_path) as f:
+                prometheus_text = f.read()
+            self.assertIn('# TYPE amg_stage_seconds_total counter', prometheus_text)
+            self.assertIn('amg_stage_events_total{phase="mutation",epoch="2",side="worker",name="tunes"} 100.0',
+                          prometheus_text)
+
+            self.assertTrue(any(name.endswith('.prof') for name in os.listdir(task.profile_dir)))
+
+    def test_memory_is_traced_without_reset_peak(self):
+        # tracemalloc.reset_peak is there since python 3.9
+        task = self._create_task()
+        task.trace_memory = True
+        tune_finder = TuneFinder()
+
+        with mock.patch.object(tracemalloc, 'reset_peak', new=None):
+            del tracemalloc.reset_peak
+            tune_finder.find_tunes(task)
+
+        for phase in tune_finder.get_metrics().phases:
+            self.assertGreater(phase.worker.peaks['traced_memory_bytes'], 0)
+        self.assertFalse(tracemalloc.is_tracing())
+
+    @parameterized.expand([
+        ('plateau', PlateauStoppingPolicy(num_epochs=1, epsilon=1e9), [None, 0]),
+        ('wall clock', WallClockStoppingPolicy(max_seconds=0.0), [None]),
+        ('evaluation budget', EvaluationBudgetStoppingPolicy(max_evaluations=250), [None, 0]),
+        ('plateau not reached', PlateauStoppingPolicy(num_epochs=1, epsilon=0.0), [None, 0, 1, 2]),
+    ])
+    def test_stopping_policies(self, _, policy: StoppingPolicyInterface, expected_epochs: List):
+        task = self._create_task()
+        task.stopping_policies = [policy]
+
+        snapshots = list(TuneFinder().find_tunes_iter(task))
+
+        self.assertEqual(expected_epochs, [s.epoch for s in snapshots])
+        self.assertTrue(snapshots[-1].is_final)
+        self.assertEqual(task.num_tunes_to_find, len(snapshots[-1].blueprints))
+        if len(expected_epochs) < 4:
+            self.assertEqual(type(policy).__name__, snapshots[-1].stopped_by)
+        else:
+            self.assertIsNone(snapshots[-1].stopped_by)
+
+    def test_stop_is_kept_in_checkpoint(self):
+        with tempfile.TemporaryDirectory() as checkpoint_dir:
+            task = self._create_task(checkpoint_path=os.path.join(checkpoint_dir, 'search.json'))
+            task.stopping_policies = [PlateauStoppingPolicy(num_epochs=1, epsilon=1e9)]
+            stopped_snapshots = list(TuneFinder().find_tunes_iter(task))
+
+            # resumed without the policy, the search still stops where it has stopped
+            task.stopping_policies = []
+            resumed_finder = InterruptedTuneFinder(num_phases_to_run=100)
+            resumed_snapshots = list(resumed_finder.find_tunes_iter(task))
+
+        self.assertEqual(0, resumed_finder.num_phases_run)
+        self.assertEqual([0], [s.epoch for s in resumed_snapshots])
+        self.assertEqual('PlateauStoppingPolicy', resumed_snapshots[0].stopped_by)
+        self.assertEqual(stopped_snapshots[-1].blueprints, resumed_snapshots[0].blueprints)
+
+    @parameterized.expand([
+        ('plateau', PlateauStoppingPolicy(num_epochs=2, epsilon=1e9)),
+        ('evaluation budget', EvaluationBudgetStoppingPolicy(max_evaluations=250)),
+    ])
+    def test_stopping_policies_see_phases_before_resumption(self, _, policy: StoppingPolicyInterface):
+        task = self._create_task()
+        task.stopping_policies = [policy]
+        uninterrupted_snapshots = list(TuneFinder().find_tunes_iter(task))
+
+        with tempfile.TemporaryDirectory() as checkpoint_dir:
+            task = self._create_task(checkpoint_path=os.path.join(checkpoint_dir, 'search.json'))
+            task.stopping_policies = [policy]
+            with self.assertRaises(InterruptedError):
+                list(InterruptedTuneFinder(num_phases_to_run=1).find_tunes_iter(task))
+            resumed_snapshots = list(TuneFinder().find_tunes_iter(task))
+
+        self.assertEqual(uninterrupted_snapshots[-1].epoch, resumed_snapshots[-1].epoch)
+        self.assertEqual(type(policy).__name__, resumed_snapshots[-1].stopped_by)
+        self.assertEqual(uninterrupted_snapshots[-1].num_evaluations, resumed_snapshots[-1].num_evaluations)
+        self.assertEqual(uninterrupted_snapshots[-1].blueprints, resumed_snapshots[-1].blueprints)
+
+    def test_plateau_policy_ignores_snapshots_without_scores(self):
+        snapshots = [SearchSnapshot(phase='mutation', epoch=i, blueprints=[], scores=[], phase_seconds=0.0,
+                                    elapsed_seconds=0.0, num_evaluations=0, is_final=False) for i in range(3)]
+
+        self.assertFalse(PlateauStoppingPolicy(num_epochs=1).should_stop(snapshots, 100))
+
+    def test_find_distributed(self):
+        local_tunes = TuneFinder().find_tunes(self._create_task())
+
+        authkey = b'test'
+        coordinator = DistributedCoordinator(('127.0.0.1', 0), authkey)
+        workers = [Process(target=run_worker, args=(coordinator.address, authkey)) for _ in range(2)]
+        try:
+            for worker in workers:
+                worker.start()
+            self.assertTrue(coordinator.wait_for_workers(2, timeout=30))
+
+            distributed_tunes = TuneFinder(coordinator).find_tunes(self._create_task())
+        finally:
+            coordinator.shutdown()
+            for worker in workers:
+                worker.join(timeout=30)
+
+        self.assertEqual([t.note_columns() for t in local_tunes],
+                         [t.note_columns() for t in distributed_tunes])
+        self.assertEqual([0, 0], [worker.exitcode for worker in workers])
+
+    def _create_task(self, checkpoint_path: str = None, base_seed: str = 'a',
+                     parallelize: bool = False) -> FindTunesTask:
+        return FindTunesTask(
+            num_generation_iterations=100,
+            num_mutation_epochs=3,
+            num_mutation_iterations_in_epoch=100,
+            num_tunes_to_keep_after_mutation_epoch=10,
+            num_tunes_to_keep_from_generation=4,
+            generator=self._create_generator(),
+            mutator=self._create_mutator(),
+            reducer=self._create_reducer(),
+            evaluator=self._create_evaluator(),
+            num_tunes_to_find=2,
+            base_seed=base_seed,
+            parallelize=parallelize,
+            chunk_size=30,
+            postprocessor=self._create_postprocessor(),
+            checkpoint_path=checkpoint_path
+        )
+
     def _create_generator(self) -> TuneGeneratorInterface:
         return MockTuneGenerator()
 
@@ -1,4 +1,7 @@
 import unittest
+from array import array
+
+from adversarial_music_generator.demo.naive_random.naive_random_generator import NaiveRandomGenerator
 
 from adversarial_music_generator.models.note import Note
 from adversarial_music_generator.models.timbre_repository import TimbreRepository
@@ -18,6 +21,24 @@ class MyTestCase(unittest.TestCase):
 
         # timidity -ia /home/sergey/em/adversarial-music-generator/test/output/out.mid
 
+    def test_direct_encoder_gives_the_same_bytes_as_midiutil(self):
+        tunes = [self._generateTestTune()] + NaiveRandomGenerator().generate_tunes('midi', [str(i) for i in range(30)])
+        for tune in tunes[1:]:
+            for track in tune.tracks:
+                track.velocities = array('d', [0.8]) * track.num_notes
+
+        num_compared = 0
+        for tune in tunes:
+            try:
+                expected = TuneToMidiConverter().to_bytes(tune)
+            except IndexError:
+                # midiutil crashes on a note off left over after collapsing same pitch notes
+                continue
+            self.assertEqual(expected, TuneToMidiConverter(use_direct_encoder=True).to_bytes(tune))
+            num_compared += 1
+
+        self.assertGreater(num_compared, 20)
+
     def _generateTestTune(self) -> Tune:
         res = Tune()
         res.bpm = 123